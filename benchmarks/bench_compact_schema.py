@@ -0,0 +1,54 @@
+"""
+Report the memory footprint of aggregated traffic frames in the default and
+the compact schema, and check that DataSelector and TrafficDataRanker give
+the same results on both.
+
+    python -m benchmarks.bench_compact_schema [--limit N]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.rater import TrafficDataRanker
+from src.preprocessing import DataSelector
+from src.preprocessing.aggregator import aggregate_corpus
+from src.preprocessing.schema import compact_frame, memory_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--limit", type=int, default=None, help="only load the first N axes")
+    args = parser.parse_args()
+
+    frames, errors = aggregate_corpus(base_path=args.base_path, workers=1)
+    names = list(frames)[:args.limit]
+
+    corpus = pd.concat([frames[name] for name in names], ignore_index=True)
+    compact = compact_frame(corpus)
+
+    with pd.option_context("display.width", 200):
+        print(memory_report(corpus, compact).round(2).to_string())
+
+    print(f"\n{len(names)} axes, {len(corpus)} rows: "
+          f"{corpus.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB -> "
+          f"{compact.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB")
+
+    default_selector, compact_selector = DataSelector(corpus), DataSelector(compact)
+    for filters in ({}, {"year": 1402}, {"season": "summer", "daytype": "weekend"}):
+        expected = default_selector.select(**filters)
+        actual = compact_selector.select(**filters)
+        assert (actual.dtypes.iloc[1:] == np.float64).all()
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-6)
+
+    expected = TrafficDataRanker(corpus).evaluate_ranking()
+    actual = TrafficDataRanker(compact).evaluate_ranking()
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-6)
+
+    print("DataSelector and TrafficDataRanker agree on both schemas (rtol 1e-6)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare the original pandas gap filling with the NumPy kernels now used by
+TrafficPreprocessor.handle_missing_values.
+
+Each raw file under resources/ is loaded once; both implementations then run
+on copies of the loaded frame and their outputs must agree.
+
+    python -m benchmarks.bench_gap_filler [--limit N]
+"""
+import argparse
+import glob
+import os
+import time
+
+import pandas as pd
+
+from src.preprocessing import TrafficPreprocessor
+
+
+def handle_missing_values_pandas(preprocessor):
+    """Reference implementation: the original chain of full-frame pandas passes."""
+    vehicle_columns = preprocessor.vehicle_columns
+    df = preprocessor.df
+
+    full_index = pd.date_range(
+        start=df.index.min().normalize(),
+        end=df.index.max().normalize() + pd.Timedelta(hours=23),
+        freq="h"
+    )
+
+    df = df.reindex(full_index)
+
+    missing_per_day = df["total number of vehicles"].isna().resample("D").sum()
+    days_to_drop = missing_per_day[missing_per_day == 24].index
+    df = df[~df.index.normalize().isin(days_to_drop)]
+
+    df[vehicle_columns] = df[vehicle_columns].interpolate(method="time", limit=3)
+    df[vehicle_columns] = df[vehicle_columns].fillna(df[vehicle_columns].rolling(window=3, min_periods=1).mean())
+    df[vehicle_columns] = df[vehicle_columns].fillna(df[vehicle_columns].rolling(window=6, min_periods=1).mean())
+    df[vehicle_columns] = df[vehicle_columns].fillna(
+        df[vehicle_columns].rolling(window=12, center=True, min_periods=1).mean())
+    df[vehicle_columns] = df[vehicle_columns].ffill().bfill()
+
+    df[preprocessor.speed_column] = df[preprocessor.speed_column].interpolate(method="time", limit=3)
+
+    df[preprocessor.violation_columns] = df[preprocessor.violation_columns].fillna(0)
+
+    df["end time"] = df.index + pd.Timedelta(hours=1)
+    df["date"] = df.index.date.astype(str)
+    df["start hour"] = df.index.hour
+    df["end hour"] = (df["start hour"] + 1) % 24
+
+    df["axis code"] = df["axis code"].ffill().bfill()
+    df["axis name"] = df["axis name"].ffill().bfill()
+
+    preprocessor.df = df
+
+
+def run(func, preprocessor, loaded, repeat):
+    """Run func on fresh copies of the loaded frame; return the result and best wall time."""
+    best = float("inf")
+    for _ in range(repeat):
+        preprocessor.df = loaded.copy()
+        start = time.perf_counter()
+        func(preprocessor)
+        best = min(best, time.perf_counter() - start)
+    return preprocessor.df, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--limit", type=int, default=None, help="only benchmark the first N files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.base_path, "14*", "*", "*.xlsx")))[:args.limit]
+
+    rows = []
+    for file_path in files:
+        preprocessor = TrafficPreprocessor(file_path)
+        preprocessor.load_data()
+        loaded = preprocessor.df
+
+        expected, pandas_time = run(handle_missing_values_pandas, preprocessor, loaded, args.repeat)
+        actual, numpy_time = run(TrafficPreprocessor.handle_missing_values, preprocessor, loaded, args.repeat)
+
+        pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, check_freq=False)
+
+        rows.append({
+            "file": os.path.relpath(file_path, args.base_path),
+            "rows": len(actual),
+            "gaps": int(loaded[preprocessor.vehicle_columns].isna().to_numpy().sum()) + len(actual) - len(loaded),
+            "pandas (ms)": pandas_time * 1000,
+            "numpy (ms)": numpy_time * 1000,
+            "speedup": pandas_time / numpy_time,
+            "bit-identical": actual.equals(expected)
+        })
+
+    report = pd.DataFrame(rows)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(2).to_string(index=False))
+
+    print(f"\n{len(report)} files agree with the pandas implementation "
+          f"({report['bit-identical'].sum()} bit-identical)")
+    print(f"total pandas: {report['pandas (ms)'].sum():.0f} ms, numpy: {report['numpy (ms)'].sum():.0f} ms, "
+          f"median speedup: {report['speedup'].median():.1f}x "
+          f"(files with gaps: {report.loc[report['gaps'] > 0, 'speedup'].median():.1f}x, "
+          f"without: {report.loc[report['gaps'] == 0, 'speedup'].median():.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
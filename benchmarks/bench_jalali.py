@@ -0,0 +1,74 @@
+"""
+Compare row-wise persiantools parsing with the vectorized Jalali converter.
+
+Every raw file under resources/ is parsed both ways; the results must be
+identical and the per-file timings are printed.
+
+    python -m benchmarks.bench_jalali [--limit N]
+"""
+import argparse
+import glob
+import os
+import time
+
+import pandas as pd
+from persiantools.jdatetime import JalaliDateTime
+
+from src.preprocessing.jalali import TIMESTAMP_FORMAT, jalali_to_gregorian
+
+
+def persiantools_to_gregorian(series):
+    """Reference implementation: one JalaliDateTime per row."""
+    return series.apply(lambda x: JalaliDateTime.strptime(x, TIMESTAMP_FORMAT).to_gregorian())
+
+
+def best_of(func, arg, repeat):
+    """Return the result and the best wall time of several runs."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--limit", type=int, default=None, help="only benchmark the first N files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.base_path, "14*", "*", "*.xlsx")))[:args.limit]
+
+    rows = []
+    for file_path in files:
+        raw = pd.read_excel(file_path).iloc[1:]
+        series = pd.concat([raw.iloc[:, 2], raw.iloc[:, 3]], ignore_index=True)
+
+        expected, reference_time = best_of(persiantools_to_gregorian, series, args.repeat)
+        actual, vectorized_time = best_of(jalali_to_gregorian, series, args.repeat)
+
+        pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+        rows.append({
+            "file": os.path.relpath(file_path, args.base_path),
+            "values": len(series),
+            "persiantools (ms)": reference_time * 1000,
+            "vectorized (ms)": vectorized_time * 1000,
+            "speedup": reference_time / vectorized_time
+        })
+
+    report = pd.DataFrame(rows)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(2).to_string(index=False))
+
+    print(f"\n{len(report)} files, all identical to persiantools")
+    print(f"total persiantools: {report['persiantools (ms)'].sum():.0f} ms, "
+          f"vectorized: {report['vectorized (ms)'].sum():.0f} ms, "
+          f"median speedup: {report['speedup'].median():.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Serve a saved SpeedPredictor over HTTP, time concurrent single-hour requests,
+and check the error responses: 404 for an axis the model was not trained on,
+400 for a request missing a parameter.
+
+    python -m benchmarks.bench_service [--requests 2000] [--clients 8]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.ml import PredictionService, SpeedPredictor, load_predictor, save_predictor
+from src.ml.service import make_server
+from src.preprocessing import Aggregator
+
+
+def get(url):
+    """GET a URL; return (status, decoded JSON body), also for error statuses."""
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--axis", default=None, help="axis file name to train on (default: the first found)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    axis = args.axis or sorted(name for root, dirs, names in os.walk("resources")
+                               for name in names if name.endswith(".xlsx"))[0]
+    df = Aggregator(axis).aggregate_data()
+
+    predictor = SpeedPredictor(df)
+    predictor.train_model()
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_predictor(predictor, directory)
+        service = PredictionService(load_predictor(directory, lazy=False))
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+        try:
+            known = int(df["axis code"].dropna().iloc[0])
+            rng = np.random.default_rng(0)
+            queries = [f"{url}?axis={known}&date=2025-03-{day:02d}&hour={hour}"
+                       for day, hour in zip(rng.integers(21, 32, args.requests), rng.integers(0, 24, args.requests))]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                statuses = [status for status, body in pool.map(get, queries)]
+            elapsed = time.perf_counter() - start
+            assert statuses == [200] * len(queries), f"unexpected statuses {set(statuses)}"
+            print(f"{len(queries)} requests from {args.clients} clients in {elapsed:.2f} s "
+                  f"({len(queries) / elapsed:.0f} requests/s)")
+            print(json.dumps(service.stats(), indent=2))
+
+            unknown = max(predictor.speed_profile().index.get_level_values(0)) + 1
+            status, body = get(f"{url}?axis={int(unknown)}&date=2025-03-21&hour=8")
+            assert status == 404, f"axis {int(unknown)} answered {status}: {body}"
+
+            status, body = get(f"{url}?axis={known}&date=2025-03-21")
+            assert status == 400, f"request without an hour answered {status}: {body}"
+            print("Unknown axes answer 404 and incomplete requests 400")
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare pd.read_excel with the streaming TrafficExportReader.
+
+Each raw file under resources/ is loaded both ways into the typed frame that
+TrafficPreprocessor.load_data works on; the frames must be identical. Parse
+time and peak traced memory per file are printed.
+
+    python -m benchmarks.bench_xlsx_reader [--limit N]
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.preprocessing.xlsx_reader import EXPORT_COLUMNS, LABEL_COLUMNS, TrafficExportReader
+
+
+def read_with_pandas(file_path):
+    """Reference implementation: the original read_excel/rename/to_numeric sequence."""
+    df = pd.read_excel(file_path)
+    df.columns = EXPORT_COLUMNS
+    df = df.iloc[1:].reset_index(drop=True)
+    for col in EXPORT_COLUMNS:
+        if col not in LABEL_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def read_streaming(file_path):
+    return TrafficExportReader(file_path).read()
+
+
+def measure(func, file_path, repeat):
+    """Return the result, best wall time and peak traced memory of func(file_path)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(file_path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func(file_path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--limit", type=int, default=None, help="only benchmark the first N files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.base_path, "14*", "*", "*.xlsx")))[:args.limit]
+
+    rows = []
+    for file_path in files:
+        expected, pandas_time, pandas_peak = measure(read_with_pandas, file_path, args.repeat)
+        actual, stream_time, stream_peak = measure(read_streaming, file_path, args.repeat)
+
+        pd.testing.assert_frame_equal(actual, expected)
+
+        rows.append({
+            "file": os.path.relpath(file_path, args.base_path),
+            "rows": len(actual),
+            "read_excel (ms)": pandas_time * 1000,
+            "streaming (ms)": stream_time * 1000,
+            "speedup": pandas_time / stream_time,
+            "read_excel peak (KiB)": pandas_peak / 1024,
+            "streaming peak (KiB)": stream_peak / 1024
+        })
+
+    report = pd.DataFrame(rows)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(2).to_string(index=False))
+
+    print(f"\n{len(report)} files, all identical to read_excel")
+    print(f"total read_excel: {report['read_excel (ms)'].sum():.0f} ms, "
+          f"streaming: {report['streaming (ms)'].sum():.0f} ms, "
+          f"median speedup: {report['speedup'].median():.1f}x")
+    print(f"median peak memory: read_excel {report['read_excel peak (KiB)'].median():.0f} KiB, "
+          f"streaming {report['streaming peak (KiB)'].median():.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
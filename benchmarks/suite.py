@@ -0,0 +1,249 @@
+"""
+Time the main stages of the pipeline on the real exports and on synthetic ones,
+and store the results as JSON so runs can be compared for regressions.
+
+Covered: TrafficPreprocessor.preprocess, Aggregator.aggregate_data (cold and
+with a warm cache), DataSelector construction and filters,
+DataFrameComparer.evaluate_similarity, TrafficDataRanker.evaluate_ranking and
+model training.
+
+    python -m benchmarks.suite [--data real synthetic] [--axes 4 --months 3 --gap-rate 0.02]
+                               [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from benchmarks.synthetic import generate_tree
+from src.analysis import DataFrameComparer, TrafficDataRanker
+from src.ml import SpeedClassifier, SpeedPredictor, TrafficVolumePredictor
+from src.ml.features import clear_feature_cache
+from src.preprocessing import Aggregator, DataSelector, PreprocessingCache, TrafficPreprocessor
+from src.preprocessing.aggregator import MONTHS, YEARS
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def measure(func, repeat):
+    """Run func repeat times; return its last result and timing statistics in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    return result, {"min": min(times), "median": statistics.median(times), "mean": statistics.mean(times),
+                    "repeat": repeat}
+
+
+def axis_files(base_path, years):
+    """Map each axis file name to its month files under base_path, in calendar order."""
+    files = {}
+    for year in years:
+        for month in MONTHS:
+            folder = os.path.join(base_path, year, month)
+            if os.path.isdir(folder):
+                for file_name in sorted(os.listdir(folder)):
+                    if file_name.endswith(".xlsx"):
+                        files.setdefault(file_name, []).append(os.path.join(folder, file_name))
+    return dict(sorted(files.items()))
+
+
+def run_dataset(dataset, base_path, years, axes_limit, files_limit, repeat):
+    """
+    Run every benchmark on one dataset and return the result records.
+
+    :param axes_limit: Number of axes to aggregate
+    :param files_limit: Number of their month files to preprocess
+    """
+    files = axis_files(base_path, years)
+    axes = list(files)[:axes_limit]
+    paths = [path for axis in axes for path in files[axis]][:files_limit]
+    records = []
+
+    def record(name, func, rows=None, repeat=repeat):
+        try:
+            result, stats = measure(func, repeat)
+        except Exception as e:
+            print(f"  {name:<40} failed: {type(e).__name__}: {e}")
+            records.append({"dataset": dataset, "name": name, "error": f"{type(e).__name__}: {e}"})
+            return None
+
+        n_rows = rows(result) if rows is not None else None
+        print(f"  {name:<40} median {stats['median'] * 1000:10.1f} ms" + (f"  ({n_rows} rows)" if n_rows else ""))
+        records.append({"dataset": dataset, "name": name, "rows": n_rows, **stats})
+        return result
+
+    print(f"{dataset}: {len(paths)} files, {len(axes)} axes from {base_path}")
+
+    def preprocess_files():
+        total = 0
+        for path in paths:
+            preprocessor = TrafficPreprocessor(path)
+            preprocessor.preprocess()
+            total += len(preprocessor.df)
+        return total
+
+    record("preprocess", preprocess_files, rows=lambda total: total)
+
+    def aggregate(cache):
+        frames = []
+        for axis in axes:
+            aggregator = Aggregator(axis, cache=cache)
+            aggregator.base_path = base_path
+            aggregator.years = list(years)
+            frames.append(aggregator.aggregate_data())
+        return pd.concat(frames, ignore_index=True)
+
+    record("aggregate_data (no cache)", lambda: aggregate(False), rows=len, repeat=1)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PreprocessingCache(cache_dir)
+        aggregate(cache)
+        corpus = record("aggregate_data (warm cache)", lambda: aggregate(cache), rows=len)
+
+    if corpus is None or corpus.empty:
+        return records
+
+    selector = record("DataSelector()", lambda: DataSelector(corpus), rows=lambda s: len(s.df))
+    if selector is None:
+        return records
+
+    year = str(corpus["year"].iloc[0])
+    month = corpus["month"].iloc[0]
+    season = corpus["season"].iloc[0]
+
+    def filters():
+        return [selector.filter_by_year(year), selector.filter_by_month(month),
+                selector.filter_by_season_year(season, year), selector.filter_by_weekdays_month_year(month, year),
+                selector.filter_by_weekends_season(season), selector.filter_by_weekdays()]
+
+    record("DataSelector filters (x6)", filters)
+
+    profiles = [selector.filter_by_month_year(month, year) for year in sorted(corpus["year"].unique())
+                for month in MONTHS if ((corpus["year"] == year) & (corpus["month"] == month)).any()]
+
+    def compare_consecutive():
+        return [DataFrameComparer(first, second).evaluate_similarity()
+                for first, second in zip(profiles, profiles[1:])]
+
+    record("DataFrameComparer (consecutive months)", compare_consecutive, rows=len)
+
+    record("TrafficDataRanker daily_mean", lambda: TrafficDataRanker(corpus).evaluate_ranking("daily_mean"), rows=len)
+    record("TrafficDataRanker max_hourly", lambda: TrafficDataRanker(corpus).evaluate_ranking("max_hourly"), rows=len)
+
+    def train(models):
+        clear_feature_cache()
+        for model in models:
+            model(corpus).train_model()
+
+    record("TrafficVolumePredictor.train_model", lambda: train([TrafficVolumePredictor]), repeat=1)
+    record("train volume, speed and class models",
+           lambda: train([TrafficVolumePredictor, SpeedPredictor, SpeedClassifier]), repeat=1)
+
+    return records
+
+
+def environment():
+    """Describe the code and platform a run was made on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": {"numpy": np.__version__, "pandas": pd.__version__, "scikit-learn": sklearn.__version__}
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the median time of every benchmark against a baseline run.
+
+    :param threshold: Relative slowdown reported as a regression
+    :return: Number of regressions
+    """
+    reference = {(r["dataset"], r["name"]): r for r in baseline["results"] if "median" in r}
+
+    rows = []
+    for r in results["results"]:
+        base = reference.get((r["dataset"], r["name"]))
+        if base is None or "median" not in r:
+            continue
+        ratio = r["median"] / base["median"]
+        rows.append({"dataset": r["dataset"], "benchmark": r["name"], "baseline (ms)": base["median"] * 1000,
+                     "current (ms)": r["median"] * 1000, "ratio": ratio,
+                     "": "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "")})
+
+    report = pd.DataFrame(rows)
+    print(f"\nCompared with {baseline['environment'].get('commit')} ({baseline['environment']['created']}):")
+    with pd.option_context("display.width", 200):
+        print(report.round(3).to_string(index=False) if rows else "no common benchmarks")
+
+    return sum(row[""] == "REGRESSION" for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", nargs="+", choices=["real", "synthetic"], default=["real", "synthetic"])
+    parser.add_argument("--base-path", default="resources", help="root of the real exports")
+    parser.add_argument("--years", nargs="+", default=YEARS, help="years of the real exports to use")
+    parser.add_argument("--axes-limit", type=int, default=2, help="real axes to aggregate")
+    parser.add_argument("--files-limit", type=int, default=12, help="month files to preprocess per dataset")
+    parser.add_argument("--axes", type=int, default=4, help="synthetic axes")
+    parser.add_argument("--months", type=int, default=3, help="synthetic months per year")
+    parser.add_argument("--synthetic-years", nargs="+", default=["1402", "1403"])
+    parser.add_argument("--gap-rate", type=float, default=0.02, help="synthetic missing-hour rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier JSON result to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    records = []
+    if "real" in args.data:
+        records += run_dataset("real", args.base_path, args.years, args.axes_limit, args.files_limit, args.repeat)
+
+    if "synthetic" in args.data:
+        with tempfile.TemporaryDirectory() as synthetic_dir:
+            generate_tree(synthetic_dir, args.axes, args.months, args.synthetic_years, args.gap_rate, args.seed)
+            records += run_dataset("synthetic", synthetic_dir, args.synthetic_years, args.axes, args.files_limit,
+                                   args.repeat)
+
+    results = {"environment": environment(), "config": vars(args), "results": records}
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}.json")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
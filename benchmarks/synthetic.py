@@ -0,0 +1,159 @@
+"""
+Write synthetic hourly traffic exports in the layout of the real files: one
+workbook per axis and month under <out>/<year>/<month>/, a blank first row,
+the Persian header and 16 positional columns with Jalali timestamps.
+
+Volumes follow a two-peak daily profile with a quieter Friday, speed drops
+with load and violations scale with volume. gap_rate controls missing hours,
+blank count cells and fully missing days.
+
+    python -m benchmarks.synthetic OUT_DIR [--axes 4] [--months 3] [--years 1402] [--gap-rate 0.02]
+"""
+import argparse
+import os
+
+import numpy as np
+from openpyxl import Workbook
+from persiantools.jdatetime import JalaliDate
+
+from src.preprocessing.aggregator import MONTHS
+from src.preprocessing.jalali import nowruz
+
+HEADER = ["کد محور", "نام محور", "زمان شروع", "زمان پایان", "مدت زمان کارکرد (دقیقه)", "تعداد کل وسیله نقلیه",
+          "تعداد وسیله نقلیه کلاس 1", "تعداد وسیله نقلیه کلاس 2", "تعداد وسیله نقلیه کلاس 3",
+          "تعداد وسیله نقلیه کلاس 4", "تعداد وسیله نقلیه کلاس 5", "سرعت متوسط", "تعداد تخلف سرعت غیر مجاز",
+          "تعداد تخلف فاصله غیر مجاز", "تعداد تخلف سبقت غیر مجاز", "تعداد برآورد شده"]
+
+# Share of each vehicle class in the total.
+CLASS_SHARES = np.array([0.955, 0.025, 0.01, 0.006, 0.004])
+
+SYNTHETIC_CODE = 900000
+
+
+def daily_profile(hours):
+    """Relative hourly volume with a morning and an evening peak."""
+    return (0.15 + 0.85 * np.exp(-((hours - 8) ** 2) / 6) + 0.95 * np.exp(-((hours - 18) ** 2) / 8)
+            + 0.35 * np.exp(-((hours - 13) ** 2) / 10))
+
+
+def month_length(year, month):
+    """Number of days in a Jalali month (1-based)."""
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if JalaliDate.is_leap(year) else 29
+
+
+def jalali_timestamp(year, month, day, hour):
+    """Format a Jalali date and hour like the export timestamps."""
+    return f"{year:04d}/{month:02d}/{day:02d} {hour:02d}:00:00"
+
+
+def next_hour(year, month, day, hour, days):
+    """Timestamp one hour later, rolling over the day, month and year."""
+    if hour < 23:
+        return jalali_timestamp(year, month, day, hour + 1)
+    if day < days:
+        return jalali_timestamp(year, month, day + 1, 0)
+    if month < 12:
+        return jalali_timestamp(year, month + 1, 1, 0)
+    return jalali_timestamp(year + 1, 1, 1, 0)
+
+
+def axis_file_name(axis):
+    """File name of a synthetic axis, in the Hourly<code><name>.xlsx pattern of the real exports."""
+    return f"Hourly{SYNTHETIC_CODE + axis}SyntheticAxis{axis}.xlsx"
+
+
+def generate_rows(axis, year, month, gap_rate, rng):
+    """
+    Build the cell values of one axis-month export.
+
+    :return: List of 16-value rows; missing cells are None
+    """
+    days = month_length(year, month)
+    start = nowruz(year) + (31 * (month - 1) if month <= 7 else 30 * (month - 1) + 6)
+
+    day = np.repeat(np.arange(days), 24)
+    hour = np.tile(np.arange(24), days)
+    weekday = (start + day).astype("datetime64[D]").astype(np.int64)
+    friday = (weekday + 3) % 7 == 4
+
+    base = 400 + 300 * axis
+    volume = base * daily_profile(hour) * np.where(friday, 0.7, 1.0) * rng.lognormal(0, 0.08, len(hour))
+    total = np.round(volume).astype(np.int64)
+    counts = np.stack([rng.binomial(total, share) for share in CLASS_SHARES[1:]], axis=1)
+    counts = np.column_stack([total - counts.sum(axis=1), counts])
+
+    speed = np.clip(np.round(95 - 35 * volume / volume.max() + rng.normal(0, 3, len(total))), 5, 140)
+    speeding = rng.poisson(0.03 * total)
+    distance = rng.poisson(0.01 * total)
+    overtaking = rng.poisson(0.001 * total)
+
+    keep = rng.random(len(total)) >= gap_rate
+    dropped_days = rng.random(days) < gap_rate / 2
+    keep &= ~dropped_days[day]
+    blank = rng.random(len(total)) < gap_rate / 2
+
+    name = f"محور آزمایشی {axis}"
+    rows = []
+    for i in np.flatnonzero(keep):
+        begin = jalali_timestamp(year, month, day[i] + 1, hour[i])
+        end = next_hour(year, month, day[i] + 1, hour[i], days)
+        rows.append([SYNTHETIC_CODE + axis, name, begin, end, 60,
+                     None if blank[i] else int(total[i]), *(int(value) for value in counts[i]),
+                     int(speed[i]), int(speeding[i]), int(distance[i]), int(overtaking[i]),
+                     None if blank[i] else int(total[i])])
+    return rows
+
+
+def write_export(path, rows):
+    """Write rows to an xlsx file with the blank first row and Persian header of the real exports."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([None] * len(HEADER))
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def generate_tree(out_dir, axes=4, months=3, years=("1402",), gap_rate=0.02, seed=0):
+    """
+    Write axes x months x years synthetic exports under out_dir.
+
+    :param months: Number of months per year, starting at farvardin
+    :param gap_rate: Probability of a missing hour; half of it for blank counts and missing days
+    :return: List of the axis file names written
+    """
+    rng = np.random.default_rng(seed)
+    file_names = [axis_file_name(axis) for axis in range(axes)]
+
+    for year in years:
+        for month in range(1, months + 1):
+            folder = os.path.join(out_dir, str(year), MONTHS[month - 1])
+            os.makedirs(folder, exist_ok=True)
+            for axis, file_name in enumerate(file_names):
+                write_export(os.path.join(folder, file_name), generate_rows(axis, int(year), month, gap_rate, rng))
+
+    return file_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--axes", type=int, default=4)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--years", nargs="+", default=["1402"])
+    parser.add_argument("--gap-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    file_names = generate_tree(args.out_dir, args.axes, args.months, args.years, args.gap_rate, args.seed)
+    print(f"Wrote {len(file_names) * args.months * len(args.years)} exports for {len(file_names)} axes "
+          f"to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
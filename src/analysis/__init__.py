@@ -1,2 +1,6 @@
 from .comparator import DataFrameComparer
-from .rater import TrafficDataRanker
+from .rater import TrafficDataRanker, RollingRanker
+from .similarity import BatchComparer
+from .streaming import StreamingProfileReducer
+from .cross_correlation import LaggedCorrelation
+from .anomaly import StreamingAnomalyDetector
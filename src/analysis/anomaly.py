@@ -0,0 +1,286 @@
+"""
+Streaming detection of abnormal hourly counts (closures, accidents, sensor failures).
+
+    python -m src.analysis.anomaly [--seed-years 1401] [--replay-years 1402 1403] [--threshold 4]
+
+The command seeds a detector with the seed years and replays the later years through it as a
+stream of hourly records in time order, reporting throughput and the anomalies found.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.aggregator import iter_files
+from src.preprocessing.data_selector import WEEKEND_DAY
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+
+DAYTYPES = ["weekday", "weekend"]
+GROUPS_PER_AXIS = len(DAYTYPES) * HOURS_PER_DAY
+
+
+def group_of(timestamp):
+    """(day type, hour) group of a timestamp: day type * 24 + hour, day type 1 on the weekend."""
+    return (timestamp.weekday() == WEEKEND_DAY) * HOURS_PER_DAY + timestamp.hour
+
+
+class StreamingAnomalyDetector:
+    def __init__(self, column='total number of vehicles', threshold=4.0, min_count=8, min_std=1.0,
+                 learn_anomalies=False, on_anomaly=None):
+        """
+        Flags abnormal hours as hourly records arrive, one record at a time.
+
+        Kept per axis and (day type, hour): a running count, mean and sum of squared deviations
+        (Welford's algorithm), updated in constant time. A record is scored by its z-score against
+        the mean and standard deviation of its group before the group learns from it. Anomalous
+        records are not learned by default, so a closure does not drag the baseline down with it.
+        The state can be seeded from history with seed, the per-axis, per-day-type counterpart of
+        the hourly profile aggregate_hourly_mean computes, together with its variance.
+
+        State lives in flat Python lists rather than NumPy arrays: scoring one record touches three
+        numbers, and list indexing is far cheaper than NumPy scalar access at that size.
+
+        :param column: Column the records hold, used by seed and the replay harness
+        :param threshold: Absolute z-score above which a record is anomalous
+        :param min_count: Fewest values a group needs before its records are scored
+        :param min_std: Floor of the standard deviation, so near-constant night hours do not flag tiny changes
+        :param learn_anomalies: Update the state with anomalous records too
+        :param on_anomaly: Called with every anomaly dict as it is detected
+        """
+        self.column = column
+        self.threshold = threshold
+        self.min_count = min_count
+        self.min_std = min_std
+        self.learn_anomalies = learn_anomalies
+        self.on_anomaly = on_anomaly
+
+        self.axis_codes = []
+        self._slots = {}
+        self._count = []
+        self._mean = []
+        self._m2 = []
+
+        self.records = 0
+        self.anomalies = 0
+
+    def _slot(self, axis_code):
+        """First state index of an axis, adding state for axes not seen before."""
+        slot = self._slots.get(axis_code)
+        if slot is None:
+            slot = self._slots[axis_code] = len(self._count)
+            self.axis_codes.append(axis_code)
+            self._count.extend([0] * GROUPS_PER_AXIS)
+            self._mean.extend([0.0] * GROUPS_PER_AXIS)
+            self._m2.extend([0.0] * GROUPS_PER_AXIS)
+        return slot
+
+    def seed(self, df):
+        """
+        Add historical data to the state in one vectorized pass, merging it with any state
+        already learned (Chan's parallel update).
+        :param df: Traffic DataFrame of one or many axes, e.g. from aggregate_corpus
+        """
+        values = df[self.column].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        df, values = df[present], values[present]
+        if not len(values):
+            return self
+
+        codes = df["axis code"].astype(object)
+        slots = np.array([self._slot(code) for code in pd.unique(codes)], dtype=np.int64)
+        positions = pd.Index(pd.unique(codes), dtype=object).get_indexer(codes)
+        weekend = pd.to_datetime(df["date"]).dt.weekday.to_numpy() == WEEKEND_DAY
+        index = slots[positions] + weekend * HOURS_PER_DAY + df["start hour"].to_numpy(dtype=np.int64)
+
+        size = len(self._count)
+        count = np.bincount(index, minlength=size).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.bincount(index, weights=values, minlength=size) / count, 0.0)
+        m2 = np.bincount(index, weights=(values - mean[index]) ** 2, minlength=size)
+
+        old_count, old_mean, old_m2 = np.array(self._count, dtype=np.float64), np.array(self._mean), np.array(self._m2)
+        total = old_count + count
+        delta = mean - old_mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            merged_mean = np.where(total > 0, old_mean + delta * count / total, 0.0)
+            merged_m2 = old_m2 + m2 + np.where(total > 0, delta ** 2 * old_count * count / total, 0.0)
+
+        self._count = total.astype(np.int64).tolist()
+        self._mean = merged_mean.tolist()
+        self._m2 = merged_m2.tolist()
+        return self
+
+    def score(self, axis_code, timestamp, value):
+        """
+        Return the z-score of a record against its group, or None while the group has fewer than
+        min_count values. The state is not changed.
+        """
+        slot = self._slots.get(axis_code)
+        if slot is None:
+            return None
+        i = slot + group_of(timestamp)
+        count = self._count[i]
+        if count < self.min_count:
+            return None
+        return (value - self._mean[i]) / max(math.sqrt(self._m2[i] / (count - 1)), self.min_std)
+
+    def update(self, axis_code, timestamp, value):
+        """
+        Score one hourly record, then learn from it.
+
+        :param axis_code: Axis the record belongs to
+        :param timestamp: Start of the hour, a datetime or pd.Timestamp
+        :param value: Count of the hour; missing values (None or NaN) are ignored
+        :return: Anomaly dict (axis code, timestamp, value, expected, std, z) or None
+        """
+        if value is None or value != value:
+            return None
+        self.records += 1
+
+        slot = self._slots.get(axis_code)
+        if slot is None:
+            slot = self._slot(axis_code)
+        i = slot + (timestamp.weekday() == WEEKEND_DAY) * HOURS_PER_DAY + timestamp.hour
+
+        count, mean = self._count[i], self._mean[i]
+        anomaly = None
+        if count >= self.min_count:
+            std = max(math.sqrt(self._m2[i] / (count - 1)), self.min_std)
+            z = (value - mean) / std
+            if abs(z) > self.threshold:
+                anomaly = {"axis code": axis_code, "timestamp": timestamp, "value": value, "expected": mean,
+                           "std": std, "z": z}
+                self.anomalies += 1
+                if self.on_anomaly is not None:
+                    self.on_anomaly(anomaly)
+                if not self.learn_anomalies:
+                    return anomaly
+
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        self._count[i], self._mean[i] = count, mean
+        self._m2[i] += delta * (value - mean)
+        return anomaly
+
+    def process(self, records):
+        """
+        Score a stream of records, yielding the anomalies as they are found.
+        :param records: Iterable of (axis code, timestamp, value)
+        """
+        update = self.update
+        for axis_code, timestamp, value in records:
+            anomaly = update(axis_code, timestamp, value)
+            if anomaly is not None:
+                yield anomaly
+
+    def profile(self):
+        """
+        The learned state: count, mean and standard deviation per axis code, day type and start hour.
+        """
+        index = pd.MultiIndex.from_product([self.axis_codes, DAYTYPES, range(HOURS_PER_DAY)],
+                                           names=["axis code", "daytype", "start hour"])
+        count = np.array(self._count, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.where(count > 1, np.sqrt(np.array(self._m2) / (count - 1)), np.nan)
+        return pd.DataFrame({"count": count, "mean": np.where(count > 0, self._mean, np.nan), "std": std},
+                            index=index)
+
+
+def frame_records(df, column='total number of vehicles'):
+    """
+    Turn traffic frames into (axis code, timestamp, value) records in time order.
+    :param df: Traffic DataFrame, or list of them, with axis code, date and start hour
+    """
+    if isinstance(df, list):
+        df = pd.concat(df, ignore_index=True) if df else pd.DataFrame()
+    if df.empty:
+        return
+
+    times = (pd.to_datetime(df["date"]) + pd.to_timedelta(df["start hour"].astype(np.int64), unit="h")).to_numpy()
+    order = np.argsort(times, kind="stable")
+    codes = df["axis code"].to_numpy()[order].tolist()
+    stamps = times[order].astype("datetime64[us]").tolist()
+    values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)[order].tolist()
+    yield from zip(codes, stamps, values)
+
+
+def replay_records(years=None, base_path='resources', cache=None, column='total number of vehicles'):
+    """
+    Replay the historical exports as a stream of hourly records of every axis in time order,
+    loading one month of files at a time.
+    :return: Generator of (axis code, timestamp, value)
+    """
+    month, frames = None, []
+    for year, month_name, df in iter_files(years=years, base_path=base_path, cache=cache):
+        if (year, month_name) != month:
+            yield from frame_records(frames, column)
+            month, frames = (year, month_name), []
+        frames.append(df)
+    yield from frame_records(frames, column)
+
+
+def replay(detector, records):
+    """
+    Feed records through a detector, timing only the detector.
+
+    :param detector: StreamingAnomalyDetector
+    :param records: Iterable of (axis code, timestamp, value), e.g. from replay_records
+    :return: (DataFrame of the anomalies, dict with records, anomalies, seconds and records per second)
+    """
+    anomalies = []
+    seconds = 0.0
+    records_before = detector.records
+    update = detector.update
+
+    for batch in _batches(records, 10000):
+        start = time.perf_counter()
+        for axis_code, timestamp, value in batch:
+            anomaly = update(axis_code, timestamp, value)
+            if anomaly is not None:
+                anomalies.append(anomaly)
+        seconds += time.perf_counter() - start
+
+    count = detector.records - records_before
+    stats = {"records": count, "anomalies": len(anomalies), "seconds": seconds,
+             "records per second": count / seconds if seconds else float("nan")}
+    return pd.DataFrame(anomalies, columns=["axis code", "timestamp", "value", "expected", "std", "z"]), stats
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    from src.preprocessing.aggregator import aggregate_corpus
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed-years", nargs="+", default=["1401"])
+    parser.add_argument("--replay-years", nargs="+", default=["1402", "1403"])
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--threshold", type=float, default=4.0)
+    parser.add_argument("--column", default="total number of vehicles")
+    args = parser.parse_args()
+
+    detector = StreamingAnomalyDetector(args.column, args.threshold)
+    frames, errors = aggregate_corpus(years=args.seed_years, base_path=args.base_path)
+    detector.seed(pd.concat([df for df in frames.values() if not df.empty], ignore_index=True))
+
+    anomalies, stats = replay(detector, replay_records(args.replay_years, args.base_path, column=args.column))
+    print(f"Replayed {stats['records']} records in {stats['seconds']:.2f} s "
+          f"({stats['records per second']:.0f} records/s), {stats['anomalies']} anomalies")
+    if not anomalies.empty:
+        print(anomalies.groupby("axis code")["z"].agg(["count", "min", "max"]).to_string())
+
+
+if __name__ == "__main__":
+    main()
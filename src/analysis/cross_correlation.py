@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from scipy.fft import irfft, next_fast_len, rfft
+
+
+def hourly_matrix(frames, column='total number of vehicles'):
+    """
+    Align the full hourly histories of many axes on one hourly time axis.
+
+    :param frames: Dict of label -> traffic DataFrame with 'date' and 'start hour' (e.g. from aggregate_corpus),
+                   or a DataFrame indexed by hourly timestamps with one column per axis
+    :param column: Column to align when frames is a dict
+    :return: (labels, DatetimeIndex, n x hours float64 array with NaN for missing hours)
+    """
+    if isinstance(frames, pd.DataFrame):
+        wide = frames.astype(np.float64)
+    else:
+        series = {}
+        for label, df in frames.items():
+            if df.empty:
+                continue
+            times = pd.to_datetime(df['date']) + pd.to_timedelta(df['start hour'].astype(np.int64), unit='h')
+            values = pd.Series(df[column].to_numpy(dtype=np.float64, na_value=np.nan), index=times.to_numpy())
+            # Duplicated hours (e.g. overlapping exports) are averaged.
+            series[label] = values.groupby(level=0).mean()
+        wide = pd.DataFrame(series)
+
+    if wide.empty:
+        return list(wide.columns), pd.DatetimeIndex([]), np.empty((len(wide.columns), 0))
+
+    index = pd.date_range(wide.index.min(), wide.index.max(), freq='h')
+    wide = wide.reindex(index)
+    return list(wide.columns), index, wide.to_numpy(dtype=np.float64).T
+
+
+class LaggedCorrelation:
+    def __init__(self, frames, column='total number of vehicles', max_lag=12, min_periods=168):
+        """
+        Lagged cross-correlation between the full hourly histories of every pair of axes, computed
+        for all pairs and lags at once with FFTs.
+
+        The correlation at lag k pairs each hour t of axis a with hour t + k of axis b; a positive
+        best lag means b peaks k hours after a. Missing hours are excluded pairwise at every lag,
+        so each value is the Pearson correlation of the hours both axes have, like Series.corr.
+        Lags beyond 12 hours mostly find the daily cycle again, hence the default max_lag.
+
+        :param frames: Dict of label -> traffic DataFrame, or a wide hourly DataFrame (see hourly_matrix)
+        :param column: Column to correlate
+        :param max_lag: Largest lag, in hours, in either direction
+        :param min_periods: Fewest overlapping hours for a correlation; fewer give NaN
+        """
+        self.column = column
+        self.max_lag = max_lag
+        self.min_periods = min_periods
+        self.labels, self.index, self.matrix = hourly_matrix(frames, column)
+        self.lags = np.arange(-max_lag, max_lag + 1)
+        self._correlations = None
+        self._overlaps = None
+
+    def _spectra(self, size):
+        """FFTs of the standardized values, their squares and the presence masks, zero where missing."""
+        present = ~np.isnan(self.matrix)
+        counts = present.sum(axis=1, keepdims=True)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(self.matrix, axis=1, keepdims=True) / counts
+            std = np.sqrt(np.nansum((self.matrix - mean) ** 2, axis=1, keepdims=True) / counts)
+            values = np.where(present, (self.matrix - mean) / np.where(std > 0, std, 1), 0.0)
+
+        mask = present.astype(np.float64)
+        return rfft(values, size, axis=1), rfft(values ** 2, size, axis=1), rfft(mask, size, axis=1)
+
+    def compute(self):
+        """
+        Compute the correlation of every ordered pair at every lag.
+        :return: (n x n x lags correlations, n x n x lags overlapping hours); [i, j, k] pairs axis i
+                 at hour t with axis j at hour t + lags[k]
+        """
+        if self._correlations is not None:
+            return self._correlations, self._overlaps
+
+        n, hours = self.matrix.shape
+        size = next_fast_len(hours + self.max_lag)
+        values, squares, masks = self._spectra(size)
+        positions = self.lags % size
+
+        correlations = np.full((n, n, len(self.lags)), np.nan)
+        overlaps = np.zeros((n, n, len(self.lags)), dtype=np.int64)
+
+        for i in range(n):
+            # Cross-correlations of axis i with axes i..n-1; conj(A) * B gives sum_t a[t] * b[t + k].
+            others = slice(i, n)
+            products = np.stack([
+                np.conj(masks[i]) * masks[others],
+                np.conj(values[i]) * masks[others],
+                np.conj(masks[i]) * values[others],
+                np.conj(squares[i]) * masks[others],
+                np.conj(masks[i]) * squares[others],
+                np.conj(values[i]) * values[others]
+            ])
+            count, sum_x, sum_y, sum_xx, sum_yy, sum_xy = irfft(products, size, axis=-1)[:, :, positions]
+            count = np.rint(count)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cov = sum_xy - sum_x * sum_y / count
+                var_x = np.maximum(sum_xx - sum_x ** 2 / count, 0)
+                var_y = np.maximum(sum_yy - sum_y ** 2 / count, 0)
+                corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+            corr[count < self.min_periods] = np.nan
+
+            correlations[i, others] = corr
+            overlaps[i, others] = count
+            # corr(b, a) at lag k is corr(a, b) at lag -k.
+            correlations[others, i] = corr[:, ::-1]
+            overlaps[others, i] = count[:, ::-1]
+
+        self._correlations, self._overlaps = correlations, overlaps
+        return correlations, overlaps
+
+    def pair_lags(self, label_a, label_b):
+        """
+        Correlation of two axes at every lag.
+        :return: Series indexed by lag in hours
+        """
+        correlations, overlaps = self.compute()
+        i, j = self.labels.index(label_a), self.labels.index(label_b)
+        return pd.Series(correlations[i, j], index=pd.Index(self.lags, name='lag'), name='correlation')
+
+    def best_lags(self):
+        """
+        Best lag and peak correlation of every pair of axes.
+        :return: DataFrame with one row per pair: axis a, axis b, best lag (hours b peaks after a),
+                 peak correlation, zero lag correlation and the overlapping hours at the best lag
+        """
+        correlations, overlaps = self.compute()
+        first, second = np.triu_indices(len(self.labels), k=1)
+        pairs = correlations[first, second]
+
+        valid = ~np.isnan(pairs).all(axis=1)
+        best = np.zeros(len(pairs), dtype=np.int64)
+        best[valid] = np.nanargmax(pairs[valid], axis=1)
+        rows = np.arange(len(pairs))
+
+        labels = np.array(self.labels, dtype=object)
+        return pd.DataFrame({
+            'axis a': labels[first],
+            'axis b': labels[second],
+            'best lag': np.where(valid, self.lags[best], 0),
+            'peak correlation': np.where(valid, pairs[rows, best], np.nan),
+            'zero lag correlation': pairs[:, self.max_lag],
+            'overlap hours': overlaps[first, second][rows, best]
+        })
+
+    def lag_matrix(self):
+        """
+        Best lag of every ordered pair, labelled by axis: entry (a, b) is how many hours b peaks after a.
+        """
+        correlations, overlaps = self.compute()
+        filled = np.where(np.isnan(correlations), -np.inf, correlations)
+        lags = self.lags[filled.argmax(axis=2)].astype(np.float64)
+        lags[np.isnan(correlations).all(axis=2)] = np.nan
+        return pd.DataFrame(lags, index=self.labels, columns=self.labels)
+
+    def peak_matrix(self):
+        """
+        Peak correlation of every pair over the lags, labelled by axis.
+        """
+        correlations, overlaps = self.compute()
+        return pd.DataFrame(np.fmax.reduce(correlations, axis=2), index=self.labels, columns=self.labels)
@@ -1,3 +1,175 @@
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+
+CLASS_COLUMNS = [f"number of Class {number} vehicles" for number in range(1, 6)]
+SPEEDING_COLUMN = "number of speeding violations"
+SPEED_COLUMN = "average speed"
+
+# Hours below this average speed count as congested (the 'Low' speed category).
+CONGESTION_SPEED = 40
+
+# Criteria of the multi-criteria ranking; every one ranks its highest value first.
+CRITERIA = ["daily_mean_traffic", "max_hourly_mean_traffic"] + \
+           [f"class_{number}_daily_mean" for number in range(1, 6)] + \
+           ["speeding_per_1000_vehicles", "congestion_hours_per_day"]
+
+HOUR_SUMS = [f"hour {hour} sum" for hour in range(HOURS_PER_DAY)]
+HOUR_COUNTS = [f"hour {hour} count" for hour in range(HOURS_PER_DAY)]
+
+
+def rank_descending(table, value_column, rank_column):
+    """
+    Rank the rows of a table by a value column, highest first, and sort them by that rank.
+    :param table: DataFrame with one row per access point
+    """
+    table[rank_column] = table[value_column].rank(ascending=False)
+    return table.sort_values(by=rank_column)
+
+
+def daily_totals(df, traffic_column='total number of vehicles', congestion_speed=CONGESTION_SPEED):
+    """
+    Reduce a traffic frame to one row per (axis, date) holding every sum the ranking criteria need,
+    in a single pass over the rows sorted by axis, date and hour.
+
+    :param df: Traffic DataFrame with axis code, date, start hour, the vehicle class, speeding and speed columns
+    :param congestion_speed: Hours with an average speed below this count as congested
+    :return: DataFrame indexed by (axis code, date) with the traffic, class and speeding totals, the number of
+             congested hours, and the traffic sum and non-null count of every hour of the day
+    """
+    columns = [traffic_column] + CLASS_COLUMNS + [SPEEDING_COLUMN]
+    if df.empty:
+        return pd.DataFrame(columns=columns + ["congestion hours"] + HOUR_SUMS + HOUR_COUNTS,
+                            index=pd.MultiIndex.from_arrays([[], []], names=["axis code", "date"]))
+
+    axes, codes = pd.factorize(df["axis code"].astype(object), sort=True)
+    days = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]")
+    hours = df["start hour"].to_numpy(dtype=np.int64)
+
+    order = np.lexsort((hours, days, axes))
+    axes, days, hours = axes[order], days[order], hours[order]
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+
+    starts = np.append(True, (axes[1:] != axes[:-1]) | (days[1:] != days[:-1]))
+    groups = np.cumsum(starts) - 1
+    starts = np.flatnonzero(starts)
+
+    with np.errstate(invalid="ignore"):
+        speeds = df[SPEED_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        congested = (speeds < congestion_speed).astype(np.float64)
+
+    # Sums treat missing values as 0, like groupby().sum().
+    sums = np.add.reduceat(np.column_stack([np.nan_to_num(values), congested]), starts)
+
+    traffic = values[:, 0]
+    present = ~np.isnan(traffic)
+    hour_sums = np.zeros((len(starts), HOURS_PER_DAY))
+    hour_counts = np.zeros((len(starts), HOURS_PER_DAY))
+    np.add.at(hour_sums, (groups[present], hours[present]), traffic[present])
+    np.add.at(hour_counts, (groups[present], hours[present]), 1)
+
+    index = pd.MultiIndex.from_arrays([codes[axes[starts]], pd.DatetimeIndex(days[starts])],
+                                      names=["axis code", "date"])
+    return pd.DataFrame(np.hstack([sums, hour_sums, hour_counts]), index=index,
+                        columns=columns + ["congestion hours"] + HOUR_SUMS + HOUR_COUNTS)
+
+
+def rank_criteria(daily, traffic_column='total number of vehicles'):
+    """
+    Compute every ranking criterion per axis from (axis, date) totals and rank the axes on each.
+
+    :param daily: Table from daily_totals, for the days to rank over
+    :return: DataFrame indexed by axis code with each criterion, its rank (1 = highest) and the
+             overall rank by mean criterion rank, sorted by overall rank
+    """
+    totals = daily.groupby(level="axis code", sort=True).sum()
+    days = daily.groupby(level="axis code", sort=True).size().to_numpy(dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hourly_means = np.where(totals[HOUR_COUNTS].to_numpy() > 0,
+                                totals[HOUR_SUMS].to_numpy() / totals[HOUR_COUNTS].to_numpy(), np.nan)
+        table = pd.DataFrame({
+            "days": days.astype(np.int64),
+            "daily_mean_traffic": totals[traffic_column].to_numpy() / days,
+            "max_hourly_mean_traffic": np.fmax.reduce(hourly_means, axis=1) if len(totals) else [],
+            **{f"class_{number}_daily_mean": totals[column].to_numpy() / days
+               for number, column in enumerate(CLASS_COLUMNS, start=1)},
+            "speeding_per_1000_vehicles": 1000 * totals[SPEEDING_COLUMN].to_numpy() / totals[traffic_column].to_numpy(),
+            "congestion_hours_per_day": totals["congestion hours"].to_numpy() / days
+        }, index=totals.index)
+
+    for criterion in CRITERIA:
+        table[f"{criterion}_rank"] = table[criterion].rank(ascending=False)
+    table["overall_rank"] = table[[f"{criterion}_rank" for criterion in CRITERIA]].mean(axis=1).rank()
+    return table.sort_values(by="overall_rank")
+
+
+def top_k(table, criterion, k=5):
+    """
+    Return the k axes with the highest value of a criterion, highest first, without sorting the whole table.
+    :param table: Ranking table from rank_criteria
+    """
+    values = table[criterion].to_numpy(dtype=np.float64)
+    values = np.where(np.isnan(values), -np.inf, values)
+    if k < len(values):
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return table.iloc[candidates[np.argsort(-values[candidates], kind="stable")]]
+
+
+class RollingRanker:
+    def __init__(self, window_days=7, traffic_column='total number of vehicles', congestion_speed=CONGESTION_SPEED):
+        """
+        Multi-criteria ranking over a rolling window of the latest days, updated as days are appended.
+        Only the (axis, date) totals of the window are kept, so an update costs time proportional to the
+        appended data and the window, not to the history.
+
+        :param window_days: Number of calendar days in the window, ending at the latest date appended
+        :param congestion_speed: Hours with an average speed below this count as congested
+        """
+        self.window_days = window_days
+        self.traffic_column = traffic_column
+        self.congestion_speed = congestion_speed
+        self.window = None
+
+    @property
+    def end_date(self):
+        """Latest date in the window, or None before anything is appended."""
+        if self.window is None or self.window.empty:
+            return None
+        return self.window.index.get_level_values("date").max()
+
+    def append(self, df):
+        """
+        Append traffic rows (e.g. a new day or a new file), merging days that continue ones already in the window.
+        """
+        return self.append_daily(daily_totals(df, self.traffic_column, self.congestion_speed))
+
+    def append_daily(self, daily):
+        """
+        Append (axis, date) totals from daily_totals and drop the days that fall out of the window.
+        """
+        if self.window is not None:
+            daily = pd.concat([self.window, daily])
+            if daily.index.has_duplicates:
+                daily = daily.groupby(level=["axis code", "date"], sort=False).sum()
+
+        dates = daily.index.get_level_values("date")
+        start = dates.max() - pd.Timedelta(days=self.window_days - 1)
+        self.window = daily[dates >= start]
+        return self
+
+    def ranking(self):
+        """Multi-criteria ranking of the current window (see rank_criteria)."""
+        return rank_criteria(self.window, self.traffic_column)
+
+    def top_k(self, criterion="daily_mean_traffic", k=5):
+        """The k axes with the highest value of a criterion in the current window."""
+        return top_k(self.ranking(), criterion, k)
+
+
 class TrafficDataRanker:
     def __init__(self, df, traffic_column='total number of vehicles'):
         """
@@ -8,12 +180,75 @@ class TrafficDataRanker:
         self.df = df.copy()
         self.traffic_column = traffic_column
 
+        # Compact frames store counts as float32 or narrow integers; rank on float64.
+        self.df[traffic_column] = self.df[traffic_column].astype("float64")
+        self._daily = {}
+
+    def daily_totals(self, congestion_speed=CONGESTION_SPEED):
+        """
+        Per (axis, date) totals of every ranking criterion (see daily_totals), computed once per speed threshold.
+        """
+        if congestion_speed not in self._daily:
+            self._daily[congestion_speed] = daily_totals(self.df, self.traffic_column, congestion_speed)
+        return self._daily[congestion_speed]
+
+    def rank_criteria(self, start_date=None, end_date=None, congestion_speed=CONGESTION_SPEED):
+        """
+        Ranks the access points on every criterion at once: daily mean traffic, peak-hour mean, daily
+        mean per vehicle class, speeding violations per 1000 vehicles and congested hours per day.
+        :param start_date: First date included (default: the first in the data)
+        :param end_date: Last date included (default: the last in the data)
+        :param congestion_speed: Hours with an average speed below this count as congested
+        :return: Ranking table (see rank_criteria)
+        """
+        daily = self.daily_totals(congestion_speed)
+        dates = daily.index.get_level_values("date")
+
+        mask = np.ones(len(daily), dtype=bool)
+        if start_date is not None:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= dates <= pd.Timestamp(end_date)
+        return rank_criteria(daily[mask], self.traffic_column)
+
+    def rolling_rankings(self, window_days=7, step_days=7, congestion_speed=CONGESTION_SPEED):
+        """
+        Ranks the access points over a rolling window, e.g. week by week for operations.
+        Each step appends step_days of totals to a RollingRanker instead of re-ranking the history.
+        :return: Dict of window end date -> ranking table
+        """
+        daily = self.daily_totals(congestion_speed)
+        if daily.empty:
+            return {}
+
+        dates = daily.index.get_level_values("date")
+        ranker = RollingRanker(window_days, self.traffic_column, congestion_speed)
+
+        rankings = {}
+        start = dates.min()
+        while start <= dates.max():
+            end = start + pd.Timedelta(days=step_days)
+            step = daily[(dates >= start) & (dates < end)]
+            if not step.empty:
+                ranker.append_daily(step)
+                rankings[end - pd.Timedelta(days=1)] = ranker.ranking()
+            start = end
+        return rankings
+
+    def top_k(self, criterion="daily_mean_traffic", k=5, start_date=None, end_date=None):
+        """
+        Returns the k access points with the highest value of a criterion (see CRITERIA).
+        """
+        if criterion not in CRITERIA:
+            raise ValueError(f"Criterion must be one of {CRITERIA}.")
+        return top_k(self.rank_criteria(start_date, end_date), criterion, k)
+
     def calculate_daily_mean(self):
         """
         Groups by the specified 'group_by' column and calculates the daily mean of traffic volume.
         """
-        daily_mean = self.df.groupby(['axis code', 'date'])[self.traffic_column].sum().reset_index()
-        daily_mean = daily_mean.groupby('axis code')[self.traffic_column].mean().reset_index()
+        daily_mean = self.df.groupby(['axis code', 'date'], observed=True)[self.traffic_column].sum().reset_index()
+        daily_mean = daily_mean.groupby('axis code', observed=True)[self.traffic_column].mean().reset_index()
         daily_mean.rename(columns={self.traffic_column: 'daily_mean_traffic'}, inplace=True)
         return daily_mean
 
@@ -21,8 +256,9 @@ class TrafficDataRanker:
         """
         Groups by the specified 'group_by' column and calculates the mean traffic per hour.
         """
-        hourly_mean = self.df.groupby(['axis code', 'start hour'])[self.traffic_column].mean().reset_index()
-        hourly_max = hourly_mean.groupby('axis code')[self.traffic_column].max().reset_index()
+        hourly_mean = self.df.groupby(['axis code', 'start hour'], observed=True)[self.traffic_column].mean()
+        hourly_mean = hourly_mean.reset_index()
+        hourly_max = hourly_mean.groupby('axis code', observed=True)[self.traffic_column].max().reset_index()
         hourly_max.rename(columns={self.traffic_column: 'max_hourly_mean_traffic'}, inplace=True)
         return hourly_max
 
@@ -30,17 +266,13 @@ class TrafficDataRanker:
         """
         Ranks the access points based on the daily mean traffic volume.
         """
-        daily_mean = self.calculate_daily_mean()
-        daily_mean['daily_mean_rank'] = daily_mean['daily_mean_traffic'].rank(ascending=False)
-        return daily_mean.sort_values(by='daily_mean_rank')
+        return rank_descending(self.calculate_daily_mean(), 'daily_mean_traffic', 'daily_mean_rank')
 
     def rank_by_max_hourly_mean(self):
         """
         Ranks the access points based on the maximum of hourly mean traffic volume.
         """
-        hourly_max = self.calculate_hourly_mean()
-        hourly_max['max_hourly_mean_rank'] = hourly_max['max_hourly_mean_traffic'].rank(ascending=False)
-        return hourly_max.sort_values(by='max_hourly_mean_rank')
+        return rank_descending(self.calculate_hourly_mean(), 'max_hourly_mean_traffic', 'max_hourly_mean_rank')
 
     def evaluate_ranking(self, method='daily_mean'):
         """
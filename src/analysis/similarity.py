@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+METRICS = ("pearson", "spearman", "cosine")
+
+
+class BatchComparer:
+    def __init__(self, profiles, column='total number of vehicles', hours=range(24)):
+        """
+        Stacks many hourly profiles into one matrix so all pairs can be compared at once.
+        :param profiles: List of hourly profile DataFrames (e.g. from aggregate_hourly_mean),
+                         or a dict of label -> DataFrame
+        :param column: Column to compare
+        :param hours: Hours every profile is aligned on; missing hours become NaN
+        """
+        if isinstance(profiles, dict):
+            self.labels = list(profiles.keys())
+            profiles = list(profiles.values())
+        else:
+            self.labels = list(range(len(profiles)))
+
+        self.column = column
+        self.hours = list(hours)
+        self.matrix = np.vstack([
+            df.set_index('start hour')[column].reindex(self.hours).to_numpy(dtype=np.float64)
+            for df in profiles
+        ]) if profiles else np.empty((0, len(self.hours)))
+
+    @staticmethod
+    def _pairwise_pearson(matrix):
+        """
+        Pearson correlation of every pair of rows. Missing values are excluded pairwise,
+        like pandas' Series.corr, using masked matrix products.
+        """
+        missing = np.isnan(matrix)
+
+        if not missing.any():
+            centered = matrix - matrix.mean(axis=1, keepdims=True)
+            norms = np.sqrt((centered ** 2).sum(axis=1))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scaled = centered / norms[:, None]
+            result = scaled @ scaled.T
+            return np.clip(result, -1.0, 1.0, out=result)
+
+        mask = (~missing).astype(np.float64)
+        values = np.where(missing, 0.0, matrix)
+
+        n = mask @ mask.T
+        sum_x = values @ mask.T
+        sum_xx = (values ** 2) @ mask.T
+        sum_xy = values @ values.T
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sum_xy - sum_x * sum_x.T / n
+            var_x = sum_xx - sum_x ** 2 / n
+            result = cov / np.sqrt(var_x * var_x.T)
+
+        result[n < 2] = np.nan
+        return np.clip(result, -1.0, 1.0, out=result)
+
+    def pearson_matrix(self):
+        """
+        Calculates the Pearson correlation between every pair of profiles.
+        :return: n x n array
+        """
+        return self._pairwise_pearson(self.matrix)
+
+    def spearman_matrix(self):
+        """
+        Calculates the Spearman rank correlation between every pair of profiles.
+        Each profile is ranked once over its own hours, so results match
+        DataFrameComparer when profiles have no missing hours.
+        :return: n x n array
+        """
+        ranks = rankdata(self.matrix, axis=1, nan_policy='omit') if self.matrix.size else self.matrix
+        return self._pairwise_pearson(np.asarray(ranks, dtype=np.float64))
+
+    def cosine_matrix(self):
+        """
+        Calculates the Cosine Similarity between every pair of profiles, over the hours both have.
+        :return: n x n array
+        """
+        missing = np.isnan(self.matrix)
+        values = np.where(missing, 0.0, self.matrix)
+
+        dot = values @ values.T
+        if missing.any():
+            squares = (values ** 2) @ (~missing).astype(np.float64).T
+            norms = np.sqrt(squares * squares.T)
+        else:
+            norms = np.sqrt(np.outer((values ** 2).sum(axis=1), (values ** 2).sum(axis=1)))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return dot / norms
+
+    def evaluate_similarity(self, metrics=("pearson",)):
+        """
+        Computes the requested similarity matrices.
+        :param metrics: Any of 'pearson', 'spearman' and 'cosine'
+        :return: Dictionary of metric name -> n x n array
+        """
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Metrics must be among {METRICS}, got {sorted(unknown)}.")
+
+        compute = {"pearson": self.pearson_matrix, "spearman": self.spearman_matrix, "cosine": self.cosine_matrix}
+        return {metric: compute[metric]() for metric in metrics}
+
+    def condensed_distance(self, metric="pearson", similarity=None):
+        """
+        Returns 1 - similarity in condensed form, ready for scipy.cluster.hierarchy.linkage.
+        :param metric: Metric to compute when similarity is not given
+        :param similarity: Precomputed n x n similarity matrix
+        """
+        if similarity is None:
+            similarity = self.evaluate_similarity((metric,))[metric]
+
+        upper = np.triu_indices(len(similarity), k=1)
+        return 1 - similarity[upper]
+
+    def to_frame(self, similarity):
+        """
+        Labels a similarity matrix with the profile labels.
+        """
+        return pd.DataFrame(similarity, index=self.labels, columns=self.labels)
@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.rater import rank_descending
+from src.preprocessing.data_selector import aggregate_columns
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+
+# Day number marking an axis without an open date.
+NO_DAY = np.iinfo(np.int64).min
+
+
+class StreamingProfileReducer:
+    def __init__(self, traffic_column='total number of vehicles', columns=None):
+        """
+        Reduces processed files one at a time into mergeable running state, so hourly profiles and
+        daily-mean rankings of many years never need the concatenated frame in memory.
+
+        Kept per (axis, hour): row count, and sum, non-null count, min and max of every column.
+        Kept per axis: the number of days and the sum, min and max of the daily traffic totals.
+        Only each axis's latest date stays open as an (axis, date) total, since the next file may
+        continue it; earlier dates are folded into the per-axis state. State is therefore bounded
+        by the number of axes, whatever the number of months consumed. Files of one axis must
+        arrive in chronological order, as iter_files and iter_months yield them.
+
+        :param traffic_column: Column the daily totals and rankings use
+        :param columns: Columns of the hourly profiles (default: DataSelector's aggregate_columns)
+        """
+        self.traffic_column = traffic_column
+        self.columns = list(aggregate_columns if columns is None else columns)
+        self._traffic = self.columns.index(traffic_column) if traffic_column in self.columns else None
+
+        self.axis_codes = []
+        self._slots = {}
+        n_columns = len(self.columns)
+
+        self._rows = np.zeros((0, HOURS_PER_DAY))
+        self._sum = np.zeros((0, HOURS_PER_DAY, n_columns))
+        self._count = np.zeros((0, HOURS_PER_DAY, n_columns))
+        self._min = np.full((0, HOURS_PER_DAY, n_columns), np.inf)
+        self._max = np.full((0, HOURS_PER_DAY, n_columns), -np.inf)
+
+        self._days = np.zeros(0)
+        self._day_sum = np.zeros(0)
+        self._day_min = np.full(0, np.inf)
+        self._day_max = np.full(0, -np.inf)
+        self._open_day = np.full(0, NO_DAY, dtype=np.int64)
+        self._open_total = np.zeros(0)
+
+        self.files = 0
+        self.rows = 0
+
+    def _slot_of(self, codes):
+        """Map axis codes to their state rows, growing the state for new axes."""
+        new = [code for code in dict.fromkeys(codes) if code not in self._slots]
+        if new:
+            for code in new:
+                self._slots[code] = len(self.axis_codes)
+                self.axis_codes.append(code)
+
+            def grow(array, fill):
+                return np.concatenate([array, np.full((len(new),) + array.shape[1:], fill, dtype=array.dtype)])
+
+            self._rows, self._sum, self._count = grow(self._rows, 0), grow(self._sum, 0), grow(self._count, 0)
+            self._min, self._max = grow(self._min, np.inf), grow(self._max, -np.inf)
+            self._days, self._day_sum = grow(self._days, 0), grow(self._day_sum, 0)
+            self._day_min, self._day_max = grow(self._day_min, np.inf), grow(self._day_max, -np.inf)
+            self._open_day, self._open_total = grow(self._open_day, NO_DAY), grow(self._open_total, 0)
+
+        return np.array([self._slots[code] for code in codes], dtype=np.int64)
+
+    def update(self, df):
+        """
+        Add one processed file (or any frame) to the running state.
+        :param df: Traffic DataFrame with axis code, date, start hour and the profile columns
+        """
+        if df.empty:
+            return self
+
+        positions, codes = pd.factorize(df["axis code"].astype(object))
+        slots = self._slot_of(list(codes))[positions]
+        hours = df["start hour"].to_numpy(dtype=np.int64)
+        values = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+
+        np.add.at(self._rows, (slots, hours), 1)
+        np.add.at(self._sum, (slots, hours), np.where(present, values, 0))
+        np.add.at(self._count, (slots, hours), present)
+        np.minimum.at(self._min, (slots, hours), np.where(present, values, np.inf))
+        np.maximum.at(self._max, (slots, hours), np.where(present, values, -np.inf))
+
+        traffic = df[self.traffic_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        days = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]").astype(np.int64)
+        keys, key_rows = np.unique(np.column_stack([slots, days]), axis=0, return_inverse=True)
+        totals = np.bincount(key_rows.ravel(), weights=np.nan_to_num(traffic), minlength=len(keys))
+        self._add_days(keys[:, 0], keys[:, 1], totals)
+
+        self.files += 1
+        self.rows += len(df)
+        return self
+
+    def _add_days(self, slots, days, totals):
+        """
+        Add (axis, day) traffic totals, sorted by axis then day, and fold every day before each
+        axis's latest into the per-axis state.
+        """
+        open_days = self._open_day[slots]
+        if (days < open_days).any():
+            raise ValueError("Files of an axis must be consumed in chronological order; "
+                             "a date before that axis's latest date was already folded")
+
+        continued = days == open_days
+        totals = totals + np.where(continued, self._open_total[slots], 0)
+
+        # An open day that the new days do not continue is complete.
+        touched = np.unique(slots)
+        superseded = touched[(self._open_day[touched] != NO_DAY) & ~np.isin(touched, slots[continued])]
+        self._fold(superseded, self._open_total[superseded])
+
+        latest = np.append(slots[1:] != slots[:-1], True)
+        self._fold(slots[~latest], totals[~latest])
+        self._open_day[slots[latest]] = days[latest]
+        self._open_total[slots[latest]] = totals[latest]
+
+    def _fold(self, slots, totals):
+        """Fold completed daily totals into the per-axis day statistics."""
+        np.add.at(self._days, slots, 1)
+        np.add.at(self._day_sum, slots, totals)
+        np.minimum.at(self._day_min, slots, totals)
+        np.maximum.at(self._day_max, slots, totals)
+
+    def consume(self, frames):
+        """
+        Reduce a stream of processed files, e.g. iter_files() or iter_months().
+        :param frames: Iterable of DataFrames or of (year, month, DataFrame) tuples
+        """
+        for item in frames:
+            self.update(item[-1] if isinstance(item, tuple) else item)
+        return self
+
+    def merge(self, other):
+        """
+        Merge the state of another reducer, e.g. one run by another worker. The two must
+        cover disjoint axes or disjoint, consecutive periods (this reducer's being earlier).
+        """
+        if other.columns != self.columns or other.traffic_column != self.traffic_column:
+            raise ValueError("Reducers must reduce the same columns to be merged")
+
+        slots = self._slot_of(other.axis_codes)
+        self._rows[slots] += other._rows
+        self._sum[slots] += other._sum
+        self._count[slots] += other._count
+        self._min[slots] = np.minimum(self._min[slots], other._min)
+        self._max[slots] = np.maximum(self._max[slots], other._max)
+
+        self._days[slots] += other._days
+        self._day_sum[slots] += other._day_sum
+        self._day_min[slots] = np.minimum(self._day_min[slots], other._day_min)
+        self._day_max[slots] = np.maximum(self._day_max[slots], other._day_max)
+
+        opened = other._open_day != NO_DAY
+        order = np.argsort(slots[opened], kind="stable")
+        self._add_days(slots[opened][order], other._open_day[opened][order], other._open_total[opened][order])
+
+        self.files += other.files
+        self.rows += other.rows
+        return self
+
+    def _axis_order(self):
+        """Positions of the axes sorted by code, and the sorted codes typed as groupby returns them."""
+        order = np.asarray(pd.Index(self.axis_codes, dtype=object).argsort(), dtype=np.int64)
+        return order, pd.Series(np.array(self.axis_codes, dtype=object)[order], name='axis code').infer_objects()
+
+    def _day_totals(self):
+        """Per-axis day count and sum, min and max of the daily totals, including the open days."""
+        opened = self._open_day != NO_DAY
+        days = self._days + opened
+        total = self._day_sum + np.where(opened, self._open_total, 0)
+        low = np.where(opened, np.minimum(self._day_min, self._open_total), self._day_min)
+        high = np.where(opened, np.maximum(self._day_max, self._open_total), self._day_max)
+        return days, total, low, high
+
+    @staticmethod
+    def _means(sums, counts):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def hourly_mean(self):
+        """
+        Mean of every column per hour of the day over all axes, as aggregate_hourly_mean returns
+        for the concatenated frame.
+        """
+        hours = np.flatnonzero(self._rows.sum(axis=0))
+        means = self._means(self._sum.sum(axis=0), self._count.sum(axis=0))[hours]
+
+        result = pd.DataFrame(means, columns=self.columns)
+        result.insert(0, "start hour", hours)
+        return result
+
+    def axis_hourly_profile(self):
+        """
+        Per (axis, hour) row count and mean, min and max of every column.
+        :return: DataFrame indexed by axis code and start hour, with a rows column and (statistic, column) columns
+        """
+        order, codes = self._axis_order()
+        positions, hours = np.nonzero(self._rows[order] > 0)
+        slots = order[positions]
+
+        counts = self._count[slots, hours]
+        index = pd.MultiIndex.from_arrays([codes.to_numpy()[positions], hours], names=['axis code', 'start hour'])
+        statistics = {"mean": self._means(self._sum[slots, hours], counts),
+                      "min": np.where(counts > 0, self._min[slots, hours], np.nan),
+                      "max": np.where(counts > 0, self._max[slots, hours], np.nan)}
+
+        profile = pd.concat({stat: pd.DataFrame(values, index=index, columns=self.columns)
+                             for stat, values in statistics.items()}, axis=1)
+        profile.insert(0, "rows", self._rows[slots, hours].astype(np.int64))
+        return profile
+
+    def calculate_daily_mean(self):
+        """Daily mean traffic per axis, as TrafficDataRanker.calculate_daily_mean returns."""
+        order, codes = self._axis_order()
+        days, total, low, high = self._day_totals()
+        return pd.DataFrame({'axis code': codes, 'daily_mean_traffic': (total / days)[order]})
+
+    def calculate_hourly_mean(self):
+        """Maximum hourly mean traffic per axis, as TrafficDataRanker.calculate_hourly_mean returns."""
+        if self._traffic is None:
+            raise ValueError(f"{self.traffic_column} is not one of the reduced columns")
+
+        order, codes = self._axis_order()
+        hourly = self._means(self._sum[:, :, self._traffic], self._count[:, :, self._traffic])
+        return pd.DataFrame({'axis code': codes, 'max_hourly_mean_traffic': np.fmax.reduce(hourly, axis=1)[order]})
+
+    def daily_statistics(self):
+        """Per axis: number of days and the mean, min and max daily traffic total."""
+        order, codes = self._axis_order()
+        days, total, low, high = self._day_totals()
+        return pd.DataFrame({"days": days[order].astype(np.int64), "daily_mean_traffic": (total / days)[order],
+                             "min_daily_traffic": low[order], "max_daily_traffic": high[order]},
+                            index=pd.Index(codes, name='axis code'))
+
+    def evaluate_ranking(self, method='daily_mean'):
+        """
+        Rank access points like TrafficDataRanker.evaluate_ranking ('daily_mean' or 'max_hourly').
+        """
+        if method == 'daily_mean':
+            return rank_descending(self.calculate_daily_mean(), 'daily_mean_traffic', 'daily_mean_rank')
+        elif method == 'max_hourly':
+            return rank_descending(self.calculate_hourly_mean(), 'max_hourly_mean_traffic', 'max_hourly_mean_rank')
+        else:
+            raise ValueError("Method must be either 'daily_mean' or 'max_hourly'.")
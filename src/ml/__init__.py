@@ -1,3 +1,9 @@
+from .features import FeatureSet, build_features
 from .traffic_predictor import TrafficVolumePredictor
 from .speed_predictor import SpeedPredictor
 from .speed_classifier import SpeedClassifier
+from .forecast import TrafficForecaster
+from .training import GroupedTrainer
+from .incremental import IncrementalVolumePredictor, IncrementalSpeedPredictor
+from .persistence import SavedPredictor, load_predictor, save_predictor
+from .service import PredictionService
@@ -0,0 +1,212 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from src.preprocessing.aggregator import MONTHS
+
+MONTH_NUMBERS = {month: number for number, month in enumerate(MONTHS, start=1)}
+
+SPEED_CATEGORIES = ["Low", "Medium", "High"]
+SPEED_BINS = [40, 70]
+
+# Keys of the historical speed profile used as the "predicted_speed" feature when a frame has none.
+SPEED_PROFILE_KEYS = ["axis code", "start hour", "day of week"]
+
+# FeatureSets built by build_features, per dataset and prediction year.
+_feature_sets = {}
+
+
+def categorize_speeds(speeds):
+    """
+    Vectorized categorize_speed: map speeds to 'Low' (< 40), 'Medium' (< 70) or 'High'.
+
+    :param speeds: Array-like of speeds
+    :return: Object array of categories
+    """
+    return np.array(SPEED_CATEGORIES, dtype=object)[np.digitize(np.asarray(speeds, dtype=np.float64), SPEED_BINS)]
+
+
+def _as_float(values):
+    """Convert a column to a float64 array, with NaN for missing values."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class FeatureSet:
+    def __init__(self, df, prediction_year=None, columns=None):
+        """
+        Builds the model features of a traffic frame as typed NumPy arrays, computing each
+        column once. The frame is never modified.
+
+        Columns missing from the frame are derived: 'day of week' from 'start time' (or
+        'date'), 'month' numbers from month names, 'year_from_prediction' from 'year' and
+        'predicted_speed' from the mean speed of the same axis, hour and day of week. That
+        profile is the frame's own, built from its speeds; models scored on part of the frame
+        take it from their training rows instead (see with_speed_profile and split_rows).
+
+        :param df: Traffic DataFrame, e.g. from Aggregator.aggregate_data
+        :param prediction_year: Jalali year to predict; None for prediction inputs,
+                                where year_from_prediction is 0
+        :param columns: Cache of the year-independent columns, shared between the FeatureSets of one frame
+        """
+        self.df = df
+        self.prediction_year = prediction_year
+        self._columns = {} if columns is None else columns
+        self._year_columns = {}
+        self._matrices = {}
+        self._weights = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def _derive(self, name):
+        """Compute a feature column that is not stored in the frame as is."""
+        df = self.df
+
+        if name == "day of week":
+            if "start time" in df.columns:
+                return df["start time"].dt.dayofweek.to_numpy(dtype=np.float64)
+            return pd.to_datetime(df["date"]).dt.dayofweek.to_numpy(dtype=np.float64)
+
+        if name == "month":
+            month = df["month"]
+            if pd.api.types.is_numeric_dtype(month):
+                return _as_float(month)
+            return _as_float(month.astype(object).map(MONTH_NUMBERS))
+
+        if name == "year_from_prediction":
+            if self.prediction_year is None:
+                return np.zeros(len(df))
+            return self.prediction_year - self.column("year")
+
+        if name == "predicted_speed":
+            return self.speed_profile_feature()
+
+        return _as_float(df[name])
+
+    def column(self, name):
+        """Return one feature column as a float64 array."""
+        cache = self._year_columns if name == "year_from_prediction" else self._columns
+        if name not in cache:
+            stored = name in self.df.columns and name not in ("month", "year_from_prediction")
+            cache[name] = _as_float(self.df[name]) if stored else self._derive(name)
+        return cache[name]
+
+    def matrix(self, features):
+        """
+        Return the features as a C-contiguous float64 matrix (rows x features), built once per feature list.
+        """
+        key = tuple(features)
+        if key not in self._matrices:
+            matrix = np.empty((len(self.df), len(features)))
+            for position, feature in enumerate(features):
+                matrix[:, position] = self.column(feature)
+            self._matrices[key] = matrix
+        return self._matrices[key]
+
+    def target(self, column):
+        """Return a target column as a float64 array."""
+        return self.column(column)
+
+    def complete_rows(self, features, target):
+        """Return a mask of the rows where the target and every feature are present."""
+        return ~(np.isnan(self.matrix(features)).any(axis=1) | np.isnan(self.target(target)))
+
+    def training_data(self, features, target):
+        """
+        Return (x, y, weights) for training, keeping only the rows where the target and every feature are present.
+        """
+        x = self.matrix(features)
+        y = self.target(target)
+
+        complete = self.complete_rows(features, target)
+        if complete.all():
+            return x, y, self.weights
+        return x[complete], y[complete], self.weights[complete]
+
+    def split_rows(self, features, target, test_size=0.2, random_state=42):
+        """
+        Split the complete rows into train and test positions, as train_test_split splits
+        training_data. predicted_speed is left out of the completeness check, since it is
+        built after the split from the training rows.
+        :return: (train positions, test positions)
+        """
+        features = [feature for feature in features if feature != "predicted_speed"]
+        rows = np.flatnonzero(self.complete_rows(features, target))
+        return train_test_split(rows, test_size=test_size, random_state=random_state)
+
+    def with_speed_profile(self, profile):
+        """
+        Return a FeatureSet of the same frame whose predicted_speed comes from a given profile,
+        e.g. one fitted on training rows only. Other columns are shared with this one.
+
+        Models using predicted_speed build it this way from their own profile both in training
+        and in predict, so a predicted_speed column in the frame is ignored: the feature always
+        has the definition the model was trained on.
+        """
+        columns = {name: values for name, values in self._columns.items() if name != "predicted_speed"}
+        features = FeatureSet(self.df, self.prediction_year, columns)
+        columns["predicted_speed"] = features.speed_profile_feature(profile)
+        return features
+
+    @property
+    def weights(self):
+        """
+        Recency weights max(1, (prediction_year - 1400) - |year_from_prediction|), one per row.
+        """
+        if self._weights is None:
+            if self.prediction_year is None:
+                return np.ones(len(self.df))
+            max_weight = self.prediction_year - 1400
+            self._weights = np.maximum(1, max_weight - np.abs(self.column("year_from_prediction")))
+        return self._weights
+
+    def speed_profile(self, speed_column="average speed", rows=None):
+        """
+        Mean speed per axis code, start hour and day of week.
+        :param rows: Positions of the rows to average, e.g. the training rows (default: all)
+        :return: Series indexed by SPEED_PROFILE_KEYS
+        """
+        rows = slice(None) if rows is None else rows
+        keys = pd.DataFrame({key: self.column(key)[rows] for key in SPEED_PROFILE_KEYS})
+        return pd.Series(self.column(speed_column)[rows]).groupby([keys[key] for key in SPEED_PROFILE_KEYS]).mean()
+
+    def speed_profile_feature(self, profile=None):
+        """
+        Look up the speed profile for every row, falling back to the mean speed when a
+        (axis code, start hour, day of week) combination has no history.
+        :param profile: Profile from speed_profile() (default: this frame's own)
+        """
+        if profile is None:
+            profile = self.speed_profile()
+
+        index = pd.MultiIndex.from_arrays([self.column(key) for key in SPEED_PROFILE_KEYS])
+        values = profile.reindex(index).to_numpy(dtype=np.float64)
+        return np.where(np.isnan(values), np.nanmean(profile.to_numpy()), values)
+
+
+def build_features(df, prediction_year):
+    """
+    Return the FeatureSet of a frame for a prediction year, building it once per
+    dataset and year so several models trained on the same frame share it.
+    Frames must not be modified after their features are built; see clear_feature_cache.
+    """
+    key = id(df)
+    entry = _feature_sets.get(key)
+    if entry is None or entry[0]() is not df:
+        entry = (weakref.ref(df, lambda ref, key=key: _feature_sets.pop(key, None)), {}, {})
+        _feature_sets[key] = entry
+
+    ref, columns, feature_sets = entry
+    if prediction_year not in feature_sets:
+        feature_sets[prediction_year] = FeatureSet(df, prediction_year, columns)
+    return feature_sets[prediction_year]
+
+
+def clear_feature_cache():
+    """Forget every memoized FeatureSet."""
+    _feature_sets.clear()
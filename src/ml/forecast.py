@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from src.ml.features import SPEED_CATEGORIES, SPEED_PROFILE_KEYS, FeatureSet
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+from src.preprocessing.jalali import nowruz
+
+DAYS_PER_WEEK = 7
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def jalali_year_days(year):
+    """
+    Return the Gregorian dates and Jalali month numbers of every day of a Jalali year.
+    :return: (datetime64[D] array, month number array)
+    """
+    start, end = nowruz(year), nowruz(year + 1)
+    days = np.arange(start, end, dtype="datetime64[D]")
+
+    day_of_year = np.arange(len(days))
+    months = np.where(day_of_year < 186, day_of_year // 31 + 1, np.minimum((day_of_year - 186) // 30 + 7, 12))
+    return days, months
+
+
+class TrafficForecaster:
+    def __init__(self, volume_predictor, speed_predictor=None, speed_classifier=None, history=None):
+        """
+        Forecasts a whole (axis x day x hour) grid with trained predictors: volume, speed and
+        speed category, each in one batched predict call per chunk.
+
+        Each speed model gets predicted_speed exactly as in training: the mean speed of the axis,
+        hour and day of week over its own training rows (see SpeedPredictor.speed_profile).
+        The classifier is not fed the speed model's output, since it never saw such values in
+        training. Predicted volume is not chained into the speed models either: none of them
+        takes volume as a feature, so the three predictions are independent given the grid.
+
+        :param volume_predictor: Trained TrafficVolumePredictor
+        :param speed_predictor: Trained SpeedPredictor, or None
+        :param speed_classifier: Trained SpeedClassifier, or None
+        :param history: Traffic frame the speed profile of models without one is taken from
+                        (default: the speed predictor's or classifier's training frame)
+        """
+        self.volume_predictor = volume_predictor
+        self.speed_predictor = speed_predictor
+        self.speed_classifier = speed_classifier
+
+        if history is None:
+            trained = speed_predictor or speed_classifier or volume_predictor
+            history = trained.df
+        self.history = history
+        self.history_features = FeatureSet(history)
+
+    def history_axis_codes(self):
+        """Return the axis codes in the history, sorted."""
+        codes = self.history_features.column("axis code")
+        return np.unique(codes[~np.isnan(codes)]).astype(np.int64)
+
+    def model_profile(self, predictor):
+        """Return the speed profile a predictor was trained with, or the history's when it has none."""
+        profile = getattr(predictor, "speed_profile", None)
+        profile = profile() if callable(profile) else profile
+        return self.history_features.speed_profile() if profile is None else profile
+
+    def speed_profile_table(self, axis_codes, profile=None):
+        """
+        Dense (axis, hour, day of week) table of mean speeds. Combinations without a profile
+        value fall back to the mean speed of the axis, then of the whole profile.
+        :param profile: Speed profile from FeatureSet.speed_profile (default: the history's)
+        """
+        if profile is None:
+            profile = self.history_features.speed_profile()
+        overall = np.nanmean(profile.to_numpy(dtype=np.float64))
+        profile = profile.reindex(pd.MultiIndex.from_product(
+            [np.asarray(axis_codes, dtype=np.float64), np.arange(HOURS_PER_DAY, dtype=np.float64),
+             np.arange(DAYS_PER_WEEK, dtype=np.float64)], names=SPEED_PROFILE_KEYS))
+
+        table = profile.to_numpy().reshape(len(axis_codes), HOURS_PER_DAY, DAYS_PER_WEEK)
+        with np.errstate(invalid="ignore"):
+            axis_means = np.nanmean(table.reshape(len(axis_codes), -1), axis=1)
+        axis_means = np.where(np.isnan(axis_means), overall, axis_means)
+        return np.where(np.isnan(table), axis_means[:, None, None], table)
+
+    def grid_chunk(self, axis_codes, days, months, start, stop):
+        """
+        Feature columns of grid rows start..stop, ordered by axis, day and hour.
+        :return: Dict of column name -> array, plus the axis, day and hour positions
+        """
+        rows = np.arange(start, stop)
+        hours_per_axis = len(days) * HOURS_PER_DAY
+
+        axis = rows // hours_per_axis
+        day = (rows // HOURS_PER_DAY) % len(days)
+        hour = rows % HOURS_PER_DAY
+        day_of_week = (days[day].astype(np.int64) + 3) % DAYS_PER_WEEK
+
+        columns = {
+            "start hour": hour.astype(np.float64),
+            "day of week": day_of_week.astype(np.float64),
+            "month": months[day].astype(np.float64),
+            "axis code": axis_codes[axis].astype(np.float64),
+            "year_from_prediction": np.zeros(len(rows))
+        }
+        return columns, axis, day, hour
+
+    @staticmethod
+    def _predict(predictor, columns):
+        """Run one batched predict call on the predictor's features."""
+        matrix = np.empty((len(columns["start hour"]), len(predictor.features)))
+        for position, feature in enumerate(predictor.features):
+            matrix[:, position] = columns[feature]
+        return predictor.model.predict(matrix)
+
+    def iter_forecast(self, year=1404, axis_codes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Yield the forecast in long-format chunks of at most chunk_size rows, so memory stays
+        bounded by the chunk size whatever the number of axes.
+        """
+        axis_codes = self.history_axis_codes() if axis_codes is None else np.asarray(axis_codes, dtype=np.int64)
+        days, months = jalali_year_days(year)
+        profiles = {predictor: self.speed_profile_table(axis_codes, self.model_profile(predictor))
+                    for predictor in (self.speed_predictor, self.speed_classifier)
+                    if predictor is not None and "predicted_speed" in predictor.features}
+        total = len(axis_codes) * len(days) * HOURS_PER_DAY
+
+        for start in range(0, total, chunk_size):
+            stop = min(start + chunk_size, total)
+            columns, axis, day, hour = self.grid_chunk(axis_codes, days, months, start, stop)
+            day_of_week = columns["day of week"].astype(np.int64)
+
+            chunk = {
+                "axis code": axis_codes[axis].astype(np.int32),
+                "date": days[day].astype("datetime64[ns]"),
+                "start hour": hour.astype(np.uint8),
+                "month": months[day].astype(np.uint8),
+                "predicted volume": self._predict(self.volume_predictor, columns).astype(np.float32)
+            }
+
+            if self.speed_predictor is not None:
+                if self.speed_predictor in profiles:
+                    columns["predicted_speed"] = profiles[self.speed_predictor][axis, hour, day_of_week]
+                chunk["predicted speed"] = self._predict(self.speed_predictor, columns).astype(np.float32)
+
+            if self.speed_classifier is not None:
+                if self.speed_classifier in profiles:
+                    columns["predicted_speed"] = profiles[self.speed_classifier][axis, hour, day_of_week]
+                chunk["speed category"] = pd.Categorical(self._predict(self.speed_classifier, columns),
+                                                         categories=SPEED_CATEGORIES)
+
+            yield pd.DataFrame(chunk)
+
+    def forecast(self, year=1404, axis_codes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Forecast every hour of a Jalali year for the given axes.
+
+        :param year: Jalali year to forecast
+        :param axis_codes: Axis codes to forecast (default: every axis in the history)
+        :param chunk_size: Rows per batched predict call
+        :return: Long-format DataFrame with axis code, date, start hour, Jalali month, predicted
+                 volume and, when the models are given, predicted speed and speed category
+        """
+        return pd.concat(list(self.iter_forecast(year, axis_codes, chunk_size)), ignore_index=True)
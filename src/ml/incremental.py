@@ -0,0 +1,183 @@
+import copy
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.ml.features import SPEED_PROFILE_KEYS, FeatureSet
+from src.ml.training import VOLUME_FEATURES
+
+SPEED_FEATURES = ["start hour", "day of week", "month", "axis code", "predicted_speed", "year_from_prediction"]
+
+
+class RunningSpeedProfile:
+    def __init__(self):
+        """
+        Mean speed per axis code, start hour and day of week (see FeatureSet.speed_profile),
+        kept as running sums and counts so it can be updated one month at a time.
+        """
+        self.sums = None
+        self.counts = None
+
+    def update(self, features, speed_column="average speed"):
+        """
+        Add the speeds of a FeatureSet to the profile.
+        :param features: FeatureSet of the new rows
+        """
+        speeds = pd.Series(features.column(speed_column))
+        grouped = speeds.groupby([pd.Series(features.column(key)) for key in SPEED_PROFILE_KEYS]).agg(["sum", "count"])
+        grouped.index.names = SPEED_PROFILE_KEYS
+
+        if self.sums is None:
+            self.sums, self.counts = grouped["sum"], grouped["count"].astype(np.float64)
+        else:
+            self.sums = self.sums.add(grouped["sum"], fill_value=0)
+            self.counts = self.counts.add(grouped["count"], fill_value=0)
+
+    def profile(self):
+        """Return the mean speeds so far, indexed by SPEED_PROFILE_KEYS."""
+        if self.sums is None:
+            return pd.Series(dtype=np.float64)
+        counts = self.counts[self.counts > 0]
+        return self.sums[counts.index] / counts
+
+
+class IncrementalPredictor:
+    def __init__(self, features, target_column, estimator=None, prediction_year=1404, epochs=1):
+        """
+        Trains a regressor one month at a time with partial_fit, so updating the model with a
+        new month costs time proportional to that month rather than to the whole history.
+
+        Rows get the same recency weights as train_model for the same prediction year. Features
+        are standardized with running statistics before reaching the estimator. For models using
+        predicted_speed, the speed profile is kept as running sums: every month is scored with
+        the profile of the months before it, then trained with the profile including itself.
+
+        :param features: Feature columns
+        :param target_column: Column to predict
+        :param estimator: Unfitted regressor supporting partial_fit (default: SGDRegressor)
+        :param prediction_year: Year the recency weights point to
+        :param epochs: Passes over every month
+        """
+        self.features = list(features)
+        self.target_column = target_column
+        self.estimator = SGDRegressor(random_state=42) if estimator is None else estimator
+        self.scaler = StandardScaler()
+        self.prediction_year = prediction_year
+        self.epochs = epochs
+
+        self.profile = RunningSpeedProfile() if "predicted_speed" in self.features else None
+        self.months = []
+        self.rows = 0
+        self.axis_codes = set()
+
+    @property
+    def model(self):
+        """The scaler and estimator as one fitted pipeline, for predict-only consumers."""
+        return make_pipeline(self.scaler, self.estimator)
+
+    @property
+    def last_month(self):
+        """(year, month) of the last month trained on, to pass as since= to iter_months; None before training."""
+        return self.months[-1] if self.months else None
+
+    def speed_profile(self):
+        """Return the running speed profile, or None when the model does not use predicted_speed."""
+        return None if self.profile is None else self.profile.profile()
+
+    def _feature_set(self, df, prediction_year):
+        """FeatureSet whose predicted_speed comes from the running profile (see FeatureSet.with_speed_profile)."""
+        features = FeatureSet(df, prediction_year)
+        if self.profile is not None:
+            features = features.with_speed_profile(self.speed_profile())
+        return features
+
+    def partial_fit(self, df, label=None):
+        """
+        Update the model with one month of data. The month is scored before the model learns
+        from it, so the returned metrics measure the model on data it has not seen.
+
+        :param df: Traffic DataFrame of the new month, e.g. from Aggregator.iter_months
+        :param label: (year, month) of the data, recorded in self.months
+        :return: Dict with the rows used and, after the first month, the RMSE and R² before the update
+        """
+        metrics = {}
+        if self.months:
+            # Scored with the profile as it stood, before this month's speeds are added to it.
+            x, y, weights = self._feature_set(df, self.prediction_year).training_data(self.features,
+                                                                                     self.target_column)
+            if len(y):
+                y_pred = self.model.predict(x)
+                metrics["rmse"] = np.sqrt(mean_squared_error(y, y_pred))
+                metrics["r2"] = r2_score(y, y_pred) if len(y) > 1 else np.nan
+
+        if self.profile is not None:
+            self.profile.update(FeatureSet(df, self.prediction_year))
+        if not self.months or self.profile is not None:
+            x, y, weights = self._feature_set(df, self.prediction_year).training_data(self.features,
+                                                                                     self.target_column)
+        metrics = {"rows": len(y), **metrics}
+        if not len(y):
+            return metrics
+
+        self.axis_codes.update(np.unique(x[:, self.features.index("axis code")]).astype(np.int64).tolist())
+        self.scaler.partial_fit(x)
+        x = self.scaler.transform(x)
+        for _ in range(self.epochs):
+            self.estimator.partial_fit(x, y, sample_weight=weights)
+
+        self.months.append(label)
+        self.rows += len(y)
+        return metrics
+
+    def fit_months(self, months):
+        """
+        Train on a stream of months, e.g. from aggregator.iter_months or Aggregator.iter_months.
+        :param months: Iterable of (year, month, DataFrame)
+        :return: DataFrame of the per-month metrics, indexed by year and month
+        """
+        records = []
+        for year, month, df in months:
+            metrics = self.partial_fit(df, (year, month))
+            records.append({"year": year, "month": month, **metrics})
+            if "rmse" in metrics:
+                print(f"{year} {month}: {metrics['rows']} rows, RMSE before update: {round(metrics['rmse'], 2)}")
+            else:
+                print(f"{year} {month}: {metrics['rows']} rows")
+
+        if not records:
+            return pd.DataFrame(columns=["rows", "rmse", "r2"])
+        return pd.DataFrame(records).set_index(["year", "month"])
+
+    def predict(self, x_input):
+        """Predict for new data; year_from_prediction is 0."""
+        return self.model.predict(self._feature_set(x_input, None).matrix(self.features))
+
+    def snapshot(self):
+        """Return an independent copy that can be updated without changing this model."""
+        return copy.deepcopy(self)
+
+    def save(self, path):
+        """Write the model, scaler and running profile to a joblib file."""
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """Load a model written by save, ready for more partial_fit calls."""
+        return joblib.load(path)
+
+
+class IncrementalVolumePredictor(IncrementalPredictor):
+    def __init__(self, estimator=None, prediction_year=1404, epochs=1, target_column="total number of vehicles"):
+        """Incremental counterpart of TrafficVolumePredictor, with the same features."""
+        super().__init__(VOLUME_FEATURES, target_column, estimator, prediction_year, epochs)
+
+
+class IncrementalSpeedPredictor(IncrementalPredictor):
+    def __init__(self, estimator=None, prediction_year=1404, epochs=1, target_column="average speed"):
+        """Incremental counterpart of SpeedPredictor, with the same features."""
+        super().__init__(SPEED_FEATURES, target_column, estimator, prediction_year, epochs)
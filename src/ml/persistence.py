@@ -0,0 +1,174 @@
+import datetime
+import json
+import os
+import warnings
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from persiantools.jdatetime import JalaliDate
+
+from src.ml.features import SPEED_PROFILE_KEYS, FeatureSet
+
+# Bump when the layout of saved predictors changes.
+FORMAT_VERSION = 2
+
+METADATA_FILE = "metadata.json"
+MODEL_FILE = "model.joblib"
+PROFILE_FILE = "speed_profile.csv"
+
+
+@lru_cache(maxsize=4096)
+def jalali_month(date):
+    """Return the Jalali month number of a Gregorian date."""
+    return JalaliDate(date).month
+
+
+def trained_axis_codes(predictor):
+    """
+    Return the sorted axis codes a predictor was trained on: the ones seen by partial_fit for
+    incremental models, those of the speed profile for models using predicted_speed, otherwise
+    those of the training frame.
+    """
+    codes = getattr(predictor, "axis_codes", None)
+    if codes is None and "predicted_speed" in predictor.features:
+        codes = predictor.speed_profile().index.get_level_values(0)
+    if codes is None:
+        codes = FeatureSet(predictor.df).column("axis code")
+
+    codes = np.asarray(list(codes), dtype=np.float64)
+    return sorted(int(code) for code in np.unique(codes[~np.isnan(codes)]))
+
+
+def save_predictor(predictor, directory, name=None):
+    """
+    Save a trained predictor's model with its feature schema, so it can be loaded
+    without its training data.
+
+    Writes metadata.json (class, features, target, trained axis codes, versions), model.joblib and, for
+    models using predicted_speed, the historical speed profile they were trained with.
+
+    :param predictor: Trained TrafficVolumePredictor, SpeedPredictor, SpeedClassifier or incremental predictor
+    :param directory: Directory to write, created if needed
+    :param name: Label stored in the metadata (default: the predictor class name)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    metadata = {
+        "format version": FORMAT_VERSION,
+        "name": name or type(predictor).__name__,
+        "class": type(predictor).__name__,
+        "model class": type(predictor.model).__name__,
+        "features": list(predictor.features),
+        "feature dtype": "float64",
+        "target column": predictor.target_column,
+        "axis codes": trained_axis_codes(predictor),
+        "scikit-learn version": sklearn.__version__,
+        "saved at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    }
+
+    if "predicted_speed" in predictor.features:
+        # The profile the model was trained with: its training rows, or the running profile.
+        profile = predictor.speed_profile()
+        profile.rename("speed").to_csv(os.path.join(directory, PROFILE_FILE))
+        metadata["speed profile"] = PROFILE_FILE
+
+    joblib.dump(predictor.model, os.path.join(directory, MODEL_FILE))
+
+    with open(os.path.join(directory, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_predictor(directory, lazy=True):
+    """
+    Load a predictor saved with save_predictor.
+    With lazy=True only the metadata is read now; the model is loaded on first use.
+    """
+    predictor = SavedPredictor(directory)
+    if not lazy:
+        predictor.load()
+    return predictor
+
+
+class SavedPredictor:
+    def __init__(self, directory):
+        """
+        A predictor loaded from disk. Reads the metadata immediately and the model
+        and speed profile only when first needed.
+
+        :param directory: Directory written by save_predictor
+        """
+        self.directory = directory
+
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+
+        if self.metadata.get("format version") != FORMAT_VERSION:
+            raise ValueError(f"{directory} has format version {self.metadata.get('format version')}, "
+                             f"expected {FORMAT_VERSION}")
+
+        self.features = self.metadata["features"]
+        self.target_column = self.metadata["target column"]
+        self.axis_codes = set(self.metadata["axis codes"])
+        self._model = None
+        self._profile = None
+
+    def load(self):
+        """Load the model and speed profile now."""
+        if self._model is None:
+            if self.metadata["scikit-learn version"] != sklearn.__version__:
+                warnings.warn(f"{self.directory} was saved with scikit-learn {self.metadata['scikit-learn version']}"
+                              f", running {sklearn.__version__}")
+            self._model = joblib.load(os.path.join(self.directory, MODEL_FILE))
+
+        if self._profile is None and "speed profile" in self.metadata:
+            profile = pd.read_csv(os.path.join(self.directory, self.metadata["speed profile"]),
+                                  index_col=list(range(len(SPEED_PROFILE_KEYS))))
+            self._profile = profile["speed"]
+
+    @property
+    def model(self):
+        self.load()
+        return self._model
+
+    @property
+    def speed_profile(self):
+        self.load()
+        return self._profile
+
+    def predict(self, x_input):
+        """Predict from a DataFrame holding the feature columns, like the original predictor."""
+        return self.model.predict(FeatureSet(x_input).matrix(self.features))
+
+    def hour_features(self, axis_codes, dates, hours):
+        """
+        Build the feature matrix of single-hour requests.
+
+        :param axis_codes: Axis code per request
+        :param dates: Gregorian date per request (datetime.date or ISO string)
+        :param hours: Start hour per request
+        :raises KeyError: For an axis code the model was not trained on, which it would extrapolate
+        """
+        axis_codes = np.asarray(axis_codes, dtype=np.float64)
+        unknown = set(axis_codes.tolist()) - self.axis_codes
+        if unknown:
+            raise KeyError(int(min(unknown)))
+
+        dates = pd.to_datetime(pd.Series(dates))
+        frame = pd.DataFrame({
+            "axis code": axis_codes,
+            "start hour": np.asarray(hours, dtype=np.float64),
+            "day of week": dates.dt.dayofweek.to_numpy(dtype=np.float64),
+            "month": np.array([jalali_month(date.date()) for date in dates], dtype=np.float64)
+        })
+
+        features = FeatureSet(frame)
+        if "predicted_speed" in self.features:
+            frame["predicted_speed"] = features.speed_profile_feature(self.speed_profile)
+        return frame
+
+    def predict_hours(self, axis_codes, dates, hours):
+        """Predict many single-hour requests in one batched call."""
+        return self.predict(self.hour_features(axis_codes, dates, hours))
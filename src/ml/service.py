@@ -0,0 +1,299 @@
+"""
+Local HTTP prediction service for a predictor saved with save_predictor.
+
+    python -m src.ml.service MODEL_DIR [--host 127.0.0.1] [--port 8000]
+
+    GET  /predict?axis=113207&date=2025-03-21&hour=8
+    POST /predict   [{"axis": 113207, "date": "2025-03-21", "hour": 8}, ...]
+    GET  /stats
+"""
+import argparse
+import collections
+import datetime
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src.ml.persistence import load_predictor
+
+
+class _Request:
+    """One pending single-hour request, completed by the batching thread."""
+    __slots__ = ("key", "event", "value", "error")
+
+    def __init__(self, key):
+        self.key = key
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PredictionService:
+    def __init__(self, predictor, max_batch_size=256, max_wait=0.005, cache_size=10000, latency_window=10000):
+        """
+        Answers single-hour predictions, coalescing concurrent requests into micro-batches.
+
+        A background thread collects pending requests until max_batch_size are queued or
+        max_wait seconds have passed since the first one, then predicts them in one call.
+        Recent (axis, date, hour) answers are kept in an LRU cache of cache_size entries.
+
+        :param predictor: SavedPredictor (see persistence.load_predictor)
+        :param latency_window: Number of recent request latencies kept for the statistics
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+
+        self._queue = queue.Queue()
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._batch_sizes = collections.Counter()
+        self.requests = 0
+        self.cache_hits = 0
+        self.errors = 0
+
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._worker.start()
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return True, self._cache[key]
+        return False, None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def predict(self, axis_code, date, hour, timeout=30):
+        """
+        Predict one hour, waiting for the batch it joins.
+        :param date: Gregorian date as an ISO string
+        """
+        start = time.perf_counter()
+        key = (int(axis_code), datetime.date.fromisoformat(str(date)).isoformat(), int(hour))
+        if not 0 <= key[2] <= 23:
+            raise ValueError(f"Hour must be between 0 and 23, got {hour}")
+
+        hit, value = self._cached(key)
+        if not hit:
+            request = _Request(key)
+            self._queue.put(request)
+            if not request.event.wait(timeout):
+                raise TimeoutError(f"No prediction for {key} within {timeout} s")
+            if request.error is not None:
+                raise request.error
+            value = request.value
+
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.perf_counter() - start)
+        return value
+
+    def _next_batch(self):
+        """Block for a first request, then gather more until the batch is full or max_wait passed."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = [request for request in self._next_batch() if request is not None]
+            if not batch:
+                continue
+
+            # Requests for the same key within a batch are predicted once.
+            keys = list(dict.fromkeys(request.key for request in batch))
+            values, failures = self._predict_keys(keys)
+
+            for key, value in values.items():
+                self._store(key, value)
+
+            with self._lock:
+                self._batch_sizes[len(keys)] += 1
+                self.errors += sum(request.key in failures for request in batch)
+
+            for request in batch:
+                if request.key in failures:
+                    request.error = failures[request.key]
+                else:
+                    request.value = values[request.key]
+                request.event.set()
+
+    def _predict_keys(self, keys):
+        """
+        Predict a batch of keys in one call. When the call fails, each key is predicted on its
+        own, so one bad key only fails the requests for that key.
+        :return: (dict of key -> value, dict of key -> exception)
+        """
+        try:
+            return self._predict_batch(keys), {}
+        except Exception as e:
+            if len(keys) == 1:
+                return {}, {keys[0]: e}
+
+        values, failures = {}, {}
+        for key in keys:
+            try:
+                values.update(self._predict_batch([key]))
+            except Exception as e:
+                failures[key] = e
+        return values, failures
+
+    def _predict_batch(self, keys):
+        axis_codes, dates, hours = zip(*keys)
+        return dict(zip(keys, np.asarray(self.predictor.predict_hours(axis_codes, dates, hours)).tolist()))
+
+    def close(self):
+        """Stop the batching thread."""
+        self._running = False
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self):
+        """
+        Return request count, cache hit rate, latency percentiles (ms) and batch-size statistics.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            sizes = np.repeat(list(self._batch_sizes.keys()), list(self._batch_sizes.values()))
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "cache hits": self.cache_hits,
+                "cache hit rate": self.cache_hits / self.requests if self.requests else 0.0,
+                "cache entries": len(self._cache),
+                "latency ms": {
+                    "mean": float(latencies.mean()) if len(latencies) else None,
+                    "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                    "p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                    "p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                    "max": float(latencies.max()) if len(latencies) else None
+                },
+                "batches": int(len(sizes)),
+                "batch size": {
+                    "mean": float(sizes.mean()) if len(sizes) else None,
+                    "max": int(sizes.max()) if len(sizes) else None,
+                    "histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())}
+                }
+            }
+
+
+class _BadRequest(ValueError):
+    """A request missing a parameter."""
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self, item):
+        missing = [name for name in ("axis", "date", "hour") if name not in item]
+        if missing:
+            raise _BadRequest(f"Missing parameter {', '.join(missing)}")
+
+        axis, date, hour = item["axis"], item["date"], item["hour"]
+        return {"axis": int(axis), "date": date, "hour": int(hour),
+                "prediction": self.service.predict(axis, date, hour)}
+
+    def _respond(self, answer):
+        """
+        Send the result of answer() as JSON, mapping failures to error responses: 400 for
+        bad input, 404 for keys the model does not know, 504 for timeouts and 500 otherwise.
+        """
+        try:
+            payload = answer()
+        except _BadRequest as e:
+            return self._send(400, {"error": str(e)})
+        except KeyError as e:
+            return self._send(404, {"error": f"Unknown key {e}"})
+        except (ValueError, TypeError) as e:
+            return self._send(400, {"error": str(e)})
+        except TimeoutError as e:
+            return self._send(504, {"error": str(e)})
+        except Exception as e:
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        self._send(200, payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            return self._send(200, self.service.stats())
+        if url.path != "/predict":
+            return self._send(404, {"error": f"Unknown path {url.path}"})
+
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        self._respond(lambda: self._answer(query))
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/predict":
+            return self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def answer():
+            items = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            return [self._answer(item) for item in items]
+
+        self._respond(answer)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host="127.0.0.1", port=8000):
+    """Create a threading HTTP server answering with the given PredictionService."""
+    handler = type("BoundPredictionHandler", (PredictionHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("model_dir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=0.005, help="seconds to wait for a batch to fill")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    service = PredictionService(load_predictor(args.model_dir), args.max_batch_size, args.max_wait, args.cache_size)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {args.model_dir} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.model_selection import train_test_split
+
+from src.ml.features import SPEED_CATEGORIES, FeatureSet, build_features, categorize_speeds
 
 
 def categorize_speed(speed):
@@ -27,28 +28,28 @@ class SpeedClassifier:
         self.features = ["start hour", "day of week", "month", "axis code", "predicted_speed",
                          "year_from_prediction"]
 
-        self.df = dataframe.copy()
+        self.df = dataframe
         self.target_column = target_column
-
-        self.df["day of week"] = self.df["start time"].dt.dayofweek
-        self.df['speed category'] = self.df[self.target_column].apply(categorize_speed)
+        self.profile = None
 
     def train_model(self, prediction_year=1404):
         """
-        Trains the Random Forest Classifier model on the training data.
+        Trains the Random Forest Classifier model on the training data. The predicted_speed
+        profile is fitted on the training rows only.
         """
-        self.df["year_from_prediction"] = prediction_year - self.df["year"]
-
-        x = self.df[self.features]
-        y = self.df['speed category']
+        features = build_features(self.df, prediction_year)
+        train_rows, test_rows = features.split_rows(self.features, self.target_column)
 
-        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
+        self.profile = features.speed_profile(self.target_column, train_rows)
+        features = features.with_speed_profile(self.profile)
+        x = features.matrix(self.features)
+        y = categorize_speeds(features.target(self.target_column))
 
-        self.model.fit(x_train, y_train)
+        self.model.fit(x[train_rows], y[train_rows])
 
-        y_pred = self.model.predict(x_test)
+        y_test, y_pred = y[test_rows], self.model.predict(x[test_rows])
         print("Speed Classification Report:")
-        print(classification_report(y_test, y_pred, target_names=["Low", "Medium", "High"]))
+        print(classification_report(y_test, y_pred, labels=SPEED_CATEGORIES, zero_division=0))
         print("Model Evaluation:")
         print(f"Accuracy: {accuracy_score(y_test, y_pred)}")
 
@@ -59,10 +60,12 @@ class SpeedClassifier:
         :param input_data: DataFrame containing the features for prediction
         :return: Predicted traffic speed category
         """
-        input_data["year_from_prediction"] = 0
+        features = FeatureSet(input_data).with_speed_profile(self.profile)
+        return self.model.predict(features.matrix(self.features))
 
-        input_features = input_data[self.features]
-        return self.model.predict(input_features)
+    def speed_profile(self):
+        """Return the speed profile predicted_speed was built from in training."""
+        return self.profile
 
     def feature_importance(self):
         """
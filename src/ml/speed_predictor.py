@@ -1,6 +1,8 @@
+import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
+
+from src.ml.features import FeatureSet, build_features
 
 
 class SpeedPredictor:
@@ -8,35 +10,38 @@ class SpeedPredictor:
         self.model = model
         self.features = ["start hour", "day of week", "month", "axis code", "predicted_speed",
                          "year_from_prediction"]
-        dataframe["day of week"] = dataframe["start time"].dt.dayofweek
         self.df = dataframe
         self.target_column = target_column
+        self.profile = None
 
     def train_model(self, prediction_year=1404):
-        """ Train the model using recency-based weighting """
-
-        df = self.df.copy()
-        df["year_from_prediction"] = prediction_year - df["year"]
-
-        x = df[self.features]
-        y = df[self.target_column]
-
-        max_weight = prediction_year - 1400
-        df['weight'] = df['year_from_prediction'].apply(lambda i: max(1, max_weight - abs(i)))
-
-        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
-        self.model.fit(x_train, y_train, sample_weight=df.loc[x_train.index, 'weight'])
-
-        y_pred = self.model.predict(x_test)
-        mse = mean_squared_error(y_test, y_pred, squared=False)
+        """
+        Train the model using recency-based weighting. The predicted_speed profile is
+        fitted on the training rows only, so the test rows are scored on speeds the
+        feature has not seen.
+        """
+        features = build_features(self.df, prediction_year)
+        train_rows, test_rows = features.split_rows(self.features, self.target_column)
+
+        self.profile = features.speed_profile(self.target_column, train_rows)
+        features = features.with_speed_profile(self.profile)
+        x, y, weights = features.matrix(self.features), features.target(self.target_column), features.weights
+
+        self.model.fit(x[train_rows], y[train_rows], sample_weight=weights[train_rows])
+
+        y_test, y_pred = y[test_rows], self.model.predict(x[test_rows])
+        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
         r2 = r2_score(y_test, y_pred)
 
         print("Speed Model Evaluation:")
-        print(f"MSE: {round(mse, 2)}")
+        print(f"RMSE: {round(rmse, 2)}")
         print(f"R² score: {round(r2, 3)}")
 
+    def speed_profile(self):
+        """Return the speed profile predicted_speed was built from in training."""
+        return self.profile
+
     def predict(self, x_input):
-        x_input = x_input.copy()
-        x_input["year_from_prediction"] = 0  # since it's the target year
-        x_input = x_input[self.features]
-        return self.model.predict(x_input)
+        # year_from_prediction is 0; predicted_speed comes from the training profile.
+        features = FeatureSet(x_input).with_speed_profile(self.profile)
+        return self.model.predict(features.matrix(self.features))
@@ -0,0 +1,154 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from threadpoolctl import threadpool_limits
+
+from src.ml.features import FeatureSet, build_features
+
+VOLUME_FEATURES = ["start hour", "day of week", "month", "axis code", "year_from_prediction"]
+
+
+def month_periods(features):
+    """Return a (Jalali year * 12 + month) period number per row of a FeatureSet."""
+    return (features.column("year") * 12 + features.column("month")).astype(np.int64)
+
+
+def forward_chaining_splits(periods, n_splits=3):
+    """
+    Yield (train, test) index arrays that test on each of the last n_splits months
+    in turn, training on every earlier month only.
+
+    :param periods: Month period number per row (see month_periods)
+    """
+    months = np.unique(periods)
+    for test_month in months[max(len(months) - n_splits, 1):]:
+        yield np.flatnonzero(periods < test_month), np.flatnonzero(periods == test_month)
+
+
+def _train_group(task):
+    """
+    Cross-validate and fit one model in a worker; returns (summary record, fitted model).
+    """
+    group, estimator, x, y, weights, periods, n_splits, threads = task
+
+    record = {"group": group, "rows": len(y), "months": len(np.unique(periods)), "folds": 0}
+    scores = {"rmse": [], "mae": [], "r2": []}
+
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        for train, test in forward_chaining_splits(periods, n_splits):
+            model = clone(estimator)
+            model.fit(x[train], y[train], sample_weight=None if weights is None else weights[train])
+            predicted = model.predict(x[test])
+
+            scores["rmse"].append(np.sqrt(mean_squared_error(y[test], predicted)))
+            scores["mae"].append(mean_absolute_error(y[test], predicted))
+            scores["r2"].append(r2_score(y[test], predicted) if len(test) > 1 else np.nan)
+            record["folds"] += 1
+        record["cv seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = clone(estimator)
+        model.fit(x, y, sample_weight=weights)
+        record["fit seconds"] = time.perf_counter() - start
+
+    for name, values in scores.items():
+        record[name] = np.mean(values) if values else np.nan
+        record[f"last month {name}"] = values[-1] if values else np.nan
+
+    return record, model
+
+
+class GroupedTrainer:
+    def __init__(self, dataframe, estimator=HistGradientBoostingRegressor(), features=None,
+                 target_column="total number of vehicles", groups=None, use_weights=True):
+        """
+        Trains one model per axis code, or per cluster of axes, with forward-chaining
+        cross-validation by Jalali month.
+
+        :param dataframe: Traffic DataFrame, e.g. from aggregate_corpus
+        :param estimator: Unfitted scikit-learn regressor, cloned for every group and fold
+        :param features: Feature columns (default: the TrafficVolumePredictor features)
+        :param target_column: Column to predict
+        :param groups: Dict of axis code -> cluster label to train per cluster (default: per axis)
+        :param use_weights: Fit with the recency weights of the prediction year
+        """
+        self.df = dataframe
+        self.estimator = estimator
+        self.features = list(VOLUME_FEATURES if features is None else features)
+        self.target_column = target_column
+        self.groups = groups
+        self.use_weights = use_weights
+        self.models = {}
+
+    def _group_labels(self, axis_codes):
+        """Map axis codes to their group: the axis code itself, or its cluster."""
+        if self.groups is None:
+            return axis_codes
+        return pd.Series(axis_codes).map({float(code): group for code, group in self.groups.items()}).to_numpy()
+
+    def _tasks(self, prediction_year, n_splits, threads):
+        """Split the shared feature matrix into one task per group."""
+        features = build_features(self.df, prediction_year)
+        x = features.matrix(self.features)
+        y = features.target(self.target_column)
+        weights = features.weights if self.use_weights else None
+        periods = month_periods(features)
+
+        labels = self._group_labels(features.column("axis code"))
+
+        complete = ~(np.isnan(x).any(axis=1) | np.isnan(y) | pd.isna(labels))
+        rows = np.flatnonzero(complete)
+        labels = labels[rows]
+
+        order = np.argsort(labels, kind="stable")
+        unique, starts = np.unique(labels[order], return_index=True)
+
+        for group, group_rows in zip(unique, np.split(rows[order], starts[1:])):
+            if self.groups is None:
+                group = int(group)
+            yield (group, self.estimator, x[group_rows], y[group_rows],
+                   None if weights is None else weights[group_rows], periods[group_rows], n_splits, threads)
+
+    def train(self, prediction_year=1404, n_splits=3, workers=1, threads=1):
+        """
+        Cross-validate and fit every group's model, in parallel worker processes when workers > 1.
+
+        :param prediction_year: Year the recency weights point to
+        :param n_splits: Number of final months tested, each after training on all earlier months
+        :param workers: Number of worker processes (None for one per CPU)
+        :param threads: Threads each model may use (OpenMP/BLAS), limited per worker
+        :return: DataFrame with one row per group: rows, months, folds, cross-validation and final fit
+                 seconds, mean and last-month RMSE, MAE and R²
+        """
+        tasks = self._tasks(prediction_year, n_splits, threads)
+
+        if workers == 1:
+            results = list(map(_train_group, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_train_group, tasks))
+
+        self.models = {record["group"]: model for record, model in results}
+        return pd.DataFrame([record for record, model in results]).set_index("group")
+
+    def predict(self, x_input):
+        """
+        Predict with the model of each row's group.
+        :param x_input: DataFrame with the feature columns and axis code
+        """
+        features = FeatureSet(x_input)
+        x = features.matrix(self.features)
+        labels = self._group_labels(features.column("axis code"))
+
+        predictions = np.full(len(x), np.nan)
+        for group, model in self.models.items():
+            rows = labels == group
+            if rows.any():
+                predictions[rows] = model.predict(x[rows])
+        return predictions
@@ -1,3 +1,9 @@
 from .preprocessor import TrafficPreprocessor
+from .cache import PreprocessingCache
+from .history_store import AxisHistoryStore
+from .instrumentation import PipelineHooks, MetricsRecorder
 from .aggregator import Aggregator
 from .data_selector import DataSelector
+from .dataset import ProcessedDataset
+from .tensor_store import TrafficTensorStore
+from .outliers import GroupedOutlierCapper
@@ -1,76 +1,413 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from fontTools.merge.util import equal
 
 from src.preprocessing import TrafficPreprocessor
+from src.preprocessing.cache import PreprocessingCache
+from src.preprocessing.deduplication import deduplicate
+from src.preprocessing.history_store import AxisHistoryStore, month_key
+from src.preprocessing.instrumentation import NO_HOOKS, summarize_stages
+from src.preprocessing.schema import compact_frame
+
+default_cache = PreprocessingCache()
+default_store = AxisHistoryStore()
+
+YEARS = ['1401', '1402', '1403']
+MONTHS = ["farvardin", "ordibehesht", "khordad", "tir", "mordad", "shahrivar",
+          "mehr", "aban", "azar", "dey", "bahman", "esfand"]
+SEASONS = {"farvardin": "spring", "ordibehesht": "spring", "khordad": "spring", "tir": "summer",
+           "mordad": "summer", "shahrivar": "summer", "mehr": "autumn", "aban": "autumn", "azar": "autumn",
+           "dey": "winter", "bahman": "winter", "esfand": "winter"}
+
+
+def preprocess(file_path, cache=None, compact=False, hooks=None):
+    """Preprocess a single file and return the cleaned DataFrame, reusing a cached copy when available."""
+    preprocessor = TrafficPreprocessor(file_path, compact, hooks)
+    hooks = preprocessor.hooks
 
+    if cache is not None:
+        if hooks.enabled:
+            hooks.before_stage(file_path, "cache lookup", None)
+        df = cache.load(file_path, preprocessor.config_key())
+        if hooks.enabled:
+            hooks.after_stage(file_path, "cache lookup", df, {"cache hits": int(df is not None)})
+        if df is not None:
+            return df
 
-def preprocess(file_path):
-    """Preprocess a single file and return the cleaned DataFrame."""
-    preprocessor = TrafficPreprocessor(file_path)
     preprocessor.preprocess()
+
+    if cache is not None:
+        cache.store(file_path, preprocessor.config_key(), preprocessor.df)
+
     return preprocessor.df
 
 
+def _load_file(task):
+    """
+    Load one file, returning (df, cache hit, error, hook records) instead of raising
+    so a worker process never aborts the whole run.
+    """
+    file_path, cache, processed, compact, hooks = task
+    hits = cache.hits if cache is not None else 0
+    checkpoint = hooks.checkpoint()
+
+    try:
+        df = pd.read_excel(file_path) if processed else preprocess(file_path, cache, compact, hooks)
+    except Exception as e:
+        return None, False, f"{type(e).__name__}: {e}", hooks.records_since(checkpoint)
+
+    return df, cache is not None and cache.hits > hits, None, hooks.records_since(checkpoint)
+
+
+def load_files(file_paths, cache=None, processed=False, workers=1, compact=False, hooks=None):
+    """
+    Load many files, in parallel worker processes when workers > 1.
+
+    :param file_paths: Paths to load; results keep this order
+    :param cache: PreprocessingCache shared by the workers, or None
+    :param processed: Read already processed Excel files instead of preprocessing raw exports
+    :param workers: Number of worker processes (None for one per CPU)
+    :param compact: Preprocess into the compact schema
+    :param hooks: PipelineHooks called around every preprocessing stage
+    :return: List of (df, error) pairs, df is None when error is set
+    """
+    hooks = hooks or NO_HOOKS
+    tasks = [(file_path, cache, processed, compact, hooks) for file_path in file_paths]
+
+    if workers == 1 or len(tasks) <= 1:
+        return [(df, error) for df, hit, error, records in map(_load_file, tasks)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_load_file, tasks))
+
+    # Workers count hits and misses, and record stages, on their own copy of the cache and hooks.
+    if cache is not None and not processed:
+        hits = sum(hit for df, hit, error, records in results if error is None)
+        cache.hits += hits
+        cache.misses += sum(error is None for df, hit, error, records in results) - hits
+
+    for df, hit, error, records in results:
+        hooks.add_records(records)
+
+    return [(df, error) for df, hit, error, records in results]
+
+
+def label_and_concat(results, labels, errors, compact=False):
+    """
+    Attach year/month/season labels to loaded frames and concatenate them.
+    Failed files are appended to errors as dicts. With compact=True the result is
+    converted to the compact schema after concatenation, so categories span all files.
+    """
+    dataframes = []
+
+    for (df, error), (file_path, year, month) in zip(results, labels):
+        if error is not None:
+            errors.append({"file": file_path, "year": year, "month": month, "error": error})
+            continue
+
+        df["year"] = year
+        df["month"] = month
+        df["season"] = SEASONS[month]
+
+        dataframes.append(df)
+
+    if dataframes:
+        df = pd.concat(dataframes, ignore_index=True)
+        return compact_frame(df) if compact else df
+    else:
+        return pd.DataFrame()
+
+
+def aggregate_corpus(file_names=None, years=None, base_path='resources', cache=None, workers=None, compact=False,
+                     hooks=None, duplicates="latest"):
+    """
+    Aggregate every axis for a set of years in one call, using a single process pool.
+
+    :param file_names: Axis file names to load (default: every file found under the years)
+    :param years: Jalali years to load (default: YEARS)
+    :param base_path: Root folder of the raw exports
+    :param cache: PreprocessingCache to use (default: the shared cache, False to disable)
+    :param workers: Number of worker processes (None for one per CPU)
+    :param compact: Return frames in the compact schema (see schema.compact_frame)
+    :param hooks: PipelineHooks called around every preprocessing stage, e.g. a MetricsRecorder
+    :param duplicates: Policy resolving hours an axis has more than once (see deduplication.deduplicate), or None
+    :return: (dict of file name -> aggregated DataFrame in file_names order, DataFrame of per-file errors)
+    """
+    if years is None:
+        years = YEARS
+    if cache is None:
+        cache = default_cache
+
+    if file_names is None:
+        file_names = sorted({file_name
+                             for year in years
+                             for month in MONTHS if os.path.isdir(os.path.join(base_path, year, month))
+                             for file_name in os.listdir(os.path.join(base_path, year, month))
+                             if file_name.endswith('.xlsx')})
+
+    labels = {file_name: [(os.path.join(base_path, year, month, file_name), year, month)
+                          for year in years
+                          for month in MONTHS
+                          if os.path.exists(os.path.join(base_path, year, month, file_name))]
+              for file_name in file_names}
+
+    file_paths = [file_path for file_name in file_names for file_path, year, month in labels[file_name]]
+    results = iter(load_files(file_paths, cache or None, workers=workers, compact=compact, hooks=hooks))
+
+    frames = {}
+    errors = []
+    for file_name in file_names:
+        file_results = [next(results) for _ in labels[file_name]]
+        frames[file_name] = label_and_concat(file_results, labels[file_name], errors, compact)
+        if duplicates is not None:
+            frames[file_name] = deduplicate(frames[file_name], duplicates)[0]
+
+    return frames, pd.DataFrame(errors, columns=["file", "year", "month", "error"])
+
+
+def _after(year, month, since):
+    """Whether (year, month) comes after the (year, month) pair since; every month does when since is None."""
+    return since is None or (int(year), MONTHS.index(month)) > (int(since[0]), MONTHS.index(since[1]))
+
+
+def iter_months(file_names=None, years=None, base_path='resources', cache=None, workers=None, compact=False,
+                since=None, errors=None):
+    """
+    Yield the corpus one month at a time, in chronological order, so consumers such as
+    incremental models only hold a single month of every axis in memory.
+
+    :param file_names: Axis file names to load (default: every file found in each month)
+    :param years: Jalali years to load (default: YEARS)
+    :param since: (year, month) of the last month already consumed; only later months are yielded
+    :param errors: List that failed files are appended to, as dicts
+    :return: Generator of (year, month, labelled DataFrame of every axis for that month)
+    """
+    if years is None:
+        years = YEARS
+    if cache is None:
+        cache = default_cache
+    if errors is None:
+        errors = []
+
+    for year in years:
+        for month in MONTHS:
+            folder = os.path.join(base_path, year, month)
+            if not os.path.isdir(folder) or not _after(year, month, since):
+                continue
+
+            if file_names is None:
+                names = sorted(name for name in os.listdir(folder) if name.endswith('.xlsx'))
+            else:
+                names = [name for name in file_names if os.path.exists(os.path.join(folder, name))]
+            if not names:
+                continue
+
+            labels = [(os.path.join(folder, name), year, month) for name in names]
+            results = load_files([file_path for file_path, _, _ in labels], cache or None, workers=workers,
+                                 compact=compact)
+            yield year, month, label_and_concat(results, labels, errors, compact)
+
+
+def iter_files(file_names=None, years=None, base_path='resources', cache=None, compact=False, errors=None):
+    """
+    Yield processed files one at a time, month by month in chronological order, so reductions
+    over the corpus hold a single file in memory.
+
+    :param file_names: Axis file names to load (default: every file found in each month)
+    :param years: Jalali years to load (default: YEARS)
+    :param errors: List that failed files are appended to, as dicts
+    :return: Generator of (year, month, labelled DataFrame of one axis for that month)
+    """
+    if years is None:
+        years = YEARS
+    if cache is None:
+        cache = default_cache
+    if errors is None:
+        errors = []
+
+    for year in years:
+        for month in MONTHS:
+            folder = os.path.join(base_path, year, month)
+            if not os.path.isdir(folder):
+                continue
+
+            if file_names is None:
+                names = sorted(name for name in os.listdir(folder) if name.endswith('.xlsx'))
+            else:
+                names = [name for name in file_names if os.path.exists(os.path.join(folder, name))]
+
+            for name in names:
+                label = (os.path.join(folder, name), year, month)
+                df = label_and_concat(load_files([label[0]], cache or None, compact=compact), [label], errors, compact)
+                if not df.empty:
+                    yield year, month, df
+
+
 class Aggregator:
-    def __init__(self, file_name):
+    def __init__(self, file_name, cache=None, workers=1, compact=False, hooks=None, duplicates="latest"):
         """
         Initialize the aggregator with a file name.
+
+        Preprocessed files are cached on disk through the shared default cache;
+        pass a PreprocessingCache to use another location or False to disable it.
+        With workers > 1 (None for one per CPU) files are loaded in a process pool.
+        Files that fail to load are skipped and recorded in self.errors.
+        With compact=True frames use the compact schema (see schema.compact_frame).
+        With hooks (e.g. an instrumentation.MetricsRecorder) every preprocessing stage is
+        recorded and self.stage_summary holds the per-stage summary of the last run.
+        Hours present in more than one month file (month boundaries, re-exports) are resolved with the
+        duplicates policy of deduplication.deduplicate ('latest', 'max_operating_time' or 'mean');
+        None keeps them all. self.duplicates_dropped counts the rows dropped by the last run.
         """
         self.file_name = file_name
+        if cache is None:
+            cache = default_cache
+        self.cache = cache or None
+        self.workers = workers
+        self.compact = compact
+        self.hooks = hooks or NO_HOOKS
+        self.duplicates = duplicates
+        self.duplicates_dropped = 0
+        self.errors = []
+        self.stage_summary = pd.DataFrame()
+        self.ingest_report = {}
         self.base_path = 'resources'
-        self.years = ['1401', '1402', '1403']
-        self.months = ["farvardin", "ordibehesht", "khordad", "tir", "mordad", "shahrivar",
-                       "mehr", "aban", "azar", "dey", "bahman", "esfand"]
-        self.seasons = {"farvardin": "spring", "ordibehesht": "spring", "khordad": "spring", "tir": "summer",
-                        "mordad": "summer", "shahrivar": "summer", "mehr": "autumn", "aban": "autumn", "azar": "autumn",
-                        "dey": "winter", "bahman": "winter", "esfand": "winter"}
+        self.years = list(YEARS)
+        self.months = list(MONTHS)
+        self.seasons = dict(SEASONS)
+
+    def _existing_files(self, path, years):
+        """List (file path, year, month) for every month file of this axis that exists."""
+        return [(os.path.join(path, year, month, self.file_name), year, month)
+                for year in years
+                for month in self.months
+                if os.path.exists(os.path.join(path, year, month, self.file_name))]
 
     def aggregate_data(self):
         """Aggregate and preprocess data from multiple files."""
-        dataframes = []
+        self.errors = []
+        labels = self._existing_files(self.base_path, self.years)
+        checkpoint = self.hooks.checkpoint()
 
-        for year in self.years:
-            for month in self.months:
-                file_path = os.path.join(self.base_path, year, month, self.file_name)
+        results = load_files([file_path for file_path, year, month in labels], self.cache, workers=self.workers,
+                             compact=self.compact, hooks=self.hooks)
+        self.stage_summary = summarize_stages(self.hooks.records_since(checkpoint))
+        return self._deduplicate(label_and_concat(results, labels, self.errors, self.compact))
 
-                if os.path.exists(file_path):
-                    df = preprocess(file_path)
+    def _deduplicate(self, df):
+        """Resolve hours present more than once with the duplicates policy."""
+        self.duplicates_dropped = 0
+        if self.duplicates is None:
+            return df
+        df, self.duplicates_dropped = deduplicate(df, self.duplicates)
+        return df
 
-                    df["year"] = year
-                    df["month"] = month
-                    df["season"] = self.seasons[month]
+    def iter_months(self, since=None):
+        """
+        Yield this axis one month at a time, in chronological order.
+        :param since: (year, month) of the last month already consumed; only later months are yielded
+        :return: Generator of (year, month, labelled DataFrame)
+        """
+        self.errors = []
+        for file_path, year, month in self._existing_files(self.base_path, self.years):
+            if not _after(year, month, since):
+                continue
+            results = load_files([file_path], self.cache, compact=self.compact, hooks=self.hooks)
+            df = label_and_concat(results, [(file_path, year, month)], self.errors, self.compact)
+            if not df.empty:
+                yield year, month, df
+
+    def ingest(self, store=None):
+        """
+        Bring the stored history of this axis up to date, processing only new or changed month files.
 
-                    dataframes.append(df)
+        The store keeps a watermark of the fingerprint every month file was processed from.
+        Gap filling and outlier capping run per month file, so the window a new or changed
+        file affects is its own month: those rows are replaced and every other month is kept
+        as stored. The result is the frame aggregate_data would return. Months whose file
+        disappeared are dropped; files that fail to load are skipped, recorded in self.errors
+        and retried on the next call. A changed preprocessing config rebuilds the history.
+        The store keeps every row as processed; duplicated hours are only resolved in the
+        returned frame, so removing or changing a month never loses the rows of its neighbours.
 
-        if dataframes:
-            return pd.concat(dataframes, ignore_index=True)
+        :param store: AxisHistoryStore to use (default: the shared store)
+        :return: Aggregated DataFrame of the axis
+        """
+        store = store or default_store
+        self.errors = []
+        checkpoint = self.hooks.checkpoint()
+
+        history, watermark = store.load(self.file_name)
+        config_key = TrafficPreprocessor(None, self.compact).config_key()
+        if history is None or watermark["config key"] != config_key:
+            history, recorded = None, {}
+        else:
+            recorded = watermark["files"]
+
+        labels = self._existing_files(self.base_path, self.years)
+        fingerprints = {month_key(year, month): store.fingerprint(file_path, recorded.get(month_key(year, month)))
+                        for file_path, year, month in labels}
+
+        pending = [(file_path, year, month) for file_path, year, month in labels
+                   if recorded.get(month_key(year, month), {}).get("sha256")
+                   != fingerprints[month_key(year, month)]["sha256"]]
+        removed = set(recorded) - set(fingerprints)
+        stale = {month_key(year, month) for file_path, year, month in pending} | removed
+
+        if stale:
+            results = load_files([file_path for file_path, year, month in pending], self.cache,
+                                 workers=self.workers, compact=self.compact, hooks=self.hooks)
+            df = self._merge_history(history, label_and_concat(results, pending, self.errors, self.compact), stale)
         else:
+            df = history
+        self.stage_summary = summarize_stages(self.hooks.records_since(checkpoint))
+
+        failed = {month_key(error["year"], error["month"]) for error in self.errors}
+        files = {key: fingerprint for key, fingerprint in fingerprints.items() if key not in failed}
+        watermark = {"config key": config_key, "last month": list(files)[-1] if files else None, "files": files}
+
+        if stale:
+            store.save(self.file_name, df, watermark)
+        elif files != recorded:
+            # Only mtimes moved; keep the history and record the new fingerprints.
+            store.save_watermark(self.file_name, watermark)
+
+        self.ingest_report = {"processed": len(stale - removed - failed), "unchanged": len(labels) - len(pending),
+                              "failed": len(failed), "removed": len(removed)}
+        return self._deduplicate(df) if df is not None else df
+
+    def _merge_history(self, history, new, stale):
+        """
+        Replace the stale months of a stored history with newly processed rows, keeping months
+        in chronological order as aggregate_data returns them.
+        """
+        frames = []
+        if history is not None and not history.empty:
+            months = history["year"].astype(str) + "/" + history["month"].astype(str)
+            frames.append(history[~months.isin(stale)])
+        if not new.empty:
+            frames.append(new)
+        if not frames:
             return pd.DataFrame()
 
+        df = pd.concat(frames, ignore_index=True)
+        order = df["year"].astype(int).to_numpy() * len(MONTHS) + df["month"].astype(str).map(MONTHS.index).to_numpy()
+        df = df.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+        return compact_frame(df) if self.compact else df
+
     def aggregate_specific_data(self, path="proceed", year=None):
         """Aggregate and preprocess data from multiple files."""
         if year is None:
             year = ['1403']
-        dataframes = []
+        self.errors = []
 
         if path != self.base_path:
             path = os.path.join(self.base_path, path)
 
-        for year in year:
-            for month in self.months:
-                file_path = os.path.join(path, year, month, self.file_name)
-
-                if os.path.exists(file_path):
-                    df = pd.read_excel(file_path)
+        labels = self._existing_files(path, year)
 
-                    df["year"] = year
-                    df["month"] = month
-                    df["season"] = self.seasons[month]
-
-                    dataframes.append(df)
-
-        if dataframes:
-            return pd.concat(dataframes, ignore_index=True)
-        else:
-            return pd.DataFrame()
+        results = load_files([file_path for file_path, year, month in labels], processed=True, workers=self.workers)
+        return label_and_concat(results, labels, self.errors, self.compact)
@@ -0,0 +1,125 @@
+import hashlib
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def file_sha256(file_path):
+    """
+    Return the SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_frame(path, columns=None):
+    """
+    Read a frame written by write_frame.
+    :param columns: Columns to read (default: all); the others are never read from disk
+    """
+    table = pq.read_table(path, columns=columns)
+    df = table.to_pandas()
+
+    # Parquet stores object columns by their inferred type; restore them
+    # so stored frames are indistinguishable from freshly processed ones.
+    for column in table.schema.pandas_metadata["columns"]:
+        name = column["name"]
+        if column["numpy_type"] == "object" and name in df.columns and df[name].dtype != object:
+            df[name] = df[name].astype(object)
+
+    return df
+
+
+def write_frame(df, path):
+    """
+    Write a frame to a Parquet file atomically.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(df), tmp_path)
+    os.replace(tmp_path, path)
+
+
+class PreprocessingCache:
+    def __init__(self, cache_dir=os.path.join('.cache', 'preprocessed')):
+        """
+        Initialize an on-disk cache of preprocessed traffic frames.
+
+        Entries are stored as Parquet files named after the SHA-256 of the raw
+        file content and the preprocessing config key, so editing a raw file
+        or changing the preprocessing steps invalidates them automatically.
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}
+
+    def content_hash(self, file_path):
+        """
+        Return the SHA-256 of a file, memoized on (path, size, mtime).
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+        if key not in self._hashes:
+            self._hashes[key] = file_sha256(file_path)
+
+        return self._hashes[key]
+
+    def entry_path(self, file_path, config_key):
+        """
+        Return the cache file path for a raw file under a preprocessing config.
+        """
+        return os.path.join(self.cache_dir, f"{self.content_hash(file_path)}-{config_key}.parquet")
+
+    def load(self, file_path, config_key):
+        """
+        Return the cached frame for a raw file, or None on a miss.
+        """
+        path = self.entry_path(file_path, config_key)
+
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        df = read_frame(path)
+        self.hits += 1
+        return df
+
+    def store(self, file_path, config_key, df):
+        """
+        Write a processed frame to the cache atomically.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        write_frame(df, self.entry_path(file_path, config_key))
+
+    def clear(self):
+        """
+        Remove every cached entry.
+        """
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        """
+        Return cache hit/miss counts since creation (or the last reset).
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit rate": self.hits / total if total else 0.0
+        }
+
+    def reset_stats(self):
+        """
+        Reset the hit/miss counters.
+        """
+        self.hits = 0
+        self.misses = 0
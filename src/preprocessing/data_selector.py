@@ -1,121 +1,151 @@
+import numpy as np
 import pandas as pd
 
+from src.preprocessing.schema import compact_frame
+
+aggregate_columns = [
+    "total number of vehicles", "number of Class 1 vehicles",
+    "number of Class 2 vehicles", "number of Class 3 vehicles",
+    "number of Class 4 vehicles", "number of Class 5 vehicles",
+    "estimated number", "average speed",
+    "number of speeding violations", "number of unauthorized distance violations",
+    "number of unauthorized overtaking violations"
+]
+
+# Friday is the weekend; Saturday to Thursday are weekdays.
+WEEKEND_DAY = 5
+CUBE_KEYS = ["year", "month", "season", "daytype", "start hour"]
+
 
 def aggregate_hourly_mean(df):
     """Aggregate the filtered data by computing the mean for each hour of the day."""
-    aggregate_columns = [
-        "total number of vehicles", "number of Class 1 vehicles",
-        "number of Class 2 vehicles", "number of Class 3 vehicles",
-        "number of Class 4 vehicles", "number of Class 5 vehicles",
-        "estimated number", "average speed",
-        "number of speeding violations", "number of unauthorized distance violations",
-        "number of unauthorized overtaking violations"
-    ]
-
-    return df.groupby("start hour")[aggregate_columns].mean().reset_index()
+    return df.groupby("start hour", observed=True)[aggregate_columns].mean().astype(np.float64).reset_index()
 
 
 class DataSelector:
-    def __init__(self, df):
+    def __init__(self, df, compact=False):
         """
         Initialize the DataSelector with a dataframe.
+        With compact=True the selector keeps its copy in the compact schema (see schema.compact_frame);
+        results are float64 either way.
         """
-        self.df = df.copy()
+        self.df = compact_frame(df) if compact else df.copy()
 
         self.df["date"] = pd.to_datetime(self.df["date"])
 
+        self.cube = self.build_cube()
+        self._cube_levels = {level: self.cube.index.get_level_values(level).to_numpy() for level in CUBE_KEYS}
+        self._cube_sums = self.cube["sum"].to_numpy()
+        self._cube_counts = self.cube["count"].to_numpy()
+
+    def build_cube(self):
+        """
+        Pre-aggregate sums and non-null counts of every column by (year, month, season, daytype, start hour).
+        Any filter combination can then be answered by merging cube cells instead of rescanning rows.
+        """
+        daytype = np.where(self.df["date"].dt.weekday == WEEKEND_DAY, "weekend", "weekday")
+        keys = [self.df["year"].astype(str).rename("year"), self.df["month"], self.df["season"],
+                pd.Series(daytype, index=self.df.index, name="daytype"), self.df["start hour"]]
+
+        grouped = self.df[aggregate_columns].astype(np.float64).groupby(keys, dropna=False, observed=True, sort=True)
+        return pd.concat({"sum": grouped.sum(), "count": grouped.count()}, axis=1)
+
+    def select(self, year=None, month=None, season=None, daytype=None):
+        """
+        Return hourly mean data for any combination of year, month, season and daytype ('weekday' or 'weekend').
+        Arguments left as None are not filtered on.
+
+        Means are merged from the cube's per-cell sums, so they are not bit-identical to averaging the
+        matching rows (as aggregate_hourly_mean does): they agree to floating-point rounding, with
+        relative differences below 1e-15 (about 1e-12 absolute on hourly vehicle counts).
+        """
+        levels = self._cube_levels
+
+        mask = np.ones(len(self.cube), dtype=bool)
+        for level, value in (("year", year), ("month", month), ("season", season), ("daytype", daytype)):
+            if value is not None:
+                mask &= levels[level] == (str(value) if level == "year" else value)
+
+        hours, cells = np.unique(levels["start hour"][mask], return_inverse=True)
+        hour_sums = np.zeros((len(hours), len(aggregate_columns)))
+        hour_counts = np.zeros((len(hours), len(aggregate_columns)))
+        np.add.at(hour_sums, cells, self._cube_sums[mask])
+        np.add.at(hour_counts, cells, self._cube_counts[mask])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            hourly_mean = np.where(hour_counts > 0, hour_sums / hour_counts, np.nan)
+
+        result = pd.DataFrame(hourly_mean, columns=aggregate_columns)
+        result.insert(0, "start hour", hours)
+        return result
+
     def filter_by_year(self, year):
         """Return hourly mean data for a specific year."""
-        filtered_df = self.df[self.df["year"] == str(year)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(year=year)
 
     def filter_by_month(self, month):
         """Return hourly mean data for a specific month."""
-        filtered_df = self.df[self.df["month"] == month]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(month=month)
 
     def filter_by_month_year(self, month, year):
         """Return hourly mean data for a specific month and year."""
-        filtered_df = self.df[(self.df["month"] == month) & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(month=month, year=year)
 
     def filter_by_season(self, season):
         """Return hourly mean data for a specific season (spring, summer, autumn, winter)."""
-        filtered_df = self.df[self.df["season"] == season]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(season=season)
 
     def filter_by_season_year(self, season, year):
         """Return hourly mean data for a specific season and year."""
-        filtered_df = self.df[(self.df["season"] == season) & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(season=season, year=year)
 
     def filter_by_weekdays(self):
         """Return hourly mean data for weekdays (Saturday to Thursday)."""
-        filtered_df = self.df[self.df["date"].dt.weekday != 5]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday")
 
     def filter_by_weekdays_year(self, year):
         """Return hourly mean data for weekdays and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday != 5) & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday", year=year)
 
     def filter_by_weekdays_month(self, month):
         """Return hourly mean data for weekdays and month"""
-        filtered_df = self.df[(self.df["date"].dt.weekday != 5) & (self.df["month"] == month)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday", month=month)
 
     def filter_by_weekdays_season(self, season):
         """Return hourly mean data for weekdays and season"""
-        filtered_df = self.df[(self.df["date"].dt.weekday != 5) & (self.df["season"] == season)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday", season=season)
 
     def filter_by_weekdays_month_year(self, month, year):
         """Return hourly mean data for weekdays and month and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday != 5)
-                              & (self.df["month"] == month)
-                              & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday", month=month, year=year)
 
     def filter_by_weekdays_season_year(self, season, year):
         """Return hourly mean data for weekdays and season and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday != 5)
-                              & (self.df["season"] == season)
-                              & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekday", season=season, year=year)
 
     def filter_by_weekends(self):
         """Return hourly mean data for weekends (Friday)."""
-        filtered_df = self.df[self.df["date"].dt.weekday == 5]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend")
 
     def filter_by_weekends_year(self, year):
         """Return hourly mean data for weekends and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday == 5) & (self.df["year"] == str(year))]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend", year=year)
 
     def filter_by_weekends_month(self, month):
         """Return hourly mean data for weekends and month"""
-        filtered_df = self.df[(self.df["date"].dt.weekday == 5) & (self.df["month"] == month)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend", month=month)
 
     def filter_by_weekends_season(self, season):
         """Return hourly mean data for weekends and season"""
-        filtered_df = self.df[(self.df["date"].dt.weekday == 5) & (self.df["season"] == season)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend", season=season)
 
     def filter_by_weekends_month_year(self, month, year):
         """Return hourly mean data for weekends and month and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday == 5)
-                              & (self.df["month"] == month)
-                              & (self.df["year"] == year)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend", month=month, year=year)
 
     def filter_by_weekends_season_year(self, season, year):
         """Return hourly mean data for weekends and season and year"""
-        filtered_df = self.df[(self.df["date"].dt.weekday == 5)
-                              & (self.df["season"] == season)
-                              & (self.df["year"] == year)]
-        return aggregate_hourly_mean(filtered_df)
+        return self.select(daytype="weekend", season=season, year=year)
 
     def filter_by_date_range(self, start_date, end_date):
         """Return hourly mean data within a specific date range."""
@@ -0,0 +1,127 @@
+import os
+import shutil
+
+import pandas as pd
+
+from src.preprocessing.aggregator import MONTHS, SEASONS, iter_files
+from src.preprocessing.cache import read_frame, write_frame
+
+PARTITION_FILE = "part.parquet"
+
+
+def _partition_value(value):
+    """Axis codes are stored as integers when they are numeric, like the processed frames hold them."""
+    return int(value) if value.isdigit() else value
+
+
+def _selected(value, allowed):
+    return allowed is None or value in allowed
+
+
+class ProcessedDataset:
+    def __init__(self, root=os.path.join('resources', 'processed')):
+        """
+        Initialize a partitioned Parquet dataset of processed traffic data, the columnar
+        replacement of the processed Excel files under resources/proceed.
+
+        Data is partitioned as root/year=<year>/month=<month>/axis=<axis code>/part.parquet, one
+        processed month of one axis per file, with the year, month and season labels kept in the
+        data. Reads prune partitions by their directory names before opening any file and read
+        only the requested columns, so loading one metric of one year touches just those bytes.
+        """
+        self.root = root
+
+    def partition_path(self, year, month, axis_code):
+        """Return the file of one (year, month, axis code) partition."""
+        return os.path.join(self.root, f"year={year}", f"month={month}", f"axis={axis_code}", PARTITION_FILE)
+
+    def write(self, df):
+        """
+        Write labelled processed data (e.g. from Aggregator.aggregate_data or iter_files),
+        replacing the partitions it covers.
+        :param df: DataFrame with year, month and axis code columns
+        :return: Paths written
+        """
+        if df.empty:
+            return []
+
+        paths = []
+        for (year, month, axis_code), partition in df.groupby(["year", "month", "axis code"], observed=True,
+                                                             sort=False):
+            path = self.partition_path(year, month, axis_code)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_frame(partition.reset_index(drop=True), path)
+            paths.append(path)
+        return paths
+
+    def build(self, file_names=None, years=None, base_path='resources', cache=None):
+        """
+        Preprocess raw exports into the dataset, one file in memory at a time.
+        :param file_names: Axis file names to write (default: every file found)
+        :param years: Jalali years to write (default: YEARS)
+        :param cache: PreprocessingCache to use (default: the shared cache, False to disable)
+        :return: (number of partitions written, DataFrame of the files that failed to load)
+        """
+        errors = []
+        written = 0
+        for year, month, df in iter_files(file_names, years, base_path, cache, errors=errors):
+            written += len(self.write(df))
+        return written, pd.DataFrame(errors, columns=["file", "year", "month", "error"])
+
+    def partitions(self, years=None, months=None, seasons=None, axes=None):
+        """
+        List the partitions matching the predicates, in chronological order, without opening any file.
+
+        :param years: Jalali years to keep (default: all)
+        :param months: Month names to keep (default: all)
+        :param seasons: Seasons to keep (default: all); combined with months when both are given
+        :param axes: Axis codes to keep (default: all)
+        :return: List of (year, month, axis code, path)
+        """
+        years = None if years is None else {str(year) for year in years}
+        months = None if months is None else set(months)
+        if seasons is not None:
+            in_seasons = {month for month, season in SEASONS.items() if season in seasons}
+            months = in_seasons if months is None else months & in_seasons
+        axes = None if axes is None else {str(axis_code) for axis_code in axes}
+
+        def keys(directory, prefix, allowed):
+            if not os.path.isdir(directory):
+                return []
+            return [name[len(prefix):] for name in os.listdir(directory)
+                    if name.startswith(prefix) and _selected(name[len(prefix):], allowed)]
+
+        found = []
+        for year in keys(self.root, "year=", years):
+            for month in keys(os.path.join(self.root, f"year={year}"), "month=", months):
+                for axis_code in keys(os.path.join(self.root, f"year={year}", f"month={month}"), "axis=", axes):
+                    path = self.partition_path(year, month, axis_code)
+                    if os.path.exists(path):
+                        found.append((year, month, _partition_value(axis_code), path))
+
+        month_order = {month: i for i, month in enumerate(MONTHS)}
+        return sorted(found, key=lambda p: (p[0], month_order.get(p[1], len(MONTHS)), str(p[2])))
+
+    def read(self, columns=None, years=None, months=None, seasons=None, axes=None):
+        """
+        Load processed data, reading only the matching partitions and the requested columns.
+
+        ds.read(columns=["axis code", "total number of vehicles"], years=["1403"]) loads every
+        axis of 1403 with total vehicles only.
+
+        :param columns: Columns to load (default: all)
+        :param years: Jalali years to load (default: all, see partitions for the other predicates)
+        :return: DataFrame in chronological order, axes by code within a month
+        """
+        frames = [read_frame(path, columns)
+                  for year, month, axis_code, path in self.partitions(years, months, seasons, axes)]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns) if columns is not None else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def clear(self):
+        """Remove every partition of the dataset."""
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            if name.startswith("year="):
+                shutil.rmtree(os.path.join(self.root, name))
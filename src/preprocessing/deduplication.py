@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+
+POLICIES = ("latest", "max_operating_time", "mean")
+OPERATING_TIME_COLUMN = "operating time (minutes)"
+
+
+def hour_keys(df):
+    """
+    Return the (axis, hour) key of every row as two int64 arrays: the factorized axis code and the
+    start hour timestamp in hours since the epoch.
+    """
+    axes = pd.factorize(df["axis code"].astype(object))[0].astype(np.int64)
+    days = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return axes, days * HOURS_PER_DAY + df["start hour"].to_numpy(dtype=np.int64)
+
+
+def deduplicate(df, policy="latest", sources=None):
+    """
+    Keep one row per (axis code, start hour timestamp), e.g. after concatenating the month files of
+    an axis, where hours at month boundaries or in re-exported files appear more than once.
+
+    Rows are sorted once on their integer keys and duplicates are found as runs of equal keys,
+    so the cost is a sort of two int64 arrays whatever the number of columns.
+
+    :param df: Aggregated traffic DataFrame with axis code, date and start hour
+    :param policy: How to resolve an hour present more than once:
+                   'latest' keeps the row of the latest file,
+                   'max_operating_time' keeps the row measured over the longest operating time (ties: latest),
+                   'mean' averages the numeric columns (integer columns are rounded) and keeps the
+                   other columns of the latest row
+    :param sources: Per-row rank of the file each row came from, higher is later (default: row
+                    order, as label_and_concat concatenates files chronologically)
+    :return: (DataFrame with the surviving rows in their original order, number of rows dropped)
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+    if df.empty:
+        return df, 0
+
+    axes, hours = hour_keys(df)
+    positions = np.arange(len(df))
+    ranks = positions if sources is None else np.asarray(sources)
+
+    keys = [positions, ranks]
+    if policy == "max_operating_time":
+        operating = pd.to_numeric(df[OPERATING_TIME_COLUMN], errors="coerce").to_numpy(dtype=np.float64)
+        keys.append(np.nan_to_num(operating, nan=-np.inf))
+    order = np.lexsort(keys + [hours, axes])
+
+    sorted_axes, sorted_hours = axes[order], hours[order]
+    changed = (sorted_axes[1:] != sorted_axes[:-1]) | (sorted_hours[1:] != sorted_hours[:-1])
+    starts = np.flatnonzero(np.r_[True, changed])
+    if len(starts) == len(df):
+        return df, 0
+
+    ends = np.r_[starts[1:], len(df)]
+    kept = order[ends - 1]
+    survivors = np.argsort(kept, kind="stable")
+    result = df.iloc[kept[survivors]].reset_index(drop=True)
+
+    if policy == "mean":
+        for column in df.select_dtypes(include="number").columns:
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            present = ~np.isnan(values)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = (np.add.reduceat(np.where(present, values, 0), starts)
+                         / np.add.reduceat(present, starts))[survivors]
+            if pd.api.types.is_integer_dtype(df[column]):
+                # Through a pandas array, so groups without values stay missing in nullable columns.
+                means = pd.array(np.rint(means)).astype(df[column].dtype)
+            result[column] = means
+
+    return result, len(df) - len(result)
@@ -0,0 +1,127 @@
+import numpy as np
+
+HOURS_PER_DAY = 24
+
+
+def missing_days(values):
+    """
+    Return a boolean mask of the days whose 24 hourly values are all missing.
+
+    :param values: 1-D array covering whole days, starting at midnight
+    """
+    return np.isnan(values).reshape(-1, HOURS_PER_DAY).all(axis=1)
+
+
+def interpolate_time(values, timestamps, limit=3):
+    """
+    Linearly interpolate missing values on a time axis, column by column at once.
+
+    Matches DataFrame.interpolate(method="time", limit=limit): at most `limit`
+    consecutive missing values are filled after each valid one, trailing gaps take
+    the last valid value and leading gaps are left missing.
+
+    :param values: 2-D float array (rows x columns), modified in place
+    :param timestamps: 1-D datetime64 array of the rows
+    :return: Number of cells filled
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return 0
+
+    n_rows = len(values)
+    rows = np.arange(n_rows)[:, None]
+    times = timestamps.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+
+    previous = np.maximum.accumulate(np.where(missing, -1, rows), axis=0)
+    following = np.minimum.accumulate(np.where(missing, n_rows, rows)[::-1], axis=0)[::-1]
+
+    fill = missing & (previous >= 0) & (rows - previous <= limit)
+    if not fill.any():
+        return 0
+
+    row, column = np.nonzero(fill)
+    before = previous[row, column]
+    after = following[row, column]
+
+    filled = values[before, column]
+    inner = after < n_rows
+    x0 = times[before[inner]]
+    y0 = values[before[inner], column[inner]]
+    slope = (values[after[inner], column[inner]] - y0) / (times[after[inner]] - x0)
+    filled[inner] = slope * (times[row[inner]] - x0) + y0
+
+    values[row, column] = filled
+    return len(row)
+
+
+def rolling_fill(values, window, center=False):
+    """
+    Fill missing values with the mean of the valid values in a row window.
+
+    Matches df.fillna(df.rolling(window, center=center, min_periods=1).mean()).
+
+    :param values: 2-D float array (rows x columns), modified in place
+    :return: Number of cells filled
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return 0
+
+    n_rows = len(values)
+    valid = ~missing
+
+    sums = np.zeros((n_rows + 1, values.shape[1]))
+    counts = np.zeros((n_rows + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+
+    row, column = np.nonzero(missing)
+    end = row + 1 + ((window - 1) // 2 if center else 0)
+    start = np.maximum(end - window, 0)
+    end = np.minimum(end, n_rows)
+
+    count = counts[end, column] - counts[start, column]
+    has_values = count > 0
+    mean = (sums[end, column] - sums[start, column])[has_values] / count[has_values]
+
+    values[row[has_values], column[has_values]] = mean
+    return int(has_values.sum())
+
+
+def fill_forward_backward(values):
+    """
+    Fill remaining gaps with the previous valid value, then the next one, like ffill().bfill().
+
+    :param values: 2-D float array (rows x columns), modified in place
+    :return: Number of cells filled
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return 0
+
+    n_rows = len(values)
+    rows = np.arange(n_rows)[:, None]
+
+    source = np.maximum.accumulate(np.where(missing, -1, rows), axis=0)
+    following = np.minimum.accumulate(np.where(missing, n_rows, rows)[::-1], axis=0)[::-1]
+    source = np.where(source >= 0, source, following)
+
+    row, column = np.nonzero(missing & (source < n_rows))
+    values[row, column] = values[source[row, column], column]
+    return len(row)
+
+
+def fill_vehicle_gaps(values, timestamps, limit=3, windows=((3, False), (6, False), (12, True))):
+    """
+    Run the whole vehicle-count fill chain on one contiguous array: time interpolation,
+    rolling-mean fills of increasing width, then forward/backward fill.
+
+    :param values: 2-D float array (rows x columns), modified in place
+    :param timestamps: 1-D datetime64 array of the rows
+    :return: Number of cells filled
+    """
+    filled = interpolate_time(values, timestamps, limit)
+    for window, center in windows:
+        filled += rolling_fill(values, window, center)
+    filled += fill_forward_backward(values)
+    return filled
@@ -0,0 +1,77 @@
+import json
+import os
+
+from src.preprocessing.cache import file_sha256, read_frame, write_frame
+
+
+def month_key(year, month):
+    """Return the 'year/month' key a month file is recorded under in a watermark."""
+    return f"{year}/{month}"
+
+
+class AxisHistoryStore:
+    def __init__(self, store_dir=os.path.join('.cache', 'axes')):
+        """
+        Initialize an on-disk store of aggregated axis histories.
+
+        Every axis is kept as a Parquet file of its aggregated frame and a JSON watermark
+        recording, per month file, the fingerprint it was processed from, so
+        Aggregator.ingest only processes files that are new or have changed.
+        """
+        self.store_dir = store_dir
+
+    def _path(self, file_name, extension):
+        return os.path.join(self.store_dir, f"{os.path.splitext(file_name)[0]}.{extension}")
+
+    def fingerprint(self, file_path, recorded=None):
+        """
+        Return the fingerprint of a month file: its size, mtime and SHA-256.
+        The file is only hashed when its size or mtime differ from the recorded fingerprint.
+        """
+        stat = os.stat(file_path)
+        if recorded is not None and (recorded["size"], recorded["mtime"]) == (stat.st_size, stat.st_mtime_ns):
+            return recorded
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": file_sha256(file_path)}
+
+    def load(self, file_name):
+        """
+        Return the stored (history DataFrame, watermark) of an axis, or (None, empty watermark).
+        """
+        history_path, watermark_path = self._path(file_name, "parquet"), self._path(file_name, "json")
+        if not (os.path.exists(history_path) and os.path.exists(watermark_path)):
+            return None, {"config key": None, "last month": None, "files": {}}
+
+        with open(watermark_path) as f:
+            watermark = json.load(f)
+        return read_frame(history_path), watermark
+
+    def save(self, file_name, df, watermark):
+        """
+        Store an axis history and its watermark, the history first so a watermark
+        never describes data that was not written.
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        write_frame(df, self._path(file_name, "parquet"))
+        self.save_watermark(file_name, watermark)
+
+    def save_watermark(self, file_name, watermark):
+        """
+        Store the watermark of an axis atomically.
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        watermark_path = self._path(file_name, "json")
+        tmp_path = f"{watermark_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(watermark, f, indent=2)
+        os.replace(tmp_path, watermark_path)
+
+    def clear(self, file_name=None):
+        """
+        Remove the stored history of one axis, or of every axis.
+        """
+        if not os.path.isdir(self.store_dir):
+            return
+        for name in os.listdir(self.store_dir):
+            if (name.endswith('.parquet') or name.endswith('.json')) and \
+                    (file_name is None or os.path.splitext(name)[0] == os.path.splitext(file_name)[0]):
+                os.remove(os.path.join(self.store_dir, name))
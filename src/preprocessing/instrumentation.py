@@ -0,0 +1,147 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Counters reported by the preprocessing stages, in summary column order.
+STAGE_COUNTERS = ["cache hits", "malformed cells", "rows dropped", "hours added", "days dropped",
+                  "cells interpolated", "values clipped"]
+
+
+class PipelineHooks:
+    """
+    No-op instrumentation hooks for TrafficPreprocessor.
+
+    Subclasses set enabled = True and receive before_stage/after_stage calls around
+    every preprocessing stage. While enabled is False the preprocessor calls its
+    stages directly and never touches the hooks.
+    """
+    enabled = False
+
+    def before_stage(self, file_path, stage, df):
+        """Called before a stage runs, with the frame it receives (None before loading)."""
+
+    def after_stage(self, file_path, stage, df, counters):
+        """Called after a stage ran, with the frame it produced and its counters."""
+
+    def checkpoint(self):
+        """Mark the current position so records_since can return what was recorded after it."""
+        return None
+
+    def records_since(self, checkpoint):
+        """Return the records added after a checkpoint."""
+        return []
+
+    def add_records(self, records):
+        """Add records collected by a copy of these hooks in a worker process."""
+
+
+NO_HOOKS = PipelineHooks()
+
+
+class MetricsRecorder(PipelineHooks):
+    enabled = True
+
+    def __init__(self, trace_memory=True):
+        """
+        Hooks recording, for every stage of every file: wall time, rows in and out,
+        the stage counters (days dropped, cells interpolated, values clipped, ...)
+        and, with trace_memory, the peak traced memory above the level at stage start.
+
+        Tracing memory with tracemalloc slows the stages down noticeably; pass
+        trace_memory=False when only timings and counters are needed, and call
+        close() to stop tracing started by the recorder.
+        """
+        self.trace_memory = trace_memory
+        self.records = []
+        self._started = None
+        self._tracing = False
+
+    def __getstate__(self):
+        # Worker processes start from an empty record list and send back only what they recorded.
+        state = self.__dict__.copy()
+        state["records"] = []
+        state["_started"] = None
+        state["_tracing"] = False
+        return state
+
+    def before_stage(self, file_path, stage, df):
+        memory = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+
+        self._started = (0 if df is None else len(df), memory, time.perf_counter())
+
+    def after_stage(self, file_path, stage, df, counters):
+        rows_in, memory, start = self._started
+        elapsed = time.perf_counter() - start
+
+        record = {"file": file_path, "stage": stage, "seconds": elapsed,
+                  "rows in": rows_in, "rows out": 0 if df is None else len(df)}
+        record.update(counters or {})
+        if self.trace_memory:
+            record["peak memory delta (bytes)"] = tracemalloc.get_traced_memory()[1] - memory
+
+        self.records.append(record)
+        self._started = None
+
+    def close(self):
+        """Stop memory tracing if this recorder started it."""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def checkpoint(self):
+        return len(self.records)
+
+    def records_since(self, checkpoint):
+        return self.records[checkpoint:]
+
+    def add_records(self, records):
+        self.records.extend(records)
+
+    def to_frame(self):
+        """Return every record as a DataFrame, one row per file and stage."""
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        """Roll the records up into one row per stage."""
+        return summarize_stages(self.records)
+
+
+def summarize_stages(records):
+    """
+    Roll per-file stage records up into a per-stage summary table.
+
+    :param records: Records from MetricsRecorder
+    :return: DataFrame indexed by stage with file count, total/mean/max seconds, rows in and out,
+             summed counters and the largest peak memory delta
+    """
+    if not records:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(records)
+    grouped = df.groupby("stage", sort=False)
+
+    summary = pd.DataFrame({
+        "files": grouped["file"].nunique(),
+        "total seconds": grouped["seconds"].sum(),
+        "mean seconds": grouped["seconds"].mean(),
+        "max seconds": grouped["seconds"].max(),
+        "slowest file": df.loc[grouped["seconds"].idxmax(), "file"].to_numpy(),
+        "rows in": grouped["rows in"].sum(),
+        "rows out": grouped["rows out"].sum()
+    })
+
+    for counter in STAGE_COUNTERS:
+        if counter in df.columns:
+            summary[counter] = grouped[counter].sum(min_count=1).astype("Int64")
+
+    if "peak memory delta (bytes)" in df.columns:
+        summary["max peak memory delta (bytes)"] = grouped["peak memory delta (bytes)"].max()
+
+    return summary
@@ -0,0 +1,97 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from persiantools.jdatetime import JalaliDate, JalaliDateTime
+
+TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M:%S"
+TIMESTAMP_LENGTH = 19
+
+# Offsets of "YYYY/MM/DD HH:MM:SS" fields and separators.
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARATORS = {4: "/", 7: "/", 10: " ", 13: ":", 16: ":"}
+
+
+@lru_cache(maxsize=None)
+def nowruz(year):
+    """
+    Return the Gregorian date of 1 Farvardin of a Jalali year as datetime64[D].
+    """
+    return np.datetime64(JalaliDate(year, 1, 1).to_gregorian(), "D")
+
+
+def _nowruz_table(years):
+    """
+    Return (1 Farvardin, days in year) lookups for the given Jalali years.
+    """
+    starts = np.array([nowruz(int(y)) for y in years], dtype="datetime64[D]")
+    ends = np.array([nowruz(int(y) + 1) for y in years], dtype="datetime64[D]")
+    return starts, (ends - starts).astype(np.int64)
+
+
+def _parse_fields(values):
+    """
+    Split fixed-width Jalali timestamps into integer fields using array operations.
+
+    :return: (year, month, day, hour, minute, second) arrays, or None if any value
+             does not follow the "YYYY/MM/DD HH:MM:SS" layout.
+    """
+    if len(values) == 0:
+        return None
+
+    chars = np.asarray(values, dtype=f"U{TIMESTAMP_LENGTH + 1}")
+    if (np.char.str_len(chars) != TIMESTAMP_LENGTH).any():
+        return None
+
+    codes = chars.astype(f"U{TIMESTAMP_LENGTH}").view(np.uint32).reshape(-1, TIMESTAMP_LENGTH)
+
+    for position, separator in _SEPARATORS.items():
+        if (codes[:, position] != ord(separator)).any():
+            return None
+
+    digits = codes[:, _DIGIT_POSITIONS].astype(np.int64) - ord("0")
+    if ((digits < 0) | (digits > 9)).any():
+        return None
+
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    second = digits[:, 12] * 10 + digits[:, 13]
+
+    return year, month, day, hour, minute, second
+
+
+def jalali_to_gregorian(series):
+    """
+    Convert a Series of Jalali "YYYY/MM/DD HH:MM:SS" strings to a datetime64[ns] Series.
+
+    Fields are parsed with array operations and every distinct Jalali year is
+    looked up once, instead of building a JalaliDateTime per row. Values that do
+    not follow the fixed layout fall back to persiantools row by row.
+    """
+    values = series.to_numpy()
+    fields = _parse_fields(values)
+
+    if fields is None:
+        return series.apply(lambda x: JalaliDateTime.strptime(x, TIMESTAMP_FORMAT).to_gregorian())
+
+    year, month, day, hour, minute, second = fields
+
+    years, year_index = np.unique(year, return_inverse=True)
+    starts, year_lengths = _nowruz_table(years)
+
+    month_offset = np.where(month <= 7, 31 * (month - 1), 30 * (month - 1) + 6)
+    month_length = np.where(month <= 6, 31, np.where(month <= 11, 30, year_lengths[year_index] - 336))
+
+    invalid = ((month < 1) | (month > 12) | (day < 1) | (day > month_length)
+               | (hour > 23) | (minute > 59) | (second > 59))
+    if invalid.any():
+        raise ValueError(f"Invalid Jalali timestamp: {values[np.argmax(invalid)]!r}")
+
+    days = starts[year_index] + (month_offset + day - 1).astype("timedelta64[D]")
+    seconds = (hour * 3600 + minute * 60 + second).astype("timedelta64[s]")
+    timestamps = (days + seconds).astype("datetime64[ns]")
+
+    return pd.Series(timestamps, index=series.index, name=series.name)
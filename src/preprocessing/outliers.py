@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.data_selector import WEEKEND_DAY
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+
+OUTLIER_COLUMNS = [
+    "total number of vehicles", "average speed", "number of speeding violations",
+    "number of unauthorized distance violations", "number of unauthorized overtaking violations"
+]
+DAYTYPES = ["weekday", "weekend"]
+
+
+def grouped_quantiles(values, groups, n_groups, quantiles):
+    """
+    Quantiles of values within every group, interpolated linearly like Series.quantile, from one
+    sort of the (group, value) pairs. Missing values are ignored.
+
+    :param values: 1-D float array
+    :param groups: Group number of every value, in [0, n_groups); values of negative groups are ignored
+    :param quantiles: Quantiles to compute, in [0, 1]
+    :return: (len(quantiles) x n_groups array, NaN for empty groups; per-group value counts)
+    """
+    present = ~np.isnan(values) & (groups >= 0)
+    values, groups = values[present], groups[present]
+    values = values[np.lexsort((values, groups))]
+
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    filled = counts > 0
+
+    result = np.full((len(quantiles), n_groups), np.nan)
+    for i, q in enumerate(quantiles):
+        position = q * (counts[filled] - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        below, above = values[starts[filled] + low], values[starts[filled] + high]
+        result[i, filled] = below + (position - low) * (above - below)
+    return result, counts
+
+
+class GroupedOutlierCapper:
+    def __init__(self, columns=None, factor=1.5, margin=5, min_count=8):
+        """
+        Caps outliers of the concatenated multi-axis corpus with robust bounds per (axis, day type,
+        hour of day), instead of one IQR per monthly file as TrafficPreprocessor.handle_outliers does.
+
+        Bounds follow handle_outliers: Q1 - factor * (IQR + margin) and Q3 + factor * (IQR + margin),
+        computed for every group of every column with grouped_quantiles. Groups with fewer than
+        min_count values are not capped. Integer columns are capped to the integers within the
+        bounds, so they keep their dtype.
+
+        :param columns: Columns to cap (default: OUTLIER_COLUMNS, total vehicles, speed and violations)
+        :param factor: IQR multiplier of the bounds
+        :param margin: Added to the IQR, so groups with a near-constant column are not capped to a point
+        :param min_count: Fewest values a group needs to be capped
+        """
+        self.columns = list(OUTLIER_COLUMNS if columns is None else columns)
+        self.factor = factor
+        self.margin = margin
+        self.min_count = min_count
+
+        self.axis_codes = []
+        self.lower = None
+        self.upper = None
+        self.capped_cells = pd.DataFrame()
+
+    def _groups(self, df, fitting=False):
+        """Group number of every row: (axis position * 2 + day type) * 24 + start hour; -1 for unknown axes."""
+        codes = df["axis code"].astype(object)
+        if fitting:
+            self.axis_codes = list(pd.unique(codes.dropna()))
+        positions = pd.Index(self.axis_codes, dtype=object).get_indexer(codes)
+
+        weekend = pd.to_datetime(df["date"]).dt.weekday.to_numpy() == WEEKEND_DAY
+        groups = (positions * len(DAYTYPES) + weekend) * HOURS_PER_DAY + df["start hour"].to_numpy(dtype=np.int64)
+        return np.where(positions >= 0, groups, -1)
+
+    @property
+    def n_groups(self):
+        return len(self.axis_codes) * len(DAYTYPES) * HOURS_PER_DAY
+
+    def fit(self, df):
+        """
+        Compute the bounds of every (axis, day type, hour) group of a concatenated frame.
+        :param df: Traffic DataFrame of one or many axes, with axis code, date and start hour
+        """
+        groups = self._groups(df, fitting=True)
+        self.lower = np.full((self.n_groups, len(self.columns)), -np.inf)
+        self.upper = np.full((self.n_groups, len(self.columns)), np.inf)
+
+        for i, column in enumerate(self.columns):
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            (q1, q3), counts = grouped_quantiles(values, groups, self.n_groups, [0.25, 0.75])
+            spread = self.factor * (q3 - q1 + self.margin)
+            capped = counts >= self.min_count
+            self.lower[capped, i] = (q1 - spread)[capped]
+            self.upper[capped, i] = (q3 + spread)[capped]
+        return self
+
+    def bounds(self):
+        """
+        The fitted bounds, indexed by axis code, day type and start hour, with (lower/upper, column) columns.
+        """
+        index = pd.MultiIndex.from_product([self.axis_codes, DAYTYPES, range(HOURS_PER_DAY)],
+                                           names=["axis code", "daytype", "start hour"])
+        return pd.concat({"lower": pd.DataFrame(self.lower, index=index, columns=self.columns),
+                          "upper": pd.DataFrame(self.upper, index=index, columns=self.columns)}, axis=1)
+
+    def transform(self, df):
+        """
+        Cap a frame with the fitted bounds; rows of axes not seen by fit are left as they are.
+        The capped cells are recorded in self.capped_cells, one row per cell with its original
+        and capped value.
+        :return: Capped copy of the frame
+        """
+        if self.lower is None:
+            raise ValueError("fit must be called before transform")
+
+        groups = self._groups(df)
+        known = groups >= 0
+        df = df.copy()
+        records = []
+
+        for i, column in enumerate(self.columns):
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            # Unknown rows (-1) are never used as an index, which also covers a fit without any axis.
+            lower, upper = np.full(len(values), -np.inf), np.full(len(values), np.inf)
+            lower[known], upper[known] = self.lower[groups[known], i], self.upper[groups[known], i]
+            if pd.api.types.is_integer_dtype(df[column]):
+                lower, upper = np.ceil(lower), np.floor(upper)
+
+            clipped = np.clip(values, lower, upper)
+            rows = np.flatnonzero(clipped != values) if len(values) else np.array([], dtype=np.int64)
+            rows = rows[~np.isnan(values[rows])]
+            if not len(rows):
+                continue
+
+            records.append(pd.DataFrame({"row": df.index[rows], "axis code": df["axis code"].to_numpy()[rows],
+                                         "date": df["date"].to_numpy()[rows],
+                                         "start hour": df["start hour"].to_numpy()[rows], "column": column,
+                                         "original": values[rows], "capped": clipped[rows]}))
+            # Cells outside the bounds are written in place so the column keeps its dtype.
+            df.iloc[rows, df.columns.get_loc(column)] = clipped[rows].astype(df[column].dtype)
+
+        columns = ["row", "axis code", "date", "start hour", "column", "original", "capped"]
+        self.capped_cells = pd.concat(records, ignore_index=True) if records else pd.DataFrame(columns=columns)
+        return df
+
+    def fit_transform(self, df):
+        """Fit the bounds on a frame and cap it."""
+        return self.fit(df).transform(df)
+
+    def cap_frames(self, frames):
+        """
+        Fit and cap many axes at once, e.g. the frames of aggregate_corpus.
+        :param frames: Dict of label -> traffic DataFrame
+        :return: Dict of label -> capped DataFrame; self.capped_cells gets a label column
+        """
+        labels = [label for label, df in frames.items() if not df.empty]
+        if not labels:
+            return dict(frames)
+
+        combined = pd.concat([frames[label] for label in labels], keys=labels, names=["label", "row"])
+        capped = self.fit_transform(combined)
+        if not self.capped_cells.empty:
+            rows = pd.MultiIndex.from_tuples(self.capped_cells["row"], names=["label", "row"])
+            self.capped_cells.insert(0, "label", rows.get_level_values("label"))
+            self.capped_cells["row"] = rows.get_level_values("row")
+
+        result = dict(frames)
+        for label in labels:
+            result[label] = capped.xs(label, level="label")
+        return result
+
+    def summary(self):
+        """Number of capped cells per column in the last transform."""
+        return self.capped_cells.groupby("column")["row"].count().reindex(self.columns, fill_value=0)
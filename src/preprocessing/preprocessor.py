@@ -1,14 +1,35 @@
+import hashlib
+import json
+
+import numpy as np
 import pandas as pd
-from persiantools.jdatetime import JalaliDateTime
+
+from src.preprocessing.cache import write_frame
+from src.preprocessing.gap_filler import HOURS_PER_DAY, fill_vehicle_gaps, interpolate_time, missing_days
+from src.preprocessing.instrumentation import NO_HOOKS
+from src.preprocessing.jalali import jalali_to_gregorian
+from src.preprocessing.schema import compact_frame
+from src.preprocessing.xlsx_reader import TrafficExportReader
 
 
 class TrafficPreprocessor:
-    def __init__(self, file_path):
+    # Bump whenever a preprocessing step changes its output, so cached
+    # frames produced by older code are no longer reused.
+    VERSION = "2"
+
+    STAGES = ["load_data", "remove_duplicates", "handle_missing_values", "handle_outliers"]
+
+    def __init__(self, file_path, compact=False, hooks=None):
         """
         Initialize the preprocessor with a file path.
+        With compact=True the processed frame is converted to the compact schema (see schema.compact_frame).
+        hooks (see instrumentation.PipelineHooks) are called around every stage of preprocess().
         """
         self.file_path = file_path
+        self.compact = compact
+        self.hooks = hooks or NO_HOOKS
         self.df = None
+        self.malformed_cells = None
 
         self.vehicle_columns = ["total number of vehicles", "number of Class 1 vehicles",
                                 "number of Class 2 vehicles", "number of Class 3 vehicles",
@@ -23,37 +44,31 @@ class TrafficPreprocessor:
 
         pd.set_option('future.no_silent_downcasting', True)
 
+    def config_key(self):
+        """
+        Return a short hash identifying the preprocessing version and configuration.
+        """
+        config = {
+            "version": self.VERSION,
+            "vehicle_columns": self.vehicle_columns,
+            "speed_column": self.speed_column,
+            "violation_columns": self.violation_columns,
+            "compact": self.compact
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
     def load_data(self):
         """
         Load traffic data from an Excel file and process timestamps.
+        Cells that could not be read as numbers are kept in self.malformed_cells.
+        :return: Stage counters
         """
-        df = pd.read_excel(self.file_path)
-
-        df.rename(columns={
-            df.columns[0]: "axis code",
-            df.columns[1]: "axis name",
-            df.columns[2]: "start time",
-            df.columns[3]: "end time",
-            df.columns[4]: "operating time (minutes)",
-            df.columns[5]: "total number of vehicles",
-            df.columns[6]: "number of Class 1 vehicles",
-            df.columns[7]: "number of Class 2 vehicles",
-            df.columns[8]: "number of Class 3 vehicles",
-            df.columns[9]: "number of Class 4 vehicles",
-            df.columns[10]: "number of Class 5 vehicles",
-            df.columns[11]: "average speed",
-            df.columns[12]: "number of speeding violations",
-            df.columns[13]: "number of unauthorized distance violations",
-            df.columns[14]: "number of unauthorized overtaking violations",
-            df.columns[15]: "estimated number"
-        }, inplace=True)
-
-        df = df.iloc[1:].reset_index(drop=True)
-
-        df["start time"] = df["start time"].apply(
-            lambda x: JalaliDateTime.strptime(x, "%Y/%m/%d %H:%M:%S").to_gregorian())
-        df["end time"] = df["end time"].apply(
-            lambda x: JalaliDateTime.strptime(x, "%Y/%m/%d %H:%M:%S").to_gregorian())
+        reader = TrafficExportReader(self.file_path)
+        df = reader.read()
+        self.malformed_cells = reader.malformed_cells()
+
+        df["start time"] = jalali_to_gregorian(df["start time"])
+        df["end time"] = jalali_to_gregorian(df["end time"])
 
         df["date"] = df["start time"].dt.date.astype(str)
         df["start hour"] = df["start time"].dt.hour
@@ -61,62 +76,78 @@ class TrafficPreprocessor:
 
         df.set_index("start time", inplace=True)
 
-        for col in self.vehicle_columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-        df[self.speed_column] = pd.to_numeric(df[self.speed_column], errors="coerce")
-        for col in self.violation_columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
         self.df = df
+        return {"malformed cells": len(self.malformed_cells)}
 
     def handle_missing_values(self):
         """
         Handle missing timestamps in the dataset:
+        reindex to a full hourly range, drop days without any vehicle count and fill the
+        remaining gaps with the NumPy kernels in gap_filler. Files without gaps skip the fill.
+        :return: Stage counters
         """
+        rows = len(self.df)
+
         full_index = pd.date_range(
             start=self.df.index.min().normalize(),
             end=self.df.index.max().normalize() + pd.Timedelta(hours=23),
             freq="h"
         )
 
-        self.df = self.df.reindex(full_index)
+        if self.df.index.equals(full_index):
+            self.df.index = full_index
+        else:
+            self.df = self.df.reindex(full_index)
+        hours_added = len(self.df) - rows
 
-        missing_per_day = self.df["total number of vehicles"].isna().resample("D").sum()
-        days_to_drop = missing_per_day[missing_per_day == 24].index
-        self.df = self.df[~self.df.index.normalize().isin(days_to_drop)]
+        days_to_drop = missing_days(self.df["total number of vehicles"].to_numpy(dtype=np.float64))
+        if days_to_drop.any():
+            self.df = self.df[~np.repeat(days_to_drop, HOURS_PER_DAY)]
 
-        self.df[self.vehicle_columns] = self.df[self.vehicle_columns].interpolate(method="time", limit=3)
-        self.df[self.vehicle_columns] = self.df[self.vehicle_columns].fillna(
-            self.df[self.vehicle_columns].rolling(window=3, min_periods=1).mean())
-        self.df[self.vehicle_columns] = self.df[self.vehicle_columns].fillna(
-            self.df[self.vehicle_columns].rolling(window=6, min_periods=1).mean()
-        )
-        self.df[self.vehicle_columns] = self.df[self.vehicle_columns].fillna(
-            self.df[self.vehicle_columns].rolling(window=12, center=True, min_periods=1).mean()
-        )
-        self.df[self.vehicle_columns] = self.df[self.vehicle_columns].ffill().bfill()
+        timestamps = self.df.index.to_numpy()
+        interpolated = 0
+
+        gaps = self.df[self.vehicle_columns].isna().to_numpy().any(axis=0)
+        if gaps.any():
+            columns = [col for col, has_gaps in zip(self.vehicle_columns, gaps) if has_gaps]
+            values = self.df[columns].to_numpy(dtype=np.float64, copy=True)
+            interpolated += fill_vehicle_gaps(values, timestamps)
+            self.df[columns] = values
 
-        self.df[self.speed_column] = self.df[self.speed_column].interpolate(method="time", limit=3)
+        if self.df[self.speed_column].isna().any():
+            values = self.df[[self.speed_column]].to_numpy(dtype=np.float64, copy=True)
+            interpolated += interpolate_time(values, timestamps)
+            self.df[self.speed_column] = values[:, 0]
 
         self.df[self.violation_columns] = self.df[self.violation_columns].fillna(0)
 
         self.df["end time"] = self.df.index + pd.Timedelta(hours=1)
-        self.df["date"] = self.df.index.date.astype(str)
+        self.df["date"] = np.datetime_as_string(timestamps.astype("datetime64[D]")).astype(object)
         self.df["start hour"] = self.df.index.hour
         self.df["end hour"] = (self.df["start hour"] + 1) % 24
 
         self.df["axis code"] = self.df["axis code"].ffill().bfill()
         self.df["axis name"] = self.df["axis name"].ffill().bfill()
 
+        return {"hours added": hours_added, "days dropped": int(days_to_drop.sum()),
+                "cells interpolated": interpolated}
+
     def remove_duplicates(self):
         """
-        Remove duplicate rows from the dataset.
+        Keep one row per start time, the last one the export lists. This runs before
+        handle_missing_values, which cannot reindex a frame with repeated timestamps.
+        Hours repeated across files are resolved by the Aggregator (see deduplication).
+        :return: Stage counters
         """
-        self.df.drop_duplicates(inplace=True)
+        duplicated = self.df.index.duplicated(keep="last")
+        if duplicated.any():
+            self.df = self.df[~duplicated]
+        return {"rows dropped": int(duplicated.sum())}
 
     def handle_outliers(self):
         """
         Detect and handle outliers using the IQR method with capping.
+        :return: Stage counters
         """
         col = "total number of vehicles"
 
@@ -129,19 +160,44 @@ class TrafficPreprocessor:
         lower_bound = Q1 - 1.5 * (IQR + c)
         upper_bound = Q3 + 1.5 * (IQR + c)
 
+        clipped = int(((self.df[col] < lower_bound) | (self.df[col] > upper_bound)).sum())
         self.df[col] = self.df[col].clip(lower=lower_bound, upper=upper_bound)
+        return {"values clipped": clipped}
+
+    def compact_schema(self):
+        """
+        Convert the processed frame to the compact schema.
+        """
+        self.df = compact_frame(self.df)
+
+    def run_stage(self, stage):
+        """
+        Run one preprocessing stage, reporting it to the hooks when they are enabled.
+        """
+        if not self.hooks.enabled:
+            return getattr(self, stage)()
+
+        self.hooks.before_stage(self.file_path, stage, self.df)
+        counters = getattr(self, stage)()
+        self.hooks.after_stage(self.file_path, stage, self.df, counters)
+        return counters
 
     def preprocess(self):
         """
         Run all preprocessing steps in order.
         """
-        self.load_data()
-        self.handle_missing_values()
-        self.remove_duplicates()
-        self.handle_outliers()
+        for stage in self.STAGES:
+            self.run_stage(stage)
+
+        if self.compact:
+            self.run_stage("compact_schema")
 
     def save_processed_data(self, output_path):
         """
-        Save the processed data to a new Excel file.
+        Save the processed data to a new Excel file, or to Parquet when output_path ends
+        with .parquet (see ProcessedDataset for a partitioned dataset of many files).
         """
-        self.df.to_excel(output_path, index=False)
+        if output_path.endswith('.parquet'):
+            write_frame(self.df, output_path)
+        else:
+            self.df.to_excel(output_path, index=False)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Text labels repeated on every row; stored as categoricals in the compact schema.
+CATEGORY_COLUMNS = ["axis name", "year", "month", "season"]
+
+# Day labels stored as datetime64 instead of "YYYY-MM-DD" strings.
+DATE_COLUMNS = ["date"]
+
+# Integer types tried from narrowest to widest, with their nullable counterparts.
+INTEGER_TYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64]
+NULLABLE_INTEGER_TYPES = {np.uint8: "UInt8", np.int8: "Int8", np.uint16: "UInt16", np.int16: "Int16",
+                          np.uint32: "UInt32", np.int32: "Int32", np.int64: "Int64"}
+
+
+def narrowest_numeric_type(values):
+    """
+    Pick the narrowest type that holds a float array without changing any value.
+
+    :param values: 1-D float64 array, NaN marking missing values
+    :return: A numpy integer type when every value is integral and present, the nullable
+             pandas integer type when some are missing, float32 otherwise
+    """
+    missing = np.isnan(values)
+    present = values[~missing]
+
+    if len(present) == 0 or not (present == np.floor(present)).all():
+        return np.float32
+
+    low, high = present.min(), present.max()
+    for integer_type in INTEGER_TYPES:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            return NULLABLE_INTEGER_TYPES[integer_type] if missing.any() else integer_type
+
+    return np.float32
+
+
+def compact_column(series):
+    """
+    Convert one column to its compact type. Numeric columns, or object columns holding
+    only numbers, are narrowed; other object columns become categoricals.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_bool_dtype(series):
+        return series
+
+    numbers = pd.to_numeric(series, errors="coerce")
+    if pd.api.types.is_numeric_dtype(series) or numbers.notna().sum() == series.notna().sum():
+        values = numbers.to_numpy(dtype=np.float64, na_value=np.nan)
+        return numbers.astype(narrowest_numeric_type(values))
+
+    return series.astype("category")
+
+
+def compact_frame(df):
+    """
+    Return a copy of a processed traffic frame in the compact schema:
+    dates as datetime64, text labels as categoricals and every count in the
+    narrowest integer type that fits (nullable when values are missing), or
+    float32 when values are not integral.
+    """
+    compact = {}
+    for column in df.columns:
+        series = df[column]
+        if column in DATE_COLUMNS:
+            compact[column] = pd.to_datetime(series)
+        elif column in CATEGORY_COLUMNS:
+            compact[column] = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+        else:
+            compact[column] = compact_column(series)
+
+    return pd.DataFrame(compact, index=df.index)
+
+
+def bytes_per_row(df):
+    """Return the deep memory usage of each column divided by the number of rows."""
+    return df.memory_usage(deep=True, index=False) / max(len(df), 1)
+
+
+def memory_report(df, compact=None):
+    """
+    Compare the memory footprint of a frame with its compact version.
+
+    :param df: Processed traffic frame in the default schema
+    :param compact: Its compact version (default: compact_frame(df))
+    :return: DataFrame of dtype and bytes per row before and after for every column, plus a total row
+    """
+    if compact is None:
+        compact = compact_frame(df)
+
+    report = pd.DataFrame({
+        "dtype before": df.dtypes.astype(str),
+        "bytes/row before": bytes_per_row(df),
+        "dtype after": compact.dtypes.astype(str).reindex(df.columns),
+        "bytes/row after": bytes_per_row(compact).reindex(df.columns)
+    })
+    report.loc["total"] = ["", report["bytes/row before"].sum(), "", report["bytes/row after"].sum()]
+    report["saved"] = 1 - report["bytes/row after"] / report["bytes/row before"]
+    return report
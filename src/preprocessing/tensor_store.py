@@ -0,0 +1,238 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.aggregator import MONTHS, YEARS, iter_files
+from src.preprocessing.data_selector import aggregate_columns
+from src.preprocessing.gap_filler import HOURS_PER_DAY
+from src.preprocessing.jalali import nowruz
+
+TENSOR_FILE = "tensor.bin"
+INDEX_FILE = "index.json"
+
+
+def _json_code(code):
+    """Axis codes come as NumPy or Python scalars; store them as plain JSON values."""
+    return code.item() if hasattr(code, "item") else code
+
+
+def row_hours(df, origin):
+    """Return the hour offset of every row of a traffic frame from an origin datetime64[h]."""
+    days = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]").astype("datetime64[h]")
+    return (days - origin).astype(np.int64) + df["start hour"].to_numpy(dtype=np.int64)
+
+
+class TrafficTensorStore:
+    def __init__(self, directory, mode="r"):
+        """
+        Open a dense on-disk tensor of the processed corpus, written by TrafficTensorStore.build.
+
+        The tensor is a np.memmap of shape (axes, hours, metrics): every axis's full hourly history,
+        one row per hour from the origin, with NaN for hours an axis has no data. index.json holds
+        the axis codes, the origin, the hour count, the metric names and the number of rows stored
+        and skipped (outside the time range) by build. The accessors return
+        views of the mapped file, so slicing years of hourly data for every axis reads only the
+        pages touched and copies nothing.
+
+        :param directory: Directory holding tensor.bin and index.json
+        :param mode: np.memmap mode; 'r' for read-only views, 'r+' to write through them
+        """
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.index = json.load(f)
+
+        self.axis_codes = self.index["axis codes"]
+        self.metrics = self.index["metrics"]
+        self.origin = np.datetime64(self.index["origin"], "h")
+        self.hours = self.index["hours"]
+        self._positions = {code: i for i, code in enumerate(self.axis_codes)}
+        self.tensor = np.memmap(os.path.join(directory, TENSOR_FILE), dtype=self.index["dtype"], mode=mode,
+                                shape=(len(self.axis_codes), self.hours, len(self.metrics)))
+
+    @staticmethod
+    def build(directory, frames=None, years=None, base_path='resources', cache=None, metrics=None,
+              dtype=np.float32):
+        """
+        Materialize processed traffic data into a tensor store.
+
+        By default every file of the years is streamed through iter_files, one file in memory at a
+        time, and the time axis runs from 1 Farvardin of the first year to 1 Farvardin after the
+        last, and axes are ordered as first seen. With frames given, the time axis covers the days
+        they contain and axes are ordered by axis code. When an axis has a given hour more than once,
+        the last row wins.
+
+        :param directory: Directory to write tensor.bin and index.json to
+        :param frames: Dict of label -> traffic DataFrame (e.g. from aggregate_corpus) to store instead
+        :param years: Jalali years to stream (default: YEARS)
+        :param cache: PreprocessingCache to stream through (default: the shared cache, False to disable)
+        :param metrics: Columns to store (default: DataSelector's aggregate_columns)
+        :param dtype: Floating dtype of the tensor; float32 holds the counts exactly at half the size
+        :return: TrafficTensorStore opened read-only on the result; index["skipped rows"] counts the rows
+                 outside the time range
+        """
+        metrics = list(aggregate_columns if metrics is None else metrics)
+        os.makedirs(directory, exist_ok=True)
+
+        if frames is not None:
+            frames = [df for df in frames.values() if not df.empty]
+            dates = pd.to_datetime(pd.concat([df["date"] for df in frames], ignore_index=True)) if frames else None
+            start = dates.min().to_datetime64() if frames else np.datetime64("1970-01-01")
+            end = dates.max().to_datetime64() + np.timedelta64(1, "D") if frames else start
+            codes = sorted({code for df in frames for code in df["axis code"].dropna().unique()})
+            stream = frames
+        else:
+            years = YEARS if years is None else years
+            start, end = nowruz(int(years[0])), nowruz(int(years[-1]) + 1)
+            # One axis per file name; codes get their slot when first seen and unused slots are cut off.
+            codes = [None] * len({name for year in years for month in MONTHS
+                                  if os.path.isdir(os.path.join(base_path, year, month))
+                                  for name in os.listdir(os.path.join(base_path, year, month))
+                                  if name.endswith('.xlsx')})
+            stream = (df for year, month, df in iter_files(years=years, base_path=base_path, cache=cache))
+
+        origin = np.datetime64(start, "D").astype("datetime64[h]")
+        hours = int((np.datetime64(end, "D") - np.datetime64(start, "D")).astype(np.int64)) * HOURS_PER_DAY
+        positions = {code: i for i, code in enumerate(codes) if code is not None}
+
+        tmp_path = os.path.join(directory, f"{TENSOR_FILE}.{os.getpid()}.tmp")
+        shape = (len(codes), hours, len(metrics))
+        tensor = np.memmap(tmp_path, dtype=dtype, mode="w+", shape=shape) if all(shape) else None
+        if tensor is not None:
+            tensor[:] = np.nan
+
+        rows = skipped = 0
+        for df in stream:
+            df = df[df["axis code"].notna()]
+            for code in df["axis code"].unique():
+                if code not in positions:
+                    if len(positions) == len(codes):
+                        raise ValueError(f"More axis codes than axis files; cannot place axis {code}")
+                    codes[len(positions)] = code
+                    positions[code] = len(positions)
+            slots = df["axis code"].map(positions)
+            offsets = row_hours(df, origin)
+            inside = slots.notna().to_numpy() & (offsets >= 0) & (offsets < hours)
+
+            if inside.any():
+                tensor[slots.to_numpy()[inside].astype(np.int64), offsets[inside]] = \
+                    df.loc[inside, metrics].to_numpy(dtype=np.float64, na_value=np.nan)
+            rows += int(inside.sum())
+            skipped += int((~inside).sum())
+
+        codes = codes[:len(positions)]
+        if tensor is not None:
+            tensor.flush()
+            del tensor
+            os.truncate(tmp_path, len(codes) * hours * len(metrics) * np.dtype(dtype).itemsize)
+        else:
+            open(tmp_path, "wb").close()
+        os.replace(tmp_path, os.path.join(directory, TENSOR_FILE))
+
+        index = {"axis codes": [_json_code(code) for code in codes], "origin": str(origin), "hours": hours,
+                 "metrics": metrics, "dtype": np.dtype(dtype).name, "rows": rows, "skipped rows": skipped}
+        tmp_path = os.path.join(directory, f"{INDEX_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, INDEX_FILE))
+
+        return TrafficTensorStore(directory)
+
+    def _hour(self, value, default):
+        """Hour offset of a date or timestamp, clipped to the tensor."""
+        if value is None:
+            return default
+        offset = int((np.datetime64(pd.Timestamp(value), "h") - self.origin).astype(np.int64))
+        return min(max(offset, 0), self.hours)
+
+    def _time(self, start, end):
+        return slice(self._hour(start, 0), self._hour(end, self.hours))
+
+    def _axes(self, codes):
+        """
+        Index of the given axis codes: a slice when they are consecutive in the store (a view),
+        otherwise a list of positions (NumPy copies on fancy indexing).
+        """
+        if codes is None:
+            return slice(None)
+        positions = [self._positions[code] for code in codes]
+        if positions and positions == list(range(positions[0], positions[0] + len(positions))):
+            return slice(positions[0], positions[0] + len(positions))
+        return positions
+
+    def _metrics(self, names):
+        if names is None:
+            return slice(None)
+        if isinstance(names, str):
+            return self.metrics.index(names)
+        positions = [self.metrics.index(name) for name in names]
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            return slice(positions[0], positions[0] + len(positions))
+        return positions
+
+    def times(self, start=None, end=None):
+        """Hourly DatetimeIndex of the time axis between start (inclusive) and end (exclusive)."""
+        time = self._time(start, end)
+        return pd.date_range(self.origin + np.timedelta64(time.start, "h"), periods=time.stop - time.start,
+                             freq="h")
+
+    def axis(self, code):
+        """View of one axis's history: hours x metrics."""
+        return self.tensor[self._positions[code]]
+
+    def axes(self, codes):
+        """
+        Tensor of an axis subset. A view when the codes are consecutive in the store's order
+        (self.axis_codes: by code when built from frames, as first seen when streamed); any other
+        subset has to be gathered, which NumPy does by copying.
+        """
+        return self.tensor[self._axes(codes)]
+
+    def time_slice(self, start=None, end=None):
+        """View of every axis between start (inclusive) and end (exclusive): axes x hours x metrics."""
+        return self.tensor[:, self._time(start, end)]
+
+    def metric(self, name):
+        """View of one metric for every axis: axes x hours."""
+        return self.tensor[:, :, self.metrics.index(name)]
+
+    def select(self, codes=None, start=None, end=None, metrics=None):
+        """
+        Combine the accessors: an axis subset, a time range and one metric (dropping that
+        dimension) or several. Only non-consecutive axes or metrics make it a copy.
+        """
+        axes, time, columns = self._axes(codes), self._time(start, end), self._metrics(metrics)
+        return self.tensor[axes][:, time][..., columns]
+
+    def frame(self, code, start=None, end=None):
+        """
+        One axis as a DataFrame indexed by hourly timestamps, with one column per metric,
+        backed by the mapped tensor.
+        """
+        time = self._time(start, end)
+        return pd.DataFrame(self.axis(code)[time], index=self.times(start, end), columns=self.metrics, copy=False)
+
+    def daily(self, metric, start=None, end=None):
+        """
+        View of one metric reshaped to axes x days x hours of the day. The range is widened to
+        whole days.
+        """
+        time = self._time(start, end)
+        first = time.start - time.start % HOURS_PER_DAY
+        last = time.stop + (-time.stop) % HOURS_PER_DAY
+        values = self.metric(metric)[:, first:last]
+        return values.reshape(len(self.axis_codes), (last - first) // HOURS_PER_DAY, HOURS_PER_DAY)
+
+    def hourly_profile(self, metric='total number of vehicles', start=None, end=None):
+        """
+        Mean of a metric per axis and hour of the day over a period, ignoring missing hours.
+        :return: DataFrame indexed by axis code with one column per start hour
+        """
+        with np.errstate(invalid="ignore"):
+            days = self.daily(metric, start, end)
+            present = ~np.isnan(days)
+            means = np.nansum(days, axis=1, dtype=np.float64) / present.sum(axis=1)
+        return pd.DataFrame(np.where(present.any(axis=1), means, np.nan),
+                            index=pd.Index(self.axis_codes, name='axis code'),
+                            columns=pd.RangeIndex(HOURS_PER_DAY, name='start hour'))
@@ -0,0 +1,302 @@
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+import pandas as pd
+
+# Positional layout of the hourly traffic exports.
+EXPORT_COLUMNS = ["axis code", "axis name", "start time", "end time", "operating time (minutes)",
+                  "total number of vehicles", "number of Class 1 vehicles", "number of Class 2 vehicles",
+                  "number of Class 3 vehicles", "number of Class 4 vehicles", "number of Class 5 vehicles",
+                  "average speed", "number of speeding violations", "number of unauthorized distance violations",
+                  "number of unauthorized overtaking violations", "estimated number"]
+
+# Columns kept as raw cell values; everything else is decoded as a number.
+LABEL_COLUMNS = ["axis code", "axis name", "start time", "end time", "operating time (minutes)"]
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Cell reference of a <c> element, e.g. "P12".
+_REFERENCE = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _column_letters(index):
+    """Convert a zero-based column index to its letters, e.g. 15 -> "P"."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _column_index(letters):
+    """Convert column letters to a zero-based index, e.g. "P" -> 15."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _local_name(element):
+    """Tag of an element without its namespace, so strict-schema sheets read like transitional ones."""
+    return element.tag.rpartition("}")[2]
+
+
+def _item_text(element):
+    """Text of a shared string or inline string item: its <t> runs, without phonetic guides."""
+    text = []
+    for child in element:
+        name = _local_name(child)
+        if name == "t":
+            text.append(child.text or "")
+        elif name == "r":
+            text.extend(run.text or "" for run in child if _local_name(run) == "t")
+    return "".join(text)
+
+
+class TrafficExportReader:
+    def __init__(self, file_path, columns=None, header_rows=2):
+        """
+        Streaming reader for the hourly traffic exports.
+
+        The first worksheet is streamed from the xlsx archive with iterparse, one row in
+        memory at a time, and only cells of the requested columns are extracted. Numeric
+        columns are decoded in one vectorized step into float64 arrays (int64 when
+        every value is integral and present, as with pd.to_numeric); label columns
+        keep their cell values.
+
+        :param file_path: Path of the .xlsx export
+        :param columns: Subset of EXPORT_COLUMNS to decode (default: all)
+        :param header_rows: Leading sheet rows to skip (the blank row and the Persian header)
+        """
+        self.file_path = file_path
+        self.columns = list(EXPORT_COLUMNS) if columns is None else list(columns)
+        self.header_rows = header_rows
+        self.malformed = []
+
+        unknown = set(self.columns) - set(EXPORT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown export columns: {sorted(unknown)}")
+
+    def _first_sheet_path(self, archive):
+        """Resolve the archive path of the first worksheet."""
+        with archive.open("xl/workbook.xml") as f:
+            for event, element in iterparse(f):
+                if element.tag == MAIN_NS + "sheet":
+                    rel_id = element.get(REL_NS + "id")
+                    break
+            else:
+                raise ValueError(f"{self.file_path} has no worksheets")
+
+        with archive.open("xl/_rels/workbook.xml.rels") as f:
+            for event, element in iterparse(f):
+                if element.tag == PACKAGE_REL_NS + "Relationship" and element.get("Id") == rel_id:
+                    target = element.get("Target")
+                    if target.startswith("/"):
+                        return target.lstrip("/")
+                    return posixpath.normpath(posixpath.join("xl", target))
+
+        raise ValueError(f"Cannot resolve the first worksheet of {self.file_path}")
+
+    @staticmethod
+    def _shared_strings(archive):
+        """Load the shared string table."""
+        if "xl/sharedStrings.xml" not in archive.namelist():
+            return np.array([], dtype=object)
+
+        strings = []
+        with archive.open("xl/sharedStrings.xml") as f:
+            for event, element in iterparse(f):
+                if _local_name(element) == "si":
+                    strings.append(_item_text(element))
+                    element.clear()
+
+        return np.array(strings, dtype=object)
+
+    def _scan_cells(self, stream):
+        """
+        Stream the sheet XML row by row and collect the cells of the requested columns as
+        (letters, rows, types, values, inline) arrays, inline holding the text of inline strings.
+
+        Cells and rows without a reference follow the previous one, as in the spec; a reference
+        that is not a cell address raises ValueError rather than misplacing the cell.
+        """
+        wanted = {_column_letters(EXPORT_COLUMNS.index(column)) for column in self.columns}
+        letters, rows, types, values, inline = [], [], [], [], []
+        row_number = 0
+
+        for event, element in iterparse(stream):
+            if _local_name(element) != "row":
+                continue
+
+            # Cells share the namespace of their row, so their tags are compared whole.
+            namespace = element.tag[:-len("row")]
+            cell_tag, value_tag, inline_tag = namespace + "c", namespace + "v", namespace + "is"
+
+            reference = element.get("r")
+            row_number = int(reference) if reference is not None else row_number + 1
+            cell_letters = ""
+
+            for cell in element:
+                if cell.tag != cell_tag:
+                    continue
+
+                reference = cell.get("r")
+                if reference is None:
+                    cell_letters = _column_letters(_column_index(cell_letters) + 1)
+                else:
+                    match = _REFERENCE.fullmatch(reference)
+                    if match is None or int(match.group(2)) != row_number:
+                        raise ValueError(f"{self.file_path}: unexpected cell reference {reference!r} "
+                                         f"in row {row_number}")
+                    cell_letters = match.group(1)
+
+                if cell_letters not in wanted:
+                    continue
+
+                value, text = "", ""
+                for child in cell:
+                    if child.tag == value_tag:
+                        value = child.text or ""
+                    elif child.tag == inline_tag:
+                        text = _item_text(child)
+
+                letters.append(cell_letters)
+                rows.append(row_number)
+                types.append(cell.get("t", ""))
+                values.append(value)
+                inline.append(text)
+
+            element.clear()
+
+        return (np.array(letters, dtype=str), np.array(rows, dtype=np.int64), np.array(types, dtype=str),
+                np.array(values, dtype=str), np.array(inline, dtype=object))
+
+    def _cell_text(self, types, values, inline, strings):
+        """Resolve the text of a column's cells as an object array."""
+        text = values.astype(object)
+
+        shared = types == "s"
+        if shared.any():
+            text[shared] = strings[values[shared].astype(np.int64)]
+
+        inline_strings = types == "inlineStr"
+        text[inline_strings] = inline[inline_strings]
+
+        return text
+
+    def read(self):
+        """
+        Read the export into a DataFrame with the named columns.
+        Cells that cannot be decoded as numbers become NaN and are listed in self.malformed.
+        """
+        self.malformed = []
+
+        with zipfile.ZipFile(self.file_path) as archive:
+            strings = self._shared_strings(archive)
+            with archive.open(self._first_sheet_path(archive)) as stream:
+                letters, rows, types, values, inline = self._scan_cells(stream)
+
+        keep = (rows > self.header_rows) & ((values != "") | (types == "inlineStr"))
+
+        # Sheet rows are stored in ascending order, so row positions follow from where the number changes.
+        kept_rows = rows[keep]
+        new_row = np.ones(len(kept_rows), dtype=bool)
+        new_row[1:] = kept_rows[1:] != kept_rows[:-1]
+        row_numbers = kept_rows[new_row]
+        positions = np.full(len(rows), -1)
+        positions[keep] = np.cumsum(new_row) - 1
+        n_rows = len(row_numbers)
+
+        data = {}
+        for column in self.columns:
+            mask = (letters == _column_letters(EXPORT_COLUMNS.index(column))) & keep
+            index = positions[mask]
+
+            if column in LABEL_COLUMNS:
+                text = self._cell_text(types[mask], values[mask], inline[mask], strings)
+                data[column] = self._decode_labels(types[mask], text, index, n_rows)
+            else:
+                data[column] = self._decode_numbers(column, types[mask], values[mask], inline[mask], strings,
+                                                    index, n_rows, row_numbers)
+
+        del letters, rows, types, values, inline, strings
+        return pd.DataFrame(data, columns=self.columns)
+
+    @staticmethod
+    def _decode_labels(types, text, index, n_rows):
+        """Keep label cells as Python values, converting numeric cells like openpyxl and pandas do."""
+        column = np.full(n_rows, np.nan, dtype=object)
+        column[index] = text
+
+        numeric = (types == "") | (types == "n")
+        if numeric.any():
+            numbers = text[numeric].astype(np.float64)
+            integral = numbers == np.floor(numbers)
+            converted = numbers.astype(object)
+            converted[integral] = numbers[integral].astype(np.int64).astype(object)
+            column[index[numeric]] = converted
+
+        boolean = types == "b"
+        column[index[boolean]] = text[boolean] == "1"
+
+        return column
+
+    def _decode_numbers(self, name, types, values, inline, strings, index, n_rows, row_numbers):
+        """
+        Decode numeric cells into a typed array, recording cells that are not numbers.
+        Plain numeric cells are parsed straight from their values; only text cells are resolved to strings.
+        """
+        numbers = np.full(len(values), np.nan)
+        plain = (types == "") | (types == "n")
+        decodable = plain.copy()
+
+        try:
+            numbers[plain] = values[plain].astype(np.float64)
+        except ValueError:
+            for position in np.flatnonzero(plain):
+                try:
+                    numbers[position] = float(values[position])
+                except ValueError:
+                    decodable[position] = False
+
+        text = None
+        if not plain.all():
+            text = self._cell_text(types, values, inline, strings)
+            for position in np.flatnonzero(~plain):
+                if types[position] in ("e", "b"):
+                    continue
+                try:
+                    numbers[position] = float(text[position])
+                    decodable[position] = True
+                except ValueError:
+                    pass
+
+        if not decodable.all():
+            if text is None:
+                text = self._cell_text(types, values, inline, strings)
+            for position in np.flatnonzero(~decodable):
+                self.malformed.append({"row": int(row_numbers[index[position]]), "column": name,
+                                       "value": text[position]})
+
+        column = np.full(n_rows, np.nan)
+        column[index] = numbers
+
+        if not np.isnan(column).any() and (column == np.floor(column)).all():
+            column = column.astype(np.int64)
+
+        return column
+
+    def malformed_cells(self):
+        """Return the malformed cells found by the last read() as a DataFrame."""
+        return pd.DataFrame(self.malformed, columns=["row", "column", "value"])
+
+
+def read_traffic_export(file_path, columns=None):
+    """Read a raw hourly traffic export with TrafficExportReader."""
+    return TrafficExportReader(file_path, columns).read()
@@ -1 +1,2 @@
 from .visualizer import GraphVisualizer
+from .report import ReportRenderer, render_reports
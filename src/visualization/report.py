@@ -0,0 +1,220 @@
+"""
+Headless batch rendering of the standard per-axis report.
+
+    python -m src.visualization.report OUTPUT_DIR [--years 1401 1402 1403] [--workers N] [--force]
+
+Charts are drawn on reused Agg-backed matplotlib Figures without pyplot, so no display is needed, and
+written as OUTPUT_DIR/<axis>/<chart>.png. A manifest records a fingerprint of the data every
+axis was rendered from; later runs only re-render the axes whose data changed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from src.visualization.visualizer import (VEHICLE_TYPES, correlation_matrix, draw_correlation_heatmap,
+                                          draw_hourly_trend, draw_vehicle_comparison)
+
+# Bump when the charts are drawn differently, so every axis is re-rendered.
+RENDER_VERSION = "1"
+
+MANIFEST_FILE = "manifest.json"
+CHARTS = {"hourly_trend": (12, 6), "vehicle_comparison": (10, 6), "correlation_heatmap": (10, 6)}
+
+TREND_COLUMN = "total number of vehicles"
+TREND_LABEL = "تعداد کل وسایل نقلیه"
+
+# Renderer of the current worker process, created by _init_worker.
+_renderer = None
+
+
+def report_data(df):
+    """
+    Reduce an axis frame to the data its charts show: the hourly mean traffic of every year,
+    the vehicle class totals and the feature correlation matrix.
+    """
+    years = sorted(df["year"].astype(str).unique()) if "year" in df.columns else []
+    hourly = {year: df[df["year"].astype(str) == year].groupby("start hour", observed=True)[TREND_COLUMN]
+              .mean().astype(np.float64).reset_index() for year in years}
+
+    return {
+        "axis name": str(df["axis name"].dropna().iloc[0]) if df["axis name"].notna().any() else "",
+        "hourly": hourly,
+        "class totals": df[VEHICLE_TYPES].astype(np.float64).sum(),
+        "correlation": correlation_matrix(df)
+    }
+
+
+def fingerprint(data):
+    """Return a SHA-256 of report data, identifying the charts it renders to."""
+    digest = hashlib.sha256(RENDER_VERSION.encode())
+    digest.update(data["axis name"].encode())
+    for year, hourly in data["hourly"].items():
+        digest.update(year.encode())
+        digest.update(pd.util.hash_pandas_object(hourly, index=False).to_numpy().tobytes())
+    for frame in (data["class totals"], data["correlation"]):
+        digest.update(pd.util.hash_pandas_object(frame).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ReportRenderer:
+    def __init__(self, dpi=100, image_format="png"):
+        """
+        Renders report charts headlessly on the Agg backend, reusing one Figure per chart type across axes.
+        """
+        self.dpi = dpi
+        self.image_format = image_format
+        self.figures = {}
+        for chart, size in CHARTS.items():
+            self.figures[chart] = Figure(figsize=size)
+            FigureCanvasAgg(self.figures[chart])
+        sns.set_theme(style="darkgrid")
+
+    def _axes(self, chart):
+        figure = self.figures[chart]
+        figure.clear()
+        return figure, figure.add_subplot()
+
+    def render(self, directory, data):
+        """
+        Write every chart of one axis to a directory.
+        :param data: Report data from report_data
+        :return: List of written paths
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        figure, ax = self._axes("hourly_trend")
+        trends = [{"df": hourly, "label": year} for year, hourly in data["hourly"].items() if not hourly.empty]
+        draw_hourly_trend(ax, trends, TREND_COLUMN, TREND_LABEL, data["axis name"])
+        paths.append(self._save(figure, directory, "hourly_trend"))
+
+        figure, ax = self._axes("vehicle_comparison")
+        draw_vehicle_comparison(ax, data["class totals"])
+        paths.append(self._save(figure, directory, "vehicle_comparison"))
+
+        figure, ax = self._axes("correlation_heatmap")
+        draw_correlation_heatmap(ax, data["correlation"])
+        paths.append(self._save(figure, directory, "correlation_heatmap"))
+
+        return paths
+
+    def _save(self, figure, directory, chart):
+        path = os.path.join(directory, f"{chart}.{self.image_format}")
+        figure.tight_layout()
+        figure.savefig(path, dpi=self.dpi, format=self.image_format)
+        return path
+
+
+def _init_worker(dpi, image_format):
+    global _renderer
+    _renderer = ReportRenderer(dpi, image_format)
+
+
+def _render_task(task):
+    """
+    Render one axis in a worker; returns (axis, paths, seconds, error) instead of raising.
+    """
+    axis, directory, data = task
+    start = time.perf_counter()
+    try:
+        paths = _renderer.render(directory, data)
+    except Exception as e:
+        return axis, [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return axis, paths, time.perf_counter() - start, None
+
+
+def load_manifest(output_dir):
+    """Return the manifest of a report directory, or an empty one."""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def render_reports(frames, output_dir, workers=None, force=False, dpi=100, image_format="png"):
+    """
+    Render the report charts of many axes to disk, in parallel worker processes when workers > 1.
+
+    :param frames: Dict of axis file name -> aggregated DataFrame (e.g. from aggregate_corpus)
+    :param output_dir: Directory receiving one sub-directory per axis and the manifest
+    :param workers: Number of worker processes (None for one per CPU)
+    :param force: Re-render every axis, even those whose data did not change
+    :return: DataFrame with one row per axis: rendered or skipped, chart count, seconds and error
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    tasks, records = [], []
+    for name, df in frames.items():
+        axis = os.path.splitext(name)[0]
+        if df.empty:
+            records.append({"axis": axis, "status": "empty", "charts": 0, "seconds": 0.0, "error": None})
+            continue
+
+        data = report_data(df)
+        key = fingerprint(data)
+        entry = manifest.get(axis, {})
+        if not force and entry.get("fingerprint") == key and \
+                all(os.path.exists(os.path.join(output_dir, path)) for path in entry.get("charts", [])):
+            records.append({"axis": axis, "status": "skipped", "charts": len(entry["charts"]), "seconds": 0.0,
+                            "error": None})
+            continue
+
+        tasks.append((axis, os.path.join(output_dir, axis), data))
+        manifest[axis] = {"fingerprint": key}
+
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(dpi, image_format)
+        results = list(map(_render_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dpi, image_format)) as executor:
+            results = list(executor.map(_render_task, tasks))
+
+    for axis, paths, seconds, error in results:
+        if error is None:
+            manifest[axis]["charts"] = [os.path.relpath(path, output_dir) for path in paths]
+        else:
+            del manifest[axis]
+        records.append({"axis": axis, "status": "rendered" if error is None else "failed", "charts": len(paths),
+                        "seconds": seconds, "error": error})
+
+    tmp_path = os.path.join(output_dir, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_FILE))
+
+    return pd.DataFrame(records, columns=["axis", "status", "charts", "seconds", "error"])
+
+
+def main():
+    from src.preprocessing.aggregator import YEARS, aggregate_corpus
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_dir")
+    parser.add_argument("--years", nargs="+", default=YEARS)
+    parser.add_argument("--base-path", default="resources")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-render axes whose data did not change")
+    args = parser.parse_args()
+
+    frames, errors = aggregate_corpus(years=args.years, base_path=args.base_path, workers=args.workers)
+    summary = render_reports(frames, args.output_dir, workers=args.workers, force=args.force)
+    print(summary.groupby("status")["axis"].count().to_string())
+    for axis, error in summary.loc[summary["status"] == "failed", ["axis", "error"]].itertuples(index=False):
+        print(f"Failed to render {axis}: {error}")
+    print(f"Rendering took {summary['seconds'].sum():.1f} s of worker time")
+
+
+if __name__ == "__main__":
+    main()
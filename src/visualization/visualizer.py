@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
@@ -5,44 +7,116 @@ from matplotlib.ticker import MaxNLocator
 from arabic_reshaper import reshape
 from bidi.algorithm import get_display
 
+VEHICLE_TYPES = ["number of Class 1 vehicles", "number of Class 2 vehicles",
+                 "number of Class 3 vehicles", "number of Class 4 vehicles",
+                 "number of Class 5 vehicles"]
 
-def plot_hourly_trend_from_dfs(data, column, column_label, axis_name, max_yticks=10):
+MONTH_ORDER = ["farvardin", "ordibehesht", "khordad", "tir", "mordad", "shahrivar",
+               "mehr", "aban", "azar", "dey", "bahman", "esfand"]
+SEASON_ORDER = {"spring": 1, "summer": 2, "autumn": 3, "winter": 4}
+
+
+@lru_cache(maxsize=4096)
+def shape_label(text):
     """
-    Plots a line graph for a given column from multiple DataFrames with labels.
+    Reshape and reorder a Persian label for display, memoized since the same labels recur on every chart.
+    """
+    return get_display(reshape(text))
+
+
+def draw_hourly_trend(ax, data, column, column_label, axis_name, max_yticks=10):
+    """
+    Draws the hourly trend of a column from multiple DataFrames, with their peaks, on an Axes.
 
     Parameters:
     - data: list of dicts like {'df': DataFrame, 'label': str}
     - column: column name to plot from each DataFrame
     """
-
-    sns.set_theme(style="darkgrid")
-
-    plt.figure(figsize=(12, 6))
-
     for item in data:
         df = item["df"]
-        label = get_display(reshape(item["label"]))
+        label = shape_label(item["label"])
         if column in df.columns:
-            sns.lineplot(x="start hour", y=column, data=df, linewidth=2, label=label)
+            sns.lineplot(x="start hour", y=column, data=df, linewidth=2, label=label, ax=ax)
 
             peak_row = df.loc[df[column].idxmax()]
             peak_hour = peak_row['start hour']
             peak_value = peak_row[column]
 
-            plt.scatter(peak_hour, peak_value, s=100, zorder=5, label=get_display(reshape(f"مقدار اوج: {int(peak_value)}")))
-            plt.text(peak_hour + 1, peak_value, '',
-                     ha='center', fontsize=12, fontweight='bold')
+            ax.scatter(peak_hour, peak_value, s=100, zorder=5, label=shape_label(f"مقدار اوج: {int(peak_value)}"))
+            ax.text(peak_hour + 1, peak_value, '',
+                    ha='center', fontsize=12, fontweight='bold')
 
-    plt.title(get_display(reshape(f"روند ساعتی  {column_label} در {axis_name}")))
-    plt.xlabel(get_display(reshape("ساعت")))
-    plt.ylabel(get_display(reshape(column_label)))
-    plt.xticks(range(24))
-    plt.legend()
-    plt.grid(True)
-
-    ax = plt.gca()
+    ax.set_title(shape_label(f"روند ساعتی  {column_label} در {axis_name}"))
+    ax.set_xlabel(shape_label("ساعت"))
+    ax.set_ylabel(shape_label(column_label))
+    ax.set_xticks(range(24))
+    ax.legend()
+    ax.grid(True)
     ax.yaxis.set_major_locator(MaxNLocator(nbins=max_yticks))
 
+
+def draw_vehicle_comparison(ax, totals):
+    """
+    Draws a bar chart of vehicle class totals on an Axes.
+    :param totals: Series of total count per vehicle class column
+    """
+    totals.plot(kind="bar", color=["blue", "green", "red", "purple", "orange"], ax=ax)
+
+    ax.set_xlabel("Vehicle Type")
+    ax.set_ylabel("Total Count")
+    ax.set_title("Comparison of Different Vehicle Classes")
+    ax.tick_params(axis="x", labelrotation=45)
+
+    for i, val in enumerate(totals):
+        ax.text(i, val * 1.02, str(int(val)), ha='center', fontsize=10)
+
+
+def draw_correlation_heatmap(ax, corr_matrix):
+    """
+    Draws a heatmap of a correlation matrix on an Axes.
+    """
+    sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
+    ax.set_title("Feature Correlation Heatmap")
+
+
+def correlation_matrix(df):
+    """
+    Correlation of the numeric features of a traffic frame, with year, month, season and
+    date encoded as numbers (month and season in calendar order, plus weekday and weekend flags).
+    """
+    df_copy = df.copy()
+
+    if "year" in df_copy.columns:
+        df_copy["year"] = df_copy["year"].astype(int)
+
+    if "month" in df_copy.columns:
+        df_copy["month"] = df_copy["month"].apply(lambda x: MONTH_ORDER.index(x) + 1).astype(int)
+
+    if "season" in df_copy.columns:
+        df_copy["season"] = df_copy["season"].map(SEASON_ORDER).astype(int)
+
+    if "date" in df_copy.columns:
+        df_copy["date"] = pd.to_datetime(df_copy["date"])
+        df_copy["weekday"] = df_copy["date"].dt.weekday
+        df_copy["is_weekend"] = df_copy["weekday"].apply(lambda x: 1 if x == 5 else 0)
+
+    return df_copy.corr(numeric_only=True)
+
+
+def plot_hourly_trend_from_dfs(data, column, column_label, axis_name, max_yticks=10):
+    """
+    Plots a line graph for a given column from multiple DataFrames with labels.
+
+    Parameters:
+    - data: list of dicts like {'df': DataFrame, 'label': str}
+    - column: column name to plot from each DataFrame
+    """
+
+    sns.set_theme(style="darkgrid")
+
+    plt.figure(figsize=(12, 6))
+    draw_hourly_trend(plt.gca(), data, column, column_label, axis_name, max_yticks)
+
     plt.tight_layout()
     plt.show()
 
@@ -130,54 +204,18 @@ class GraphVisualizer:
         """
         Bar chart comparing different vehicle classes.
         """
-        vehicle_types = ["number of Class 1 vehicles", "number of Class 2 vehicles",
-                         "number of Class 3 vehicles", "number of Class 4 vehicles",
-                         "number of Class 5 vehicles"]
-
-        totals = self.df[vehicle_types].sum()
+        totals = self.df[VEHICLE_TYPES].sum()
 
         plt.figure(figsize=(10, 6))
-        ax = totals.plot(kind="bar", color=["blue", "green", "red", "purple", "orange"])
-
-        plt.xlabel("Vehicle Type")
-        plt.ylabel("Total Count")
-        plt.title("Comparison of Different Vehicle Classes")
-        plt.xticks(rotation=45)
-
-        for i, val in enumerate(totals):
-            ax.text(i, val * 1.02, str(int(val)), ha='center', fontsize=10)
-
+        draw_vehicle_comparison(plt.gca(), totals)
         plt.show()
 
     def plot_correlation_heatmap(self):
         """
         Heatmap of feature correlations.
         """
-        df_copy = self.df.copy()
-
-        if "year" in df_copy.columns:
-            df_copy["year"] = df_copy["year"].astype(int)
-
-        if "month" in df_copy.columns:
-            month_order = ["farvardin", "ordibehesht", "khordad", "tir", "mordad", "shahrivar",
-                           "mehr", "aban", "azar", "dey", "bahman", "esfand"]
-            df_copy["month"] = df_copy["month"].apply(lambda x: month_order.index(x) + 1)
-
-        if "season" in df_copy.columns:
-            season_order = {"spring": 1, "summer": 2, "autumn": 3, "winter": 4}
-            df_copy["season"] = df_copy["season"].map(season_order)
-
-        if "date" in df_copy.columns:
-            df_copy["date"] = pd.to_datetime(df_copy["date"])
-            df_copy["weekday"] = df_copy["date"].dt.weekday
-            df_copy["is_weekend"] = df_copy["weekday"].apply(lambda x: 1 if x == 5 else 0)
-
         plt.figure(figsize=(10, 6))
-
-        corr_matrix = df_copy.corr()
-
-        sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f")
-        plt.title("Feature Correlation Heatmap")
+        draw_correlation_heatmap(plt.gca(), correlation_matrix(self.df))
         plt.show()
 
     def compare_with(self, other_df, column, label1="Primary Data", label2="Comparison Data"):